@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, Query
+
+from app.autenticacion.dependencies import obtener_admin_actual
+from app.base_de_datos.pool import estadisticas_pools
+from app.comun.cache import estadisticas_caches, limpiar_caches
+from app.comun.dependencias import DBSession
+from app.idempotencia.purga import purgar
+
+router = APIRouter()
+
+
+@router.get("/admin/caches")
+def caches(_: dict = Depends(obtener_admin_actual)) -> dict[str, dict]:
+    """Entradas, hits y misses de cada cache en memoria de este proceso."""
+    return estadisticas_caches()
+
+
+@router.delete("/admin/caches")
+def vaciar_caches(_: dict = Depends(obtener_admin_actual)) -> dict:
+    limpiar_caches()
+    return {"status": "ok"}
+
+
+@router.get("/admin/pool")
+def pool(_: dict = Depends(obtener_admin_actual)) -> dict[str, dict]:
+    """Estado de cada pool de conexiones: en uso, overflow, espera al obtener conexión y
+    conexiones retenidas más allá del umbral de fuga."""
+    return estadisticas_pools()
+
+
+@router.delete("/admin/idempotencia")
+def purgar_idempotencia(
+    db: DBSession,
+    _: dict = Depends(obtener_admin_actual),
+    lote: int | None = Query(None, ge=1, le=100_000),
+) -> dict:
+    """Borra las claves `Idempotency-Key` vencidas, en lotes de `lote` filas."""
+    return {"eliminadas": purgar(db, lote=lote)}
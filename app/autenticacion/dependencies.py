@@ -1,27 +1,48 @@
+import hashlib
+import time
 from typing import Annotated
 
 from fastapi import Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from app.autenticacion.jwt_handler import decodificar_token
+from app.base_de_datos.configuracion import settings
+from app.comun.cache import CacheTTL
 from app.comun.excepciones import no_autorizado, prohibido
 
 bearer = HTTPBearer(auto_error=False)
 
+# Tokens ya verificados: sha256(token) -> usuario, hasta el `exp` del token. Un token
+# expirado o desalojado vuelve a pasar por jwt.decode completo.
+_tokens = CacheTTL("tokens", maxsize=settings.token_cache_size, ttl=0)
 
-def obtener_usuario_actual(
-    cred: Annotated[HTTPAuthorizationCredentials | None, Depends(bearer)],
-) -> dict:
-    if cred is None or not cred.credentials:
-        raise no_autorizado("Falta token Bearer")
+
+def _verificar(token: str) -> dict:
+    clave = hashlib.sha256(token.encode()).digest()
+    user = _tokens.obtener(clave)
+    if user is not None:
+        return user
 
     try:
-        payload = decodificar_token(cred.credentials)
+        payload = decodificar_token(token)
     except Exception as exc:
         raise no_autorizado("Token inválido") from exc
 
     # En un proyecto real, aquí se validaría contra BD.
-    return {"sub": payload.get("sub"), "role": payload.get("role")}
+    user = {"sub": payload.get("sub"), "role": payload.get("role")}
+    exp = payload.get("exp")
+    if isinstance(exp, int | float):
+        _tokens.guardar(clave, user, ttl=exp - time.time())
+    return user
+
+
+def obtener_usuario_actual(
+    cred: Annotated[HTTPAuthorizationCredentials | None, Depends(bearer)],
+) -> dict:
+    if cred is None or not cred.credentials:
+        raise no_autorizado("Falta token Bearer")
+
+    return dict(_verificar(cred.credentials))
 
 
 def obtener_admin_actual(user: Annotated[dict, Depends(obtener_usuario_actual)]) -> dict:
@@ -20,9 +20,9 @@ class TokenResponse(BaseModel):
 
 
 @router.post("/auth/token", response_model=TokenResponse)
-def token(body: LoginRequest, db: DBSession) -> TokenResponse:
+async def token(body: LoginRequest, db: DBSession) -> TokenResponse:
     try:
-        token_str = login(db, body.username, body.password)
+        token_str = await login(db, body.username, body.password)
     except ValueError as exc:
         raise no_autorizado(str(exc)) from exc
 
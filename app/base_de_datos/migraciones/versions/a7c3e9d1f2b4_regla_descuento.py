@@ -0,0 +1,48 @@
+"""regla_descuento
+
+Revision ID: a7c3e9d1f2b4
+Revises: f3a9b1c2d4e5
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a7c3e9d1f2b4"
+down_revision = "f3a9b1c2d4e5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Sin filas iniciales: mientras no haya reglas generales para un tipo de envío se aplican
+    # las del enunciado (REGLAS_POR_DEFECTO en discount_service), así que el comportamiento
+    # no cambia con la migración.
+    op.create_table(
+        "regla_descuento",
+        sa.Column("id_regla", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("tipo_envio", sa.String(length=10), nullable=False),
+        sa.Column("cantidad_minima", sa.Integer(), nullable=False),
+        sa.Column("tasa", sa.Numeric(5, 4), nullable=False),
+        sa.Column("id_cliente", sa.Integer(), sa.ForeignKey("cliente.id_cliente"), nullable=True),
+        sa.Column(
+            "id_tipo_producto",
+            sa.Integer(),
+            sa.ForeignKey("tipo_producto.id_tipo_producto"),
+            nullable=True,
+        ),
+        sa.Column("id_bodega", sa.Integer(), sa.ForeignKey("bodega.id_bodega"), nullable=True),
+        sa.Column("id_puerto", sa.Integer(), sa.ForeignKey("puerto.id_puerto"), nullable=True),
+        sa.Column("activo", sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.PrimaryKeyConstraint("id_regla"),
+        sa.CheckConstraint("tipo_envio IN ('TERRESTRE', 'MARITIMO')", name="chk_regla_tipo_envio"),
+        sa.CheckConstraint("cantidad_minima >= 1", name="chk_regla_cantidad_minima"),
+        sa.CheckConstraint("tasa >= 0 AND tasa <= 1", name="chk_regla_tasa"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("regla_descuento")
@@ -0,0 +1,41 @@
+"""recalculo_precios
+
+Revision ID: c2e8b5d7a9f1
+Revises: a7c3e9d1f2b4
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c2e8b5d7a9f1"
+down_revision = "a7c3e9d1f2b4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "recalculo_precios",
+        sa.Column("id_recalculo", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("estado", sa.String(length=12), nullable=False),
+        sa.Column("fecha_entrega_desde", sa.Date(), nullable=True),
+        sa.Column("id_desde", sa.Integer(), nullable=False),
+        sa.Column("id_hasta", sa.Integer(), nullable=False),
+        sa.Column("ultimo_id", sa.Integer(), nullable=False),
+        sa.Column("actualizados", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(length=500), nullable=True),
+        sa.Column("iniciado_en", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("actualizado_en", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id_recalculo"),
+        sa.CheckConstraint(
+            "estado IN ('EN_CURSO', 'COMPLETADO', 'FALLIDO')", name="chk_recalculo_estado"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("recalculo_precios")
@@ -0,0 +1,42 @@
+"""clave_idempotencia
+
+Revision ID: d4f1a8c3e6b2
+Revises: c2e8b5d7a9f1
+Create Date: 2026-10-18
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d4f1a8c3e6b2"
+down_revision = "c2e8b5d7a9f1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "clave_idempotencia",
+        sa.Column("id_clave", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("usuario", sa.String(length=50), nullable=False),
+        sa.Column("ruta", sa.String(length=100), nullable=False),
+        sa.Column("clave", sa.String(length=255), nullable=False),
+        sa.Column("huella", sa.String(length=64), nullable=False),
+        sa.Column("estado_http", sa.Integer(), nullable=True),
+        sa.Column("cuerpo", sa.LargeBinary(), nullable=True),
+        sa.Column("creado_en", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("expira_en", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id_clave"),
+        sa.UniqueConstraint("usuario", "ruta", "clave", name="uq_clave_idempotencia"),
+    )
+    op.create_index(
+        "ix_clave_idempotencia_expira_en", "clave_idempotencia", ["expira_en"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_clave_idempotencia_expira_en", table_name="clave_idempotencia")
+    op.drop_table("clave_idempotencia")
@@ -0,0 +1,55 @@
+"""indices_busqueda_numero_guia
+
+Revision ID: f3a9b1c2d4e5
+Revises: d1a4c0b8e7f3
+Create Date: 2026-02-08
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "f3a9b1c2d4e5"
+down_revision = "d1a4c0b8e7f3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # pg_trgm y los operator classes son de Postgres; en otros motores no hay nada que hacer.
+    if op.get_context().dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY no bloquea escrituras sobre envio, pero no puede ir dentro de una transacción.
+    with op.get_context().autocommit_block():
+        # search_mode=substring: ILIKE '%q%'
+        op.create_index(
+            "ix_envio_numero_guia_trgm",
+            "envio",
+            ["numero_guia"],
+            postgresql_using="gin",
+            postgresql_ops={"numero_guia": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # search_mode=prefix: LIKE 'q%' (el índice único sigue la collation y no sirve para LIKE)
+        op.create_index(
+            "ix_envio_numero_guia_patron",
+            "envio",
+            ["numero_guia"],
+            postgresql_ops={"numero_guia": "varchar_pattern_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != "postgresql":
+        return
+
+    with op.get_context().autocommit_block():
+        for nombre in ("ix_envio_numero_guia_patron", "ix_envio_numero_guia_trgm"):
+            op.drop_index(nombre, table_name="envio", postgresql_concurrently=True, if_exists=True)
+    # La extensión se deja instalada: puede estar en uso por otros objetos.
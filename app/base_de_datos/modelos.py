@@ -11,3 +11,5 @@ from app.tipos_producto.models import TipoProducto  # noqa: F401
 from app.bodegas.models import Bodega  # noqa: F401
 from app.puertos.models import Puerto  # noqa: F401
 from app.envios.base.models import Envio, EnvioMaritimo, EnvioTerrestre  # noqa: F401
+from app.descuentos.models import RecalculoPrecios, ReglaDescuento  # noqa: F401
+from app.idempotencia.models import ClaveIdempotencia  # noqa: F401
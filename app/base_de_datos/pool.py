@@ -0,0 +1,145 @@
+"""Pools de conexiones medidos: espera al obtener conexión, timeouts y conexiones retenidas
+más de `db_leak_threshold_seconds` (posibles fugas de sesión)."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.base_de_datos.configuracion import settings
+
+
+class MedicionPool:
+    def __init__(self, umbral_fuga: float) -> None:
+        self.umbral_fuga = umbral_fuga
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        # ConnectionRecord -> (momento del checkout, hilo)
+        self._activas: dict[Any, tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def registrar_espera(self, segundos: float, *, timeout: bool = False) -> None:
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.espera_total += segundos
+            self.espera_max = max(self.espera_max, segundos)
+
+    def checkout(self, registro: Any) -> None:
+        with self._lock:
+            self._activas[registro] = (time.monotonic(), threading.current_thread().name)
+
+    def checkin(self, registro: Any) -> None:
+        with self._lock:
+            self._activas.pop(registro, None)
+
+    def fugas(self) -> list[dict]:
+        ahora = time.monotonic()
+        with self._lock:
+            activas = list(self._activas.values())
+        return sorted(
+            (
+                {"segundos": round(ahora - desde, 3), "hilo": hilo}
+                for desde, hilo in activas
+                if ahora - desde >= self.umbral_fuga
+            ),
+            key=lambda f: -f["segundos"],
+        )
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            promedio = self.espera_total / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "espera_total_ms": round(self.espera_total * 1000, 3),
+                "espera_promedio_ms": round(promedio * 1000, 3),
+                "espera_max_ms": round(self.espera_max * 1000, 3),
+            }
+
+
+class _PoolMedidoMixin:
+    """Mide `connect()`: tiempo hasta entregar una conexión (cola + conexión nueva o pre-ping)."""
+
+    medicion: MedicionPool | None = None
+
+    def connect(self):
+        if self.medicion is None:
+            return super().connect()
+        inicio = time.perf_counter()
+        try:
+            conexion = super().connect()
+        except exc.TimeoutError:
+            self.medicion.registrar_espera(time.perf_counter() - inicio, timeout=True)
+            raise
+        self.medicion.registrar_espera(time.perf_counter() - inicio)
+        return conexion
+
+    def recreate(self):
+        # engine.dispose() recrea el pool: se conservan las métricas acumuladas.
+        nuevo = super().recreate()
+        nuevo.medicion = self.medicion
+        return nuevo
+
+
+class PoolMedido(_PoolMedidoMixin, QueuePool):
+    pass
+
+
+class PoolMedidoAsync(_PoolMedidoMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_motores: dict[str, tuple[Engine, MedicionPool]] = {}
+
+
+def medir(engine: Engine, nombre: str) -> Engine:
+    """Registra `engine` (síncrono o `AsyncEngine.sync_engine`) para `estadisticas_pools`."""
+    medicion = MedicionPool(settings.db_leak_threshold_seconds)
+    if isinstance(engine.pool, _PoolMedidoMixin):
+        engine.pool.medicion = medicion
+
+    # Los eventos de pool registrados en el Engine sobreviven a dispose()/recreate().
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, registro, proxy) -> None:
+        medicion.checkout(registro)
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, registro) -> None:
+        medicion.checkin(registro)
+
+    _motores[nombre] = (engine, medicion)
+    return engine
+
+
+def estadisticas_pool(engine: Engine, medicion: MedicionPool | None = None) -> dict:
+    pool: Pool = engine.pool
+    datos: dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        datos.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            timeout=pool.timeout(),
+        )
+    if medicion is not None:
+        datos.update(medicion.estadisticas())
+        datos["umbral_fuga_s"] = medicion.umbral_fuga
+        datos["fugas"] = medicion.fugas()
+    return datos
+
+
+def estadisticas_pools() -> dict[str, dict]:
+    return {
+        nombre: estadisticas_pool(engine, medicion) for nombre, (engine, medicion) in _motores.items()
+    }
@@ -1,16 +1,182 @@
-from collections.abc import Generator
+import time
+from collections.abc import AsyncGenerator, Generator
+from contextvars import ContextVar
+from functools import cache
+from math import ceil
+from typing import Any
 
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
 
 from app.base_de_datos.configuracion import settings
+from app.base_de_datos.pool import PoolMedido, PoolMedidoAsync, medir
+from app.comun.cache import ORIGEN
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+
+def opciones_engine(url: str, *, es_async: bool = False) -> dict:
+    """kwargs de `create_engine`/`create_async_engine` según `settings` y el motor de `url`."""
+    u = make_url(url)
+    opciones: dict = {"pool_pre_ping": settings.db_pool_pre_ping}
+    if not (u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:")):
+        opciones.update(
+            poolclass=PoolMedidoAsync if es_async else PoolMedido,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+    if u.get_backend_name() == "postgresql" and u.get_driver_name() == "psycopg":
+        connect_args: dict = {"prepare_threshold": settings.db_prepare_threshold}
+        if settings.db_statement_timeout_ms > 0:
+            connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+        opciones["connect_args"] = connect_args
+    return opciones
+
+
+engine = medir(
+    create_engine(settings.database_url, **opciones_engine(settings.database_url)),
+    "primario",
+)
+
+
+def url_async(url: str) -> str:
+    """URL equivalente para `create_async_engine`.
+
+    psycopg 3 sirve para ambos modos con la misma URL; SQLite necesita aiosqlite.
+    """
+    if url.startswith("sqlite"):
+        return "sqlite+aiosqlite" + url[url.index(":") :]
+    return url
+
+
+@cache
+def motor_async(replica: bool = False) -> AsyncEngine | None:
+    """AsyncEngine del primario (o de la réplica; None si no hay), creado en el primer uso.
+
+    Solo lo piden las sesiones async (`DB_ASYNC=true`): con la stack síncrona no se crea y una
+    `DATABASE_URL` SQLite no necesita aiosqlite (que está solo en el extra dev).
+    """
+    url = settings.database_replica_url if replica else settings.database_url
+    if url is None:
+        return None
+    url = url_async(url)
+    motor = create_async_engine(url, **opciones_engine(url, es_async=True))
+    medir(motor.sync_engine, "replica_async" if replica else "async")
+    return motor
+
+
+engine_replica = None
+if settings.database_replica_url:
+    engine_replica = medir(
+        create_engine(
+            settings.database_replica_url, **opciones_engine(settings.database_replica_url)
+        ),
+        "replica",
+    )
+
+# Read-your-writes: tras un request que hizo commit en el primario, el cliente lee del primario
+# durante `read_your_writes_seconds`, hasta que la réplica lo alcance. La marca viaja en una
+# cookie (con el instante de vencimiento) para que la vea cualquier worker; sin ella se lee de
+# la réplica. Mientras está fijado, el cliente tampoco usa las caches compartidas (`ORIGEN`):
+# pueden tener datos anteriores a su escritura, leídos de la réplica o en otro worker.
+COOKIE_PRIMARIO = "leer_primario_hasta"
+_METODOS_LECTURA = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# [hubo commit] del request en curso; lo marcan las sesiones de `get_session*`.
+_commits: ContextVar[list[bool] | None] = ContextVar("commits_primario", default=None)
+
+
+def _registrar_commits(db: Session) -> None:
+    marca = _commits.get()
+    if marca is not None:
+
+        def marcar(_: Session) -> None:
+            marca[0] = True
+
+        event.listen(db, "after_commit", marcar)
+
+
+class FijarPrimarioMiddleware:
+    """Agrega la cookie de read-your-writes a las respuestas exitosas de requests que hicieron
+    commit en el primario (un POST que solo lee, como `/auth/token`, no fija al cliente).
+
+    Se escribe al empezar la respuesta, ya hecho el commit del handler, así que la ventana
+    cuenta desde ahí. Sin réplica configurada no hace nada.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if engine_replica is None or scope["type"] != "http" or scope["method"] in _METODOS_LECTURA:
+            await self.app(scope, receive, send)
+            return
+
+        marca = [False]
+        token = _commits.set(marca)
+
+        async def enviar(mensaje: dict) -> None:
+            if mensaje["type"] == "http.response.start" and mensaje["status"] < 400 and marca[0]:
+                segundos = settings.read_your_writes_seconds
+                cookie = (
+                    f"{COOKIE_PRIMARIO}={time.time() + segundos:.3f}; Max-Age={ceil(segundos)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                mensaje = {
+                    **mensaje,
+                    "headers": [*mensaje.get("headers", ()), (b"set-cookie", cookie.encode())],
+                }
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _commits.reset(token)
+
+
+def _origen_lectura(request: Request) -> str | None:
+    """"replica", "primario" o None: primario sin caches, por una escritura reciente."""
+    if engine_replica is None:
+        return "primario"
+    try:
+        hasta = float(request.cookies.get(COOKIE_PRIMARIO, 0))
+    except ValueError:
+        return "replica"
+    return "replica" if hasta <= time.time() else None
 
 
 def get_session() -> Generator[Session, None, None]:
+    """Sesión contra el primario."""
     db = Session(engine)
+    _registrar_commits(db)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_session_lectura(request: Request) -> Generator[Session, None, None]:
+    """Sesión para handlers de solo lectura: réplica si está configurada, salvo que el
+    cliente haya escrito hace menos de `read_your_writes_seconds`."""
+    origen = _origen_lectura(request)
+    db = Session(engine_replica if origen == "replica" else engine, info={ORIGEN: origen})
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_session_async() -> AsyncGenerator[AsyncSession, None]:
+    # expire_on_commit=False: en async no se puede recargar un atributo de forma implícita.
+    async with AsyncSession(motor_async(), expire_on_commit=False) as db:
+        _registrar_commits(db.sync_session)
+        yield db
+
+
+async def get_session_lectura_async(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    origen = _origen_lectura(request)
+    motor = motor_async(replica=origen == "replica")
+    async with AsyncSession(motor, expire_on_commit=False, info={ORIGEN: origen}) as db:
+        yield db
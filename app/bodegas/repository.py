@@ -1,7 +1,8 @@
-from sqlalchemy import Select, func, select
+from sqlalchemy import Select, select
 from sqlalchemy.orm import Session
 
 from app.bodegas.models import Bodega
+from app.comun.paginacion import ModoTotal, contar_total, invalidar_conteos
 
 
 def _base_query() -> Select[tuple[Bodega]]:
@@ -12,6 +13,7 @@ def crear(db: Session, *, nombre: str, direccion: str | None) -> Bodega:
     obj = Bodega(nombre=nombre, direccion=direccion)
     db.add(obj)
     db.commit()
+    invalidar_conteos("bodega")
     db.refresh(obj)
     return obj
 
@@ -20,22 +22,38 @@ def obtener_por_id(db: Session, bodega_id: int) -> Bodega | None:
     return db.scalar(_base_query().where(Bodega.id_bodega == bodega_id))
 
 
+def ids_existentes(db: Session, ids: set[int]) -> set[int]:
+    if not ids:
+        return set()
+    query = _base_query().with_only_columns(Bodega.id_bodega).where(Bodega.id_bodega.in_(ids))
+    return set(db.scalars(query))
+
+
 def listar(
     db: Session,
     *,
     page: int,
     page_size: int,
     q: str | None = None,
-) -> tuple[list[Bodega], int]:
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
+) -> tuple[list[Bodega], int | None]:
     query = _base_query()
     if q:
         like = f"%{q.strip()}%"
         query = query.where(Bodega.nombre.ilike(like))
 
-    total = db.scalar(select(func.count()).select_from(query.subquery())) or 0
+    total = contar_total(
+        db,
+        query,
+        tabla="bodega",
+        filtros=(("q", q),),
+        include_total=include_total,
+        total_mode=total_mode,
+    )
     offset = (page - 1) * page_size
     items = db.scalars(query.order_by(Bodega.id_bodega.asc()).offset(offset).limit(page_size)).all()
-    return items, int(total)
+    return items, total
 
 
 def actualizar(
@@ -52,6 +70,7 @@ def actualizar(
 
     db.add(bodega)
     db.commit()
+    invalidar_conteos("bodega")
     db.refresh(bodega)
     return bodega
 
@@ -60,3 +79,4 @@ def eliminar(db: Session, bodega: Bodega) -> None:
     bodega.activo = False
     db.add(bodega)
     db.commit()
+    invalidar_conteos("bodega")
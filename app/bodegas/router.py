@@ -9,7 +9,8 @@ from app.bodegas.service import (
     listar_bodegas,
     obtener_bodega,
 )
-from app.comun.dependencias import DBSession
+from app.comun.dependencias import DBSession, DBSessionLectura
+from app.comun.paginacion import ModoTotal
 
 router = APIRouter()
 
@@ -22,13 +23,22 @@ def crear(dto: CrearBodegaDTO, db: DBSession, _: dict = Depends(obtener_admin_ac
 
 @router.get("/bodegas", response_model=ListaBodegasDTO)
 def listar(
-    db: DBSession,
+    db: DBSessionLectura,
     _: dict = Depends(obtener_usuario_actual),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     q: str | None = Query(None, min_length=1),
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
 ) -> ListaBodegasDTO:
-    items, total = listar_bodegas(db, page=page, page_size=page_size, q=q)
+    items, total = listar_bodegas(
+        db,
+        page=page,
+        page_size=page_size,
+        q=q,
+        include_total=include_total,
+        total_mode=total_mode,
+    )
     return ListaBodegasDTO(
         page=page,
         page_size=page_size,
@@ -38,7 +48,7 @@ def listar(
 
 
 @router.get("/bodegas/{bodega_id}", response_model=BodegaDTO)
-def obtener(bodega_id: int, db: DBSession, _: dict = Depends(obtener_usuario_actual)) -> BodegaDTO:
+def obtener(bodega_id: int, db: DBSessionLectura, _: dict = Depends(obtener_usuario_actual)) -> BodegaDTO:
     obj = obtener_bodega(db, bodega_id)
     return BodegaDTO.model_validate(obj, from_attributes=True)
 
@@ -20,5 +20,5 @@ class BodegaDTO(BaseModel):
 class ListaBodegasDTO(BaseModel):
     page: int
     page_size: int
-    total: int
+    total: int | None
     items: list[BodegaDTO]
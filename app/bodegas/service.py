@@ -1,37 +1,97 @@
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.base_de_datos.configuracion import settings
 from app.bodegas import repository
-from app.bodegas.schemas import ActualizarBodegaDTO, CrearBodegaDTO
+from app.bodegas.schemas import ActualizarBodegaDTO, BodegaDTO, CrearBodegaDTO
+from app.comun.cache import CacheTTL, clave_por_origen
 from app.comun.excepciones import conflicto, no_encontrado
+from app.comun.paginacion import ModoTotal
+
+# Catálogo casi estático: se cachean DTOs (no objetos ORM, atados a la sesión) por id y las
+# páginas del listado sin filtros. Toda escritura por este servicio vacía la cache.
+_cache = CacheTTL(
+    "bodegas",
+    maxsize=settings.catalog_cache_size,
+    ttl=settings.catalog_cache_ttl_seconds,
+)
 
 
 def crear_bodega(db: Session, dto: CrearBodegaDTO):
     try:
-        return repository.crear(db, nombre=dto.nombre, direccion=dto.direccion)
+        obj = repository.crear(db, nombre=dto.nombre, direccion=dto.direccion)
     except IntegrityError as exc:
         raise conflicto("No se pudo crear la bodega") from exc
+    _cache.limpiar()
+    return obj
 
 
-def obtener_bodega(db: Session, bodega_id: int):
+def _obtener_modelo(db: Session, bodega_id: int):
     obj = repository.obtener_por_id(db, bodega_id)
     if obj is None:
         raise no_encontrado("Bodega no encontrada")
     return obj
 
 
-def listar_bodegas(db: Session, *, page: int, page_size: int, q: str | None = None):
-    return repository.listar(db, page=page, page_size=page_size, q=q)
+def obtener_bodega(db: Session, bodega_id: int) -> BodegaDTO:
+    clave = clave_por_origen(db, bodega_id)
+    dto = None if clave is None else _cache.obtener(clave)
+    if dto is None:
+        dto = BodegaDTO.model_validate(_obtener_modelo(db, bodega_id), from_attributes=True)
+        if clave is not None:
+            _cache.guardar(clave, dto)
+    return dto
+
+
+async def obtener_bodega_async(db: AsyncSession, bodega_id: int) -> BodegaDTO:
+    return await db.run_sync(obtener_bodega, bodega_id)
+
+
+def ids_bodegas_existentes(db: Session, ids: set[int]) -> set[int]:
+    """Subconjunto de `ids` que existen, en una sola consulta."""
+    return repository.ids_existentes(db, ids)
+
+
+def listar_bodegas(
+    db: Session,
+    *,
+    page: int,
+    page_size: int,
+    q: str | None = None,
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
+):
+    clave = clave_por_origen(db, "lista", page, page_size, include_total, total_mode)
+    usar_cache = q is None and clave is not None
+    if usar_cache and (pagina := _cache.obtener(clave)) is not None:
+        return pagina
+
+    items, total = repository.listar(
+        db,
+        page=page,
+        page_size=page_size,
+        q=q,
+        include_total=include_total,
+        total_mode=total_mode,
+    )
+    pagina = ([BodegaDTO.model_validate(o, from_attributes=True) for o in items], total)
+    if usar_cache:
+        _cache.guardar(clave, pagina)
+    return pagina
 
 
 def actualizar_bodega(db: Session, bodega_id: int, dto: ActualizarBodegaDTO):
-    obj = obtener_bodega(db, bodega_id)
+    obj = _obtener_modelo(db, bodega_id)
     try:
-        return repository.actualizar(db, obj, nombre=dto.nombre, direccion=dto.direccion)
+        obj = repository.actualizar(db, obj, nombre=dto.nombre, direccion=dto.direccion)
     except IntegrityError as exc:
         raise conflicto("No se pudo actualizar la bodega") from exc
+    _cache.limpiar()
+    return obj
 
 
 def eliminar_bodega(db: Session, bodega_id: int) -> None:
-    obj = obtener_bodega(db, bodega_id)
+    obj = _obtener_modelo(db, bodega_id)
     repository.eliminar(db, obj)
+    _cache.limpiar()
@@ -1,7 +1,8 @@
-from sqlalchemy import Select, func, select
+from sqlalchemy import Select, select
 from sqlalchemy.orm import Session
 
 from app.clientes.models import Cliente
+from app.comun.paginacion import ModoTotal, contar_total, invalidar_conteos
 
 
 def _base_query() -> Select[tuple[Cliente]]:
@@ -12,6 +13,7 @@ def crear(db: Session, *, nombre: str, email: str | None = None, telefono: str |
     obj = Cliente(nombre=nombre, email=email, telefono=telefono)
     db.add(obj)
     db.commit()
+    invalidar_conteos("cliente")
     db.refresh(obj)
     return obj
 
@@ -20,6 +22,13 @@ def obtener_por_id(db: Session, cliente_id: int) -> Cliente | None:
     return db.scalar(_base_query().where(Cliente.id_cliente == cliente_id))
 
 
+def ids_existentes(db: Session, ids: set[int]) -> set[int]:
+    if not ids:
+        return set()
+    query = _base_query().with_only_columns(Cliente.id_cliente).where(Cliente.id_cliente.in_(ids))
+    return set(db.scalars(query))
+
+
 def listar(
     db: Session,
     *,
@@ -27,7 +36,9 @@ def listar(
     page_size: int,
     q: str | None = None,
     email: str | None = None,
-) -> tuple[list[Cliente], int]:
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
+) -> tuple[list[Cliente], int | None]:
     query = _base_query()
 
     if q:
@@ -36,11 +47,18 @@ def listar(
     if email:
         query = query.where(Cliente.email == email)
 
-    total = db.scalar(select(func.count()).select_from(query.subquery())) or 0
+    total = contar_total(
+        db,
+        query,
+        tabla="cliente",
+        filtros=(("q", q), ("email", email)),
+        include_total=include_total,
+        total_mode=total_mode,
+    )
 
     offset = (page - 1) * page_size
     items = db.scalars(query.order_by(Cliente.id_cliente.asc()).offset(offset).limit(page_size)).all()
-    return items, int(total)
+    return items, total
 
 
 def actualizar(
@@ -60,6 +78,7 @@ def actualizar(
 
     db.add(cliente)
     db.commit()
+    invalidar_conteos("cliente")
     db.refresh(cliente)
     return cliente
 
@@ -68,3 +87,4 @@ def eliminar(db: Session, cliente: Cliente) -> None:
     cliente.activo = False
     db.add(cliente)
     db.commit()
+    invalidar_conteos("cliente")
@@ -9,7 +9,8 @@ from app.clientes.service import (
     listar_clientes,
     obtener_cliente,
 )
-from app.comun.dependencias import DBSession
+from app.comun.dependencias import DBSession, DBSessionLectura
+from app.comun.paginacion import ModoTotal
 
 router = APIRouter()
 
@@ -22,14 +23,24 @@ def crear(dto: CrearClienteDTO, db: DBSession, _: dict = Depends(obtener_usuario
 
 @router.get("/clientes", response_model=ListaClientesDTO)
 def listar(
-    db: DBSession,
+    db: DBSessionLectura,
     _: dict = Depends(obtener_usuario_actual),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     q: str | None = Query(None, min_length=1),
     email: str | None = None,
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
 ) -> ListaClientesDTO:
-    items, total = listar_clientes(db, page=page, page_size=page_size, q=q, email=email)
+    items, total = listar_clientes(
+        db,
+        page=page,
+        page_size=page_size,
+        q=q,
+        email=email,
+        include_total=include_total,
+        total_mode=total_mode,
+    )
     return ListaClientesDTO(
         page=page,
         page_size=page_size,
@@ -39,7 +50,7 @@ def listar(
 
 
 @router.get("/clientes/{cliente_id}", response_model=ClienteDTO)
-def obtener(cliente_id: int, db: DBSession, _: dict = Depends(obtener_usuario_actual)) -> ClienteDTO:
+def obtener(cliente_id: int, db: DBSessionLectura, _: dict = Depends(obtener_usuario_actual)) -> ClienteDTO:
     obj = obtener_cliente(db, cliente_id)
     return ClienteDTO.model_validate(obj, from_attributes=True)
 
@@ -25,5 +25,5 @@ class ClienteDTO(BaseModel):
 class ListaClientesDTO(BaseModel):
     page: int
     page_size: int
-    total: int
+    total: int | None
     items: list[ClienteDTO]
@@ -1,8 +1,10 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.clientes import repository
 from app.clientes.schemas import ActualizarClienteDTO, CrearClienteDTO
 from app.comun.excepciones import no_encontrado
+from app.comun.paginacion import ModoTotal
 
 
 def crear_cliente(db: Session, dto: CrearClienteDTO):
@@ -21,6 +23,15 @@ def obtener_cliente(db: Session, cliente_id: int):
     return obj
 
 
+async def obtener_cliente_async(db: AsyncSession, cliente_id: int):
+    return await db.run_sync(obtener_cliente, cliente_id)
+
+
+def ids_clientes_existentes(db: Session, ids: set[int]) -> set[int]:
+    """Subconjunto de `ids` que existen, en una sola consulta."""
+    return repository.ids_existentes(db, ids)
+
+
 def listar_clientes(
     db: Session,
     *,
@@ -28,6 +39,8 @@ def listar_clientes(
     page_size: int,
     q: str | None = None,
     email: str | None = None,
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
 ):
     return repository.listar(
         db,
@@ -35,6 +48,8 @@ def listar_clientes(
         page_size=page_size,
         q=q,
         email=email,
+        include_total=include_total,
+        total_mode=total_mode,
     )
 
 
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+_caches: dict[str, "CacheTTL"] = {}
+
+# Clave de `Session.info` con el origen de lo que lee la sesión (ver `clave_por_origen`).
+ORIGEN = "origen_cache"
+
+
+class CacheTTL:
+    """Cache en memoria (por proceso) con expiración por entrada y desalojo LRU.
+
+    Cada entrada vive `ttl` segundos (o el ttl explícito pasado a `guardar`); al superar
+    `maxsize` se descarta la entrada usada hace más tiempo. Es seguro entre hilos.
+    """
+
+    def __init__(self, nombre: str, *, maxsize: int, ttl: float) -> None:
+        self.nombre = nombre
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._datos: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        _caches[nombre] = self
+
+    def obtener(self, clave: Hashable, default: Any = None) -> Any:
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None or entrada[0] <= ahora:
+                if entrada is not None:
+                    del self._datos[clave]
+                self.misses += 1
+                return default
+            self._datos.move_to_end(clave)
+            self.hits += 1
+            return entrada[1]
+
+    def guardar(self, clave: Hashable, valor: Any, *, ttl: float | None = None) -> None:
+        vida = self.ttl if ttl is None else ttl
+        if vida <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + vida, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maxsize:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, clave: Hashable) -> None:
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def invalidar_si(self, predicado: Callable[[Hashable], bool]) -> None:
+        with self._lock:
+            for clave in [c for c in self._datos if predicado(c)]:
+                del self._datos[clave]
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "entradas": len(self._datos),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def limpiar_caches() -> None:
+    for cache in _caches.values():
+        cache.limpiar()
+
+
+def estadisticas_caches() -> dict[str, dict]:
+    return {nombre: cache.estadisticas() for nombre, cache in _caches.items()}
+
+
+def clave_por_origen(db: Any, *partes: Hashable) -> tuple | None:
+    """Clave de cache para datos leídos con `db`, separada por origen ("primario" o "replica",
+    según `Session.info`): lo leído de una réplica atrasada no se sirve a quien lee del primario.
+    None si la sesión no debe usar caches compartidas (cliente recién escrito)."""
+    origen = db.info.get(ORIGEN, "primario")
+    return None if origen is None else (*partes, origen)
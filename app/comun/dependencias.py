@@ -1,8 +1,18 @@
 from typing import Annotated
 
 from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.base_de_datos.sesion import get_session
+from app.base_de_datos.sesion import (
+    get_session,
+    get_session_async,
+    get_session_lectura,
+    get_session_lectura_async,
+)
 
 DBSession = Annotated[Session, Depends(get_session)]
+DBSessionAsync = Annotated[AsyncSession, Depends(get_session_async)]
+# Handlers de solo lectura: pueden ir a la réplica (ver `get_session_lectura`).
+DBSessionLectura = Annotated[Session, Depends(get_session_lectura)]
+DBSessionLecturaAsync = Annotated[AsyncSession, Depends(get_session_lectura_async)]
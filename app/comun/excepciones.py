@@ -1,6 +1,10 @@
 from fastapi import HTTPException, status
 
 
+def solicitud_invalida(detalle: str = "Solicitud inválida") -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detalle)
+
+
 def no_autorizado(detalle: str = "No autorizado") -> HTTPException:
     return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detalle)
 
@@ -19,3 +23,17 @@ def conflicto(detalle: str = "Conflicto") -> HTTPException:
 
 def error_servidor(detalle: str = "Error interno del servidor") -> HTTPException:
     return HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=detalle)
+
+
+def servicio_no_disponible(
+    detalle: str = "Servicio no disponible", reintentar_en: int = 1
+) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detalle,
+        headers={"Retry-After": str(reintentar_en)},
+    )
+
+
+def no_procesable(detalle: str = "Entidad no procesable") -> HTTPException:
+    return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail=detalle)
@@ -1,4 +1,14 @@
+import base64
+import binascii
+import json
+from typing import Literal
+
 from pydantic import BaseModel, Field
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.orm import Session
+
+from app.base_de_datos.configuracion import settings
+from app.comun.cache import CacheTTL, clave_por_origen
 
 
 class Paginacion(BaseModel):
@@ -9,4 +19,84 @@ class Paginacion(BaseModel):
 class RespuestaPaginada(BaseModel):
     page: int
     page_size: int
-    total: int
+    total: int | None
+
+
+def codificar_cursor(clave: str, valor: int) -> str:
+    """Cursor opaco para paginación keyset: guarda la clave de orden y el último valor visto."""
+    raw = json.dumps({"k": clave, "v": valor}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str, *, clave: str) -> int:
+    """Inverso de `codificar_cursor`. Lanza ValueError si el cursor no es válido para `clave`."""
+    pad = "=" * ((4 - (len(cursor) % 4)) % 4)
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + pad))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError("Cursor inválido") from exc
+
+    if not isinstance(data, dict) or data.get("k") != clave:
+        raise ValueError("Cursor inválido")
+    valor = data.get("v")
+    if not isinstance(valor, int) or isinstance(valor, bool):
+        raise ValueError("Cursor inválido")
+    return valor
+
+
+ModoTotal = Literal["exact", "estimated"]
+
+_conteos = CacheTTL("conteos", maxsize=settings.count_cache_size, ttl=settings.count_cache_ttl_seconds)
+
+
+def contar_total(
+    db: Session,
+    query: Select,
+    *,
+    tabla: str,
+    filtros: tuple[tuple[str, object], ...],
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
+) -> int | None:
+    """Total de filas de un listado.
+
+    - `include_total=False`: no cuenta (retorna None).
+    - `total_mode="estimated"` sin filtros: usa las estadísticas del planner (Postgres);
+      si no hay estadísticas disponibles cae al conteo exacto. `reltuples` es de la tabla
+      entera, así que cualquier WHERE (también el de `activo` en los catálogos) usa el exacto.
+    - Conteo exacto: se guarda unos segundos por `(tabla, filtros)` y origen de la sesión
+      (`clave_por_origen`); las escrituras del repositorio lo invalidan con `invalidar_conteos`.
+    """
+    if not include_total:
+        return None
+
+    sin_filtros = query.whereclause is None and all(valor is None for _, valor in filtros)
+    if total_mode == "estimated" and sin_filtros:
+        estimado = _estimar_filas(db, tabla)
+        if estimado is not None:
+            return estimado
+
+    clave = clave_por_origen(db, tabla, filtros)
+    total = None if clave is None else _conteos.obtener(clave)
+    if total is None:
+        total = int(db.scalar(select(func.count()).select_from(query.subquery())) or 0)
+        if clave is not None:
+            _conteos.guardar(clave, total)
+    return total
+
+
+def invalidar_conteos(tabla: str) -> None:
+    _conteos.invalidar_si(lambda clave: clave[0] == tabla)
+
+
+def _estimar_filas(db: Session, tabla: str) -> int | None:
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    estimado = db.scalar(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:tabla)"),
+        {"tabla": tabla},
+    )
+    # reltuples = -1 (o NULL) si la tabla nunca fue analizada.
+    if estimado is None or estimado < 0:
+        return None
+    return int(estimado)
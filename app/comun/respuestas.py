@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def _default(valor: Any) -> Any:
+    # Decimal como string ("1000.00"), igual que lo serializa pydantic en los DTOs.
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+class RespuestaJSON(JSONResponse):
+    """JSONResponse que serializa con orjson.
+
+    Produce los mismos bytes que `JSONResponse` (JSON compacto, UTF-8 sin escapar) y además
+    acepta `Decimal`, `date` y `datetime` sin pasar por `jsonable_encoder`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
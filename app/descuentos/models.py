@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import (
+    Boolean,
+    CheckConstraint,
+    Date,
+    DateTime,
+    ForeignKey,
+    Integer,
+    Numeric,
+    String,
+    true,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.base_de_datos.base import Base
+
+
+class ReglaDescuento(Base):
+    """Tramo de descuento por volumen (ver `app.envios.base.discount_service`)."""
+
+    __tablename__ = "regla_descuento"
+
+    id_regla: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    tipo_envio: Mapped[str] = mapped_column(String(10), nullable=False)
+    cantidad_minima: Mapped[int] = mapped_column(Integer, nullable=False)
+    tasa: Mapped[Decimal] = mapped_column(Numeric(5, 4), nullable=False)
+
+    # Ámbito: como mucho uno informado; ninguno = regla general del tipo de envío.
+    id_cliente: Mapped[int | None] = mapped_column(ForeignKey("cliente.id_cliente"), nullable=True)
+    id_tipo_producto: Mapped[int | None] = mapped_column(
+        ForeignKey("tipo_producto.id_tipo_producto"), nullable=True
+    )
+    id_bodega: Mapped[int | None] = mapped_column(ForeignKey("bodega.id_bodega"), nullable=True)
+    id_puerto: Mapped[int | None] = mapped_column(ForeignKey("puerto.id_puerto"), nullable=True)
+
+    activo: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=True, server_default=true()
+    )
+
+    __table_args__ = (
+        CheckConstraint("tipo_envio IN ('TERRESTRE', 'MARITIMO')", name="chk_regla_tipo_envio"),
+        CheckConstraint("cantidad_minima >= 1", name="chk_regla_cantidad_minima"),
+        CheckConstraint("tasa >= 0 AND tasa <= 1", name="chk_regla_tasa"),
+    )
+
+
+class RecalculoPrecios(Base):
+    """Trabajo de recálculo de precios (`app.descuentos.recalculo`); la fila es su checkpoint."""
+
+    __tablename__ = "recalculo_precios"
+
+    id_recalculo: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    estado: Mapped[str] = mapped_column(String(12), nullable=False)
+    # Solo envíos con fecha_entrega desde esta fecha (abiertos); NULL = todos.
+    fecha_entrega_desde: Mapped[date | None] = mapped_column(Date, nullable=True)
+
+    # Rango de id_envio fijado al crear el trabajo; los envíos con id <= ultimo_id ya se
+    # recalcularon (se avanza en la misma transacción que cada bloque).
+    id_desde: Mapped[int] = mapped_column(Integer, nullable=False)
+    id_hasta: Mapped[int] = mapped_column(Integer, nullable=False)
+    ultimo_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    actualizados: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[str | None] = mapped_column(String(500), nullable=True)
+
+    iniciado_en: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    actualizado_en: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        CheckConstraint(
+            "estado IN ('EN_CURSO', 'COMPLETADO', 'FALLIDO')", name="chk_recalculo_estado"
+        ),
+    )
@@ -0,0 +1,279 @@
+"""Recálculo de `descuento`/`precio_final` de los envíos con las reglas de descuento vigentes.
+
+En lugar de pasar envío por envío por `actualizar_envio`, cada bloque de `id_envio` es un
+único UPDATE ... FROM: la tasa sale de un CASE generado desde las reglas compiladas (mismo
+orden de prioridad que `calcular_tasa_descuento`) y el redondeo half-even se hace en enteros
+(centavos), así que el resultado es el mismo que al crear el envío. `precio_final` se
+escribe como `precio_base - descuento` (constraint `chk_envio_precio_final`) y solo se
+tocan las filas cuyo descuento cambia.
+
+La fila de `recalculo_precios` es el checkpoint: se avanza en la misma transacción que cada
+bloque, de modo que un trabajo interrumpido se reanuda desde el último bloque confirmado.
+Si dos procesos ejecutan el mismo trabajo, el que no logra avanzar el checkpoint se detiene.
+
+    python -m app.descuentos.recalculo [--fecha-entrega-desde 2026-01-01 | --todos]
+        [--reanudar ID] [--chunk 5000] [--pausa 0.05]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from collections.abc import Callable
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import (
+    BigInteger,
+    ColumnElement,
+    Engine,
+    Numeric,
+    and_,
+    case,
+    cast,
+    func,
+    literal,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.orm import Session
+
+from app.base_de_datos.configuracion import settings
+from app.descuentos import repository
+from app.descuentos.models import RecalculoPrecios
+from app.envios.base.centavos import ESCALA_TASA
+from app.envios.base.discount_service import Compiladas, compilar
+from app.envios.base.models import Envio, EnvioMaritimo, EnvioTerrestre
+
+_AMBITOS = ("id_cliente", "id_tipo_producto", "id_bodega", "id_puerto")
+_CENTAVO = Decimal("0.01")
+
+
+def _ahora() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+def _tasa(reglas: Compiladas, tipos: dict, cantidad: ColumnElement, ambitos: dict):
+    """CASE con la tasa en diezmilésimos: por tipo de envío, ámbitos en orden de prioridad y,
+    dentro de cada regla, del tramo más alto al más bajo; el primer WHEN que se cumple gana."""
+    cuando = []
+    for tipo, es_tipo in tipos.items():
+        for ambito in _AMBITOS:
+            for (tipo_regla, ambito_regla, valor), tramos in reglas.especificas.items():
+                if (tipo_regla, ambito_regla) != (tipo, ambito):
+                    continue
+                minimos, _, tasas = tramos
+                for minimo, tasa in reversed(list(zip(minimos, tasas))):
+                    cuando.append(
+                        (and_(es_tipo, ambitos[ambito] == valor, cantidad >= minimo), tasa)
+                    )
+        minimos, _, tasas = reglas.generales.get(tipo, ((), (), ()))
+        for minimo, tasa in reversed(list(zip(minimos, tasas))):
+            cuando.append((and_(es_tipo, cantidad >= minimo), tasa))
+    if not cuando:
+        return literal(0, BigInteger)
+    return case(*cuando, else_=0)
+
+
+def _redondear_half_even(numerador: ColumnElement, divisor: int) -> ColumnElement:
+    """`centavos.redondear_half_even` en SQL (división entera en Postgres y SQLite)."""
+    cociente = numerador // divisor
+    doble = 2 * (numerador % divisor)
+    sube = or_(doble > divisor, and_(doble == divisor, cociente % 2 == 1))
+    return cociente + case((sube, 1), else_=0)
+
+
+def _centavos(monto: ColumnElement) -> ColumnElement:
+    return cast(func.round(monto * 100), BigInteger)
+
+
+def sentencia_bloque(reglas: Compiladas, desde: int, hasta: int, fecha: date | None):
+    """UPDATE de los envíos con `desde < id_envio <= hasta` (y fecha_entrega >= `fecha`) cuyo
+    descuento cambia."""
+    envio = Envio.__table__
+    e = envio.alias("e")
+    t = EnvioTerrestre.__table__.alias("t")
+    m = EnvioMaritimo.__table__.alias("m")
+    tipos = {"TERRESTRE": t.c.id_envio.is_not(None), "MARITIMO": m.c.id_envio.is_not(None)}
+    ambitos = {
+        "id_cliente": e.c.id_cliente,
+        "id_tipo_producto": e.c.id_tipo_producto,
+        "id_bodega": t.c.id_bodega,
+        "id_puerto": m.c.id_puerto,
+    }
+    filtros = [e.c.id_envio > desde, e.c.id_envio <= hasta]
+    if fecha is not None:
+        filtros.append(e.c.fecha_entrega >= fecha)
+    base = (
+        select(
+            e.c.id_envio,
+            _centavos(e.c.precio_base).label("precio_base_c"),
+            _tasa(reglas, tipos, e.c.cantidad, ambitos).label("tasa"),
+        )
+        .select_from(
+            e.outerjoin(t, t.c.id_envio == e.c.id_envio).outerjoin(
+                m, m.c.id_envio == e.c.id_envio
+            )
+        )
+        .where(*filtros)
+        .subquery("base")
+    )
+    calc = select(
+        base.c.id_envio,
+        base.c.precio_base_c,
+        _redondear_half_even(base.c.precio_base_c * base.c.tasa, ESCALA_TASA).label(
+            "descuento_c"
+        ),
+    ).subquery("calc")
+
+    centavo = literal(_CENTAVO, Numeric(3, 2))
+    return (
+        update(envio)
+        .values(
+            descuento=calc.c.descuento_c * centavo,
+            precio_final=(calc.c.precio_base_c - calc.c.descuento_c) * centavo,
+        )
+        .where(
+            envio.c.id_envio == calc.c.id_envio,
+            _centavos(envio.c.descuento) != calc.c.descuento_c,
+        )
+    )
+
+
+def crear(db: Session, *, fecha_entrega_desde: date | None) -> RecalculoPrecios:
+    """Registra un trabajo sobre los envíos existentes ahora (rango de ids fijo)."""
+    envio = Envio.__table__
+    ids = envio.c.id_envio
+    minimo, maximo = db.execute(select(func.min(ids), func.max(ids))).one()
+    ahora = _ahora()
+    trabajo = RecalculoPrecios(
+        estado="EN_CURSO",
+        fecha_entrega_desde=fecha_entrega_desde,
+        id_desde=(minimo or 1) - 1,
+        id_hasta=maximo or 0,
+        ultimo_id=(minimo or 1) - 1,
+        actualizados=0,
+        iniciado_en=ahora,
+        actualizado_en=ahora,
+    )
+    db.add(trabajo)
+    db.commit()
+    db.refresh(trabajo)
+    return trabajo
+
+
+def ejecutar(
+    bind: Engine,
+    id_recalculo: int,
+    *,
+    chunk: int | None = None,
+    pausa: float | None = None,
+    al_avanzar: Callable[[RecalculoPrecios], None] | None = None,
+) -> None:
+    """Procesa los bloques pendientes del trabajo, un commit por bloque.
+
+    Con una sesión propia (se llama en segundo plano). Un error deja el trabajo FALLIDO con
+    el mensaje; se puede reanudar desde el checkpoint.
+    """
+    chunk = chunk or settings.recalculo_chunk
+    pausa = settings.recalculo_pausa_seconds if pausa is None else pausa
+    with Session(bind, expire_on_commit=False) as db:
+        trabajo = db.get(RecalculoPrecios, id_recalculo)
+        if trabajo is None or trabajo.estado == "COMPLETADO":
+            return
+        # Compiladas localmente: no cambia las reglas instaladas en el proceso.
+        reglas = compilar(repository.activas(db))
+        try:
+            while trabajo.ultimo_id < trabajo.id_hasta:
+                desde = trabajo.ultimo_id
+                hasta = min(desde + chunk, trabajo.id_hasta)
+                sentencia = sentencia_bloque(reglas, desde, hasta, trabajo.fecha_entrega_desde)
+                actualizados = db.execute(sentencia).rowcount
+                avance = db.execute(
+                    update(RecalculoPrecios)
+                    .where(
+                        RecalculoPrecios.id_recalculo == id_recalculo,
+                        RecalculoPrecios.ultimo_id == desde,
+                    )
+                    .values(
+                        ultimo_id=hasta,
+                        actualizados=RecalculoPrecios.actualizados + actualizados,
+                        actualizado_en=_ahora(),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                if avance.rowcount != 1:
+                    # Otro proceso avanzó el checkpoint: este bloque ya no le corresponde.
+                    db.rollback()
+                    return
+                db.commit()
+                db.refresh(trabajo)
+                if al_avanzar is not None:
+                    al_avanzar(trabajo)
+                if pausa > 0 and trabajo.ultimo_id < trabajo.id_hasta:
+                    time.sleep(pausa)
+            trabajo.estado = "COMPLETADO"
+            trabajo.actualizado_en = _ahora()
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            trabajo.estado = "FALLIDO"
+            trabajo.error = str(exc)[:500]
+            trabajo.actualizado_en = _ahora()
+            db.commit()
+            raise
+
+
+def reanudar(db: Session, trabajo: RecalculoPrecios) -> RecalculoPrecios:
+    trabajo.estado = "EN_CURSO"
+    trabajo.error = None
+    trabajo.actualizado_en = _ahora()
+    db.commit()
+    db.refresh(trabajo)
+    return trabajo
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    alcance = parser.add_mutually_exclusive_group()
+    alcance.add_argument(
+        "--fecha-entrega-desde", type=date.fromisoformat, help="por defecto, la fecha de hoy"
+    )
+    alcance.add_argument("--todos", action="store_true", help="incluye envíos ya entregados")
+    alcance.add_argument("--reanudar", type=int, metavar="ID", help="trabajo a reanudar")
+    parser.add_argument("--chunk", type=int, default=settings.recalculo_chunk)
+    parser.add_argument("--pausa", type=float, default=settings.recalculo_pausa_seconds)
+    args = parser.parse_args(argv)
+
+    from app.base_de_datos import modelos  # noqa: F401
+    from app.base_de_datos.sesion import engine
+
+    with Session(engine) as db:
+        if args.reanudar is not None:
+            trabajo = db.get(RecalculoPrecios, args.reanudar)
+            if trabajo is None or trabajo.estado == "COMPLETADO":
+                print(f"error: no hay un trabajo {args.reanudar} pendiente", file=sys.stderr)
+                return 1
+            trabajo = reanudar(db, trabajo)
+        else:
+            desde = None if args.todos else (args.fecha_entrega_desde or date.today())
+            trabajo = crear(db, fecha_entrega_desde=desde)
+        id_recalculo = trabajo.id_recalculo
+
+    def al_avanzar(t: RecalculoPrecios) -> None:
+        total = t.id_hasta - t.id_desde
+        hecho = t.ultimo_id - t.id_desde
+        print(
+            f"trabajo {t.id_recalculo}: id_envio {t.ultimo_id}/{t.id_hasta} "
+            f"({100 * hecho / total:.1f}%), actualizados={t.actualizados}",
+            file=sys.stderr,
+        )
+
+    ejecutar(engine, id_recalculo, chunk=args.chunk, pausa=args.pausa, al_avanzar=al_avanzar)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from app.comun.paginacion import ModoTotal, contar_total, invalidar_conteos
+from app.descuentos.models import RecalculoPrecios, ReglaDescuento
+
+
+def _base_query() -> Select[tuple[ReglaDescuento]]:
+    return select(ReglaDescuento).where(ReglaDescuento.activo.is_(True))
+
+
+def crear(db: Session, **valores) -> ReglaDescuento:
+    obj = ReglaDescuento(**valores)
+    db.add(obj)
+    db.commit()
+    invalidar_conteos("regla_descuento")
+    db.refresh(obj)
+    return obj
+
+
+def obtener_por_id(db: Session, regla_id: int) -> ReglaDescuento | None:
+    return db.scalar(_base_query().where(ReglaDescuento.id_regla == regla_id))
+
+
+def activas(db: Session) -> list[ReglaDescuento]:
+    """Todas las reglas activas, en orden de creación."""
+    return list(db.scalars(_base_query().order_by(ReglaDescuento.id_regla.asc())))
+
+
+def listar(
+    db: Session,
+    *,
+    page: int,
+    page_size: int,
+    tipo_envio: str | None = None,
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
+) -> tuple[list[ReglaDescuento], int | None]:
+    query = _base_query()
+    if tipo_envio is not None:
+        query = query.where(ReglaDescuento.tipo_envio == tipo_envio)
+
+    total = contar_total(
+        db,
+        query,
+        tabla="regla_descuento",
+        filtros=(("tipo_envio", tipo_envio),),
+        include_total=include_total,
+        total_mode=total_mode,
+    )
+    offset = (page - 1) * page_size
+    query = query.order_by(ReglaDescuento.id_regla.asc()).offset(offset).limit(page_size)
+    return db.scalars(query).all(), total
+
+
+def actualizar(
+    db: Session,
+    regla: ReglaDescuento,
+    *,
+    cantidad_minima: int | None = None,
+    tasa: Decimal | None = None,
+) -> ReglaDescuento:
+    if cantidad_minima is not None:
+        regla.cantidad_minima = cantidad_minima
+    if tasa is not None:
+        regla.tasa = tasa
+
+    db.add(regla)
+    db.commit()
+    db.refresh(regla)
+    return regla
+
+
+def eliminar(db: Session, regla: ReglaDescuento) -> None:
+    regla.activo = False
+    db.add(regla)
+    db.commit()
+    invalidar_conteos("regla_descuento")
+
+
+def recalculo_en_curso(db: Session) -> RecalculoPrecios | None:
+    return db.scalar(
+        select(RecalculoPrecios).where(RecalculoPrecios.estado == "EN_CURSO").limit(1)
+    )
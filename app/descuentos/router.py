@@ -0,0 +1,143 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, Query
+
+from app.autenticacion.dependencies import obtener_admin_actual
+from app.comun.dependencias import DBSession
+from app.comun.paginacion import ModoTotal
+from app.descuentos import recalculo
+from app.descuentos.models import RecalculoPrecios
+from app.descuentos.schemas import (
+    ActualizarReglaDescuentoDTO,
+    CrearRecalculoPreciosDTO,
+    CrearReglaDescuentoDTO,
+    ListaReglasDescuentoDTO,
+    RecalculoPreciosDTO,
+    ReglaDescuentoDTO,
+)
+from app.descuentos.service import (
+    actualizar_regla,
+    crear_regla,
+    eliminar_regla,
+    iniciar_recalculo,
+    listar_reglas,
+    obtener_recalculo,
+    obtener_regla,
+    reanudar_recalculo,
+)
+from app.envios.schemas import TipoEnvio
+
+router = APIRouter()
+
+
+@router.post("/reglas-descuento", response_model=ReglaDescuentoDTO)
+def crear(
+    dto: CrearReglaDescuentoDTO, db: DBSession, _: dict = Depends(obtener_admin_actual)
+) -> ReglaDescuentoDTO:
+    obj = crear_regla(db, dto)
+    return ReglaDescuentoDTO.model_validate(obj, from_attributes=True)
+
+
+# Las lecturas van al primario: tras una escritura el admin ve la regla que acaba de cambiar.
+@router.get("/reglas-descuento", response_model=ListaReglasDescuentoDTO)
+def listar(
+    db: DBSession,
+    _: dict = Depends(obtener_admin_actual),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    tipo_envio: TipoEnvio | None = None,
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
+) -> ListaReglasDescuentoDTO:
+    items, total = listar_reglas(
+        db,
+        page=page,
+        page_size=page_size,
+        tipo_envio=tipo_envio,
+        include_total=include_total,
+        total_mode=total_mode,
+    )
+    return ListaReglasDescuentoDTO(
+        page=page,
+        page_size=page_size,
+        total=total,
+        items=[ReglaDescuentoDTO.model_validate(o, from_attributes=True) for o in items],
+    )
+
+
+@router.get("/reglas-descuento/{regla_id}", response_model=ReglaDescuentoDTO)
+def obtener(
+    regla_id: int, db: DBSession, _: dict = Depends(obtener_admin_actual)
+) -> ReglaDescuentoDTO:
+    obj = obtener_regla(db, regla_id)
+    return ReglaDescuentoDTO.model_validate(obj, from_attributes=True)
+
+
+@router.patch("/reglas-descuento/{regla_id}", response_model=ReglaDescuentoDTO)
+def actualizar(
+    regla_id: int,
+    dto: ActualizarReglaDescuentoDTO,
+    db: DBSession,
+    _: dict = Depends(obtener_admin_actual),
+) -> ReglaDescuentoDTO:
+    obj = actualizar_regla(db, regla_id, dto)
+    return ReglaDescuentoDTO.model_validate(obj, from_attributes=True)
+
+
+@router.delete("/reglas-descuento/{regla_id}")
+def eliminar(regla_id: int, db: DBSession, _: dict = Depends(obtener_admin_actual)) -> dict:
+    eliminar_regla(db, regla_id)
+    return {"status": "ok"}
+
+
+def _recalculo_dto(obj: RecalculoPrecios) -> RecalculoPreciosDTO:
+    total = obj.id_hasta - obj.id_desde
+    progreso = 1.0 if total <= 0 else (obj.ultimo_id - obj.id_desde) / total
+    return RecalculoPreciosDTO(
+        id_recalculo=obj.id_recalculo,
+        estado=obj.estado,
+        fecha_entrega_desde=obj.fecha_entrega_desde,
+        id_desde=obj.id_desde,
+        id_hasta=obj.id_hasta,
+        ultimo_id=obj.ultimo_id,
+        progreso=round(progreso, 4),
+        actualizados=obj.actualizados,
+        error=obj.error,
+        iniciado_en=obj.iniciado_en,
+        actualizado_en=obj.actualizado_en,
+    )
+
+
+# El trabajo corre en segundo plano con su propia sesión (un commit por bloque); el progreso
+# se consulta con GET y, si se interrumpe, se reanuda desde el último bloque confirmado.
+@router.post("/recalculos-precios", response_model=RecalculoPreciosDTO, status_code=202)
+def iniciar_recalculo_precios(
+    dto: CrearRecalculoPreciosDTO,
+    background_tasks: BackgroundTasks,
+    db: DBSession,
+    _: dict = Depends(obtener_admin_actual),
+) -> RecalculoPreciosDTO:
+    obj = iniciar_recalculo(db, dto)
+    background_tasks.add_task(recalculo.ejecutar, db.get_bind(), obj.id_recalculo)
+    return _recalculo_dto(obj)
+
+
+@router.get("/recalculos-precios/{recalculo_id}", response_model=RecalculoPreciosDTO)
+def obtener_recalculo_precios(
+    recalculo_id: int, db: DBSession, _: dict = Depends(obtener_admin_actual)
+) -> RecalculoPreciosDTO:
+    return _recalculo_dto(obtener_recalculo(db, recalculo_id))
+
+
+@router.post(
+    "/recalculos-precios/{recalculo_id}/reanudar",
+    response_model=RecalculoPreciosDTO,
+    status_code=202,
+)
+def reanudar_recalculo_precios(
+    recalculo_id: int,
+    background_tasks: BackgroundTasks,
+    db: DBSession,
+    _: dict = Depends(obtener_admin_actual),
+) -> RecalculoPreciosDTO:
+    obj = reanudar_recalculo(db, recalculo_id)
+    background_tasks.add_task(recalculo.ejecutar, db.get_bind(), obj.id_recalculo)
+    return _recalculo_dto(obj)
@@ -0,0 +1,74 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.envios.schemas import TipoEnvio
+
+
+class CrearReglaDescuentoDTO(BaseModel):
+    tipo_envio: TipoEnvio
+    cantidad_minima: int = Field(ge=1)
+    tasa: Decimal = Field(ge=0, le=1, decimal_places=4)
+
+    # Ámbito (opcional, como mucho uno)
+    id_cliente: int | None = None
+    id_tipo_producto: int | None = None
+    id_bodega: int | None = None
+    id_puerto: int | None = None
+
+    @model_validator(mode="after")
+    def validar_ambito(self) -> "CrearReglaDescuentoDTO":
+        ambitos = (self.id_cliente, self.id_tipo_producto, self.id_bodega, self.id_puerto)
+        if sum(a is not None for a in ambitos) > 1:
+            raise ValueError(
+                "Informa como mucho uno de id_cliente, id_tipo_producto, id_bodega, id_puerto"
+            )
+        if self.id_bodega is not None and self.tipo_envio != "TERRESTRE":
+            raise ValueError("id_bodega solo aplica para TERRESTRE")
+        if self.id_puerto is not None and self.tipo_envio != "MARITIMO":
+            raise ValueError("id_puerto solo aplica para MARITIMO")
+        return self
+
+
+class ActualizarReglaDescuentoDTO(BaseModel):
+    cantidad_minima: int | None = Field(default=None, ge=1)
+    tasa: Decimal | None = Field(default=None, ge=0, le=1, decimal_places=4)
+
+
+class ReglaDescuentoDTO(BaseModel):
+    id_regla: int
+    tipo_envio: TipoEnvio
+    cantidad_minima: int
+    tasa: Decimal
+    id_cliente: int | None = None
+    id_tipo_producto: int | None = None
+    id_bodega: int | None = None
+    id_puerto: int | None = None
+
+
+class ListaReglasDescuentoDTO(BaseModel):
+    page: int
+    page_size: int
+    total: int | None
+    items: list[ReglaDescuentoDTO]
+
+
+class CrearRecalculoPreciosDTO(BaseModel):
+    # Solo envíos abiertos: fecha_entrega desde esta fecha (por defecto hoy); null = todos.
+    fecha_entrega_desde: date | None = Field(default_factory=date.today)
+
+
+class RecalculoPreciosDTO(BaseModel):
+    id_recalculo: int
+    estado: str
+    fecha_entrega_desde: date | None
+    id_desde: int
+    id_hasta: int
+    ultimo_id: int
+    # Fracción del rango de id_envio ya procesada (0 a 1)
+    progreso: float
+    actualizados: int
+    error: str | None
+    iniciado_en: datetime
+    actualizado_en: datetime
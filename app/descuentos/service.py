@@ -0,0 +1,122 @@
+"""Reglas de descuento por volumen: CRUD y carga en el motor de `discount_service`.
+
+El cálculo por envío nunca consulta la BD: usa las reglas compiladas en memoria. Se recargan
+al escribir por este servicio (en este proceso) y, para ver cambios hechos desde otros
+procesos, cuando pasan `DESCUENTOS_REFRESH_SECONDS` desde la última carga.
+"""
+
+import time
+
+from sqlalchemy.orm import Session
+
+from app.base_de_datos.configuracion import settings
+from app.bodegas.service import obtener_bodega
+from app.clientes.service import obtener_cliente
+from app.comun.excepciones import conflicto, no_encontrado
+from app.comun.paginacion import ModoTotal
+from app.descuentos import recalculo, repository
+from app.descuentos.models import RecalculoPrecios
+from app.descuentos.schemas import (
+    ActualizarReglaDescuentoDTO,
+    CrearRecalculoPreciosDTO,
+    CrearReglaDescuentoDTO,
+)
+from app.envios.base.discount_service import instalar_reglas
+from app.puertos.service import obtener_puerto
+from app.tipos_producto.service import obtener_tipo_producto
+
+_cargadas_en: float | None = None
+
+
+def recargar_reglas(db: Session) -> None:
+    global _cargadas_en
+    instalar_reglas(repository.activas(db))
+    _cargadas_en = time.monotonic()
+
+
+def asegurar_reglas(db: Session) -> None:
+    """Carga las reglas si nunca se cargaron o si la última carga ya venció."""
+    vencidas = _cargadas_en is not None and (
+        time.monotonic() - _cargadas_en > settings.descuentos_refresh_seconds
+    )
+    if _cargadas_en is None or vencidas:
+        recargar_reglas(db)
+
+
+def crear_regla(db: Session, dto: CrearReglaDescuentoDTO):
+    if dto.id_cliente is not None:
+        obtener_cliente(db, dto.id_cliente)
+    if dto.id_tipo_producto is not None:
+        obtener_tipo_producto(db, dto.id_tipo_producto)
+    if dto.id_bodega is not None:
+        obtener_bodega(db, dto.id_bodega)
+    if dto.id_puerto is not None:
+        obtener_puerto(db, dto.id_puerto)
+
+    obj = repository.crear(db, **dto.model_dump())
+    recargar_reglas(db)
+    return obj
+
+
+def obtener_regla(db: Session, regla_id: int):
+    obj = repository.obtener_por_id(db, regla_id)
+    if obj is None:
+        raise no_encontrado("Regla de descuento no encontrada")
+    return obj
+
+
+def listar_reglas(
+    db: Session,
+    *,
+    page: int,
+    page_size: int,
+    tipo_envio: str | None = None,
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
+):
+    return repository.listar(
+        db,
+        page=page,
+        page_size=page_size,
+        tipo_envio=tipo_envio,
+        include_total=include_total,
+        total_mode=total_mode,
+    )
+
+
+def actualizar_regla(db: Session, regla_id: int, dto: ActualizarReglaDescuentoDTO):
+    obj = obtener_regla(db, regla_id)
+    obj = repository.actualizar(db, obj, cantidad_minima=dto.cantidad_minima, tasa=dto.tasa)
+    recargar_reglas(db)
+    return obj
+
+
+def eliminar_regla(db: Session, regla_id: int) -> None:
+    obj = obtener_regla(db, regla_id)
+    repository.eliminar(db, obj)
+    recargar_reglas(db)
+
+
+def iniciar_recalculo(db: Session, dto: CrearRecalculoPreciosDTO) -> RecalculoPrecios:
+    """Registra el trabajo; quien llama lo ejecuta con `recalculo.ejecutar` (en segundo plano)."""
+    en_curso = repository.recalculo_en_curso(db)
+    if en_curso is not None:
+        raise conflicto(
+            f"El recálculo {en_curso.id_recalculo} sigue en curso; consúltalo o reanúdalo"
+        )
+    return recalculo.crear(db, fecha_entrega_desde=dto.fecha_entrega_desde)
+
+
+def obtener_recalculo(db: Session, recalculo_id: int) -> RecalculoPrecios:
+    obj = db.get(RecalculoPrecios, recalculo_id)
+    if obj is None:
+        raise no_encontrado("Recálculo de precios no encontrado")
+    return obj
+
+
+def reanudar_recalculo(db: Session, recalculo_id: int) -> RecalculoPrecios:
+    """Vuelve a poner en curso un trabajo interrumpido o fallido, desde su checkpoint."""
+    obj = obtener_recalculo(db, recalculo_id)
+    if obj.estado == "COMPLETADO":
+        raise conflicto("El recálculo ya está completado")
+    return recalculo.reanudar(db, obj)
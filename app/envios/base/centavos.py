@@ -0,0 +1,43 @@
+"""Montos en centavos enteros y tasas en diezmilésimos.
+
+Aritmética entera con el mismo resultado que los `Decimal` cuantizados a 2 decimales
+(NUMERIC(10,2)) y redondeo half-even, el de `Decimal.quantize` con el contexto por defecto.
+La usan la cotización en bloque (`app.envios.cotizacion`, con arrays de NumPy), la
+importación CSV y, en SQL, el recálculo de precios (`app.descuentos.recalculo`).
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import TypeVar
+
+# Tasas NUMERIC(5,4): 0.0525 -> 525
+ESCALA_TASA = 10_000
+
+_N = TypeVar("_N")
+
+
+def redondear_half_even(numerador: _N, divisor: int) -> _N:
+    """`numerador / divisor` (>= 0) redondeado al entero más cercano, empates al par."""
+    cociente, resto = divmod(numerador, divisor)
+    doble = 2 * resto
+    return cociente + ((doble > divisor) | ((doble == divisor) & (cociente % 2 == 1)))
+
+
+def a_centavos(monto: Decimal) -> int:
+    """`monto.quantize(Decimal("0.01"))` en centavos; round() de un Decimal es half-even."""
+    return round(monto.scaleb(2))
+
+
+def a_texto(centavos: int) -> str:
+    enteros, resto = divmod(centavos, 100)
+    return f"{enteros}.{resto:02d}"
+
+
+def tasa_a_diezmilesimos(tasa: Decimal) -> int:
+    """Lanza ValueError si `tasa` tiene más de 4 decimales (no cabe en NUMERIC(5,4))."""
+    escalada = Decimal(tasa).scaleb(4)
+    if escalada != escalada.to_integral_value():
+        raise ValueError(f"La tasa de descuento {tasa} tiene más de 4 decimales")
+    return int(escalada)
+
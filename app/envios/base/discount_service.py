@@ -1,27 +1,150 @@
 from __future__ import annotations
 
+from bisect import bisect_right
+from collections.abc import Iterable
 from decimal import Decimal
-from typing import Literal
+from typing import Literal, NamedTuple
 
+from app.envios.base import centavos
 
 TipoEnvio = Literal["TERRESTRE", "MARITIMO"]
 
+_CERO = Decimal("0")
 
-def calcular_tasa_descuento(*, cantidad: int, tipo_envio: TipoEnvio) -> Decimal:
-    """Reglas del enunciado.
+# Ámbitos de una regla, del más específico al menos; una regla sin ninguno es general.
+_AMBITOS = ("id_cliente", "id_tipo_producto", "id_bodega", "id_puerto")
 
-    - Si cantidad > 10:
-      - TERRESTRE: 5%
-      - MARITIMO: 3%
-    - Caso contrario: 0%
+
+class Regla(NamedTuple):
+    """Tramo de descuento: desde `cantidad_minima` unidades aplica `tasa`.
+
+    Como mucho uno de los ids de ámbito viene informado; sin ninguno es la regla general
+    del tipo de envío. Los modelos `ReglaDescuento` tienen los mismos atributos.
+    """
+
+    tipo_envio: str
+    cantidad_minima: int
+    tasa: Decimal
+    id_cliente: int | None = None
+    id_tipo_producto: int | None = None
+    id_bodega: int | None = None
+    id_puerto: int | None = None
+
+
+# Reglas del enunciado: si cantidad > 10, TERRESTRE 5% y MARITIMO 3%; caso contrario 0%.
+# Las reglas generales de la tabla `regla_descuento` para un tipo de envío las reemplazan.
+REGLAS_POR_DEFECTO = (
+    Regla("TERRESTRE", 11, Decimal("0.05")),
+    Regla("MARITIMO", 11, Decimal("0.03")),
+)
+
+_Clave = tuple[str, str, int]
+# (cantidades mínimas ordenadas, tasas, tasas en diezmilésimos para los cálculos vectorizados)
+_Tramos = tuple[list[int], list[Decimal], list[int]]
+
+
+class Compiladas(NamedTuple):
+    # (tipo_envio, ámbito, id) -> tramos; vacío en el caso habitual (solo reglas generales).
+    especificas: dict[_Clave, _Tramos]
+    generales: dict[str, _Tramos]
+
+
+def _tramos(por_minimo: dict[int, Decimal]) -> _Tramos:
+    minimos = sorted(por_minimo)
+    tasas = [por_minimo[m] for m in minimos]
+    return minimos, tasas, [centavos.tasa_a_diezmilesimos(t) for t in tasas]
+
+
+def compilar(reglas: Iterable) -> Compiladas:
+    """Agrupa las reglas por (tipo_envio, ámbito, id) en arrays de tramos ordenados.
+
+    Si dos reglas tienen la misma clave y cantidad mínima, vale la última. Lanza ValueError
+    si una tasa tiene más de 4 decimales.
     """
-    if cantidad <= 10:
-        return Decimal("0")
-    return Decimal("0.05") if tipo_envio == "TERRESTRE" else Decimal("0.03")
+    especificas: dict[_Clave, dict[int, Decimal]] = {}
+    generales: dict[str, dict[int, Decimal]] = {}
+    for regla in reglas:
+        ambito = next((a for a in _AMBITOS if getattr(regla, a) is not None), None)
+        if ambito is None:
+            tramos = generales.setdefault(regla.tipo_envio, {})
+        else:
+            clave = (regla.tipo_envio, ambito, getattr(regla, ambito))
+            tramos = especificas.setdefault(clave, {})
+        tramos[regla.cantidad_minima] = Decimal(regla.tasa)
+
+    de_tabla = set(generales)
+    for regla in REGLAS_POR_DEFECTO:
+        if regla.tipo_envio not in de_tabla:
+            generales.setdefault(regla.tipo_envio, {})[regla.cantidad_minima] = regla.tasa
+    return Compiladas(
+        {clave: _tramos(t) for clave, t in especificas.items()},
+        {tipo: _tramos(t) for tipo, t in generales.items()},
+    )
+
+
+# Se reemplaza entero (asignación atómica) al recargar: los lectores nunca ven una mezcla.
+_reglas: Compiladas = compilar(())
+
+
+def instalar_reglas(reglas: Iterable) -> None:
+    """Compila `reglas` y las deja activas para los cálculos siguientes de este proceso."""
+    global _reglas
+    _reglas = compilar(reglas)
+
 
+def reglas_compiladas() -> Compiladas:
+    """Reglas activas en este proceso, para evaluarlas en bloque (ver `app.envios.cotizacion`)."""
+    return _reglas
 
-def calcular_monto_descuento(*, precio_base: Decimal, cantidad: int, tipo_envio: TipoEnvio) -> Decimal:
+
+def calcular_tasa_descuento(
+    *,
+    cantidad: int,
+    tipo_envio: TipoEnvio,
+    id_cliente: int | None = None,
+    id_tipo_producto: int | None = None,
+    id_bodega: int | None = None,
+    id_puerto: int | None = None,
+) -> Decimal:
+    """Tasa del tramo que corresponde a `cantidad` en la regla más específica que aplique.
+
+    Se prueba por cliente, tipo de producto, bodega, puerto y por último la regla general del
+    tipo de envío; la primera con un tramo alcanzado por `cantidad` decide. Sin tramo: 0%.
+    Sin consultas a BD: búsqueda binaria sobre las reglas compiladas.
+    """
+    reglas = _reglas
+    if reglas.especificas:
+        for ambito, valor in zip(_AMBITOS, (id_cliente, id_tipo_producto, id_bodega, id_puerto)):
+            if valor is None:
+                continue
+            tramos = reglas.especificas.get((tipo_envio, ambito, valor))
+            if tramos is not None and (i := bisect_right(tramos[0], cantidad)):
+                return tramos[1][i - 1]
+    tramos = reglas.generales.get(tipo_envio)
+    if tramos is not None and (i := bisect_right(tramos[0], cantidad)):
+        return tramos[1][i - 1]
+    return _CERO
+
+
+def calcular_monto_descuento(
+    *,
+    precio_base: Decimal,
+    cantidad: int,
+    tipo_envio: TipoEnvio,
+    id_cliente: int | None = None,
+    id_tipo_producto: int | None = None,
+    id_bodega: int | None = None,
+    id_puerto: int | None = None,
+) -> Decimal:
     """Retorna el monto de descuento (no el porcentaje)."""
-    tasa = calcular_tasa_descuento(cantidad=cantidad, tipo_envio=tipo_envio)
+    tasa = calcular_tasa_descuento(
+        cantidad=cantidad,
+        tipo_envio=tipo_envio,
+        id_cliente=id_cliente,
+        id_tipo_producto=id_tipo_producto,
+        id_bodega=id_bodega,
+        id_puerto=id_puerto,
+    )
     q = Decimal("0.01")
     return (precio_base * tasa).quantize(q)
+
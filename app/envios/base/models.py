@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import date
 from decimal import Decimal
 
-from sqlalchemy import Date, ForeignKey, Integer, Numeric, String
+from sqlalchemy import Date, ForeignKey, Index, Integer, Numeric, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.base_de_datos.base import Base
@@ -25,6 +25,21 @@ class Envio(Base):
     precio_final: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
     numero_guia: Mapped[str] = mapped_column(String(10), unique=True, index=True, nullable=False)
 
+    # Índices de búsqueda por numero_guia, solo Postgres (migración f3a9b1c2d4e5).
+    __table_args__ = (
+        Index(
+            "ix_envio_numero_guia_trgm",
+            "numero_guia",
+            postgresql_using="gin",
+            postgresql_ops={"numero_guia": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_envio_numero_guia_patron",
+            "numero_guia",
+            postgresql_ops={"numero_guia": "varchar_pattern_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
 
 class EnvioTerrestre(Base):
     __tablename__ = "envio_terrestre"
@@ -0,0 +1,205 @@
+"""Cotización en bloque (`POST /envios/cotizar/batch`) sin un `Decimal` por operación.
+
+Los precios se llevan a centavos enteros y las tasas a diezmilésimos (`app.envios.base.centavos`);
+la tasa de cada ítem sale de las mismas reglas compiladas que `calcular_monto_descuento`
+(búsqueda binaria vectorizada con `np.searchsorted`) y el descuento se redondea half-even a
+centavos, igual que `Decimal.quantize`. El resultado es idéntico al de crear el envío.
+
+El cálculo no toca la BD; solo se consulta para recargar las reglas de descuento cuando
+vencieron (`asegurar_reglas`). Con `COTIZACION_PROCESOS` > 0 los lotes de más de
+`COTIZACION_CHUNK` ítems se reparten en un pool de procesos, que se cierra al apagar la app.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import threading
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import NamedTuple
+
+import numpy as np
+
+from app.base_de_datos.configuracion import settings
+from app.envios.base.centavos import ESCALA_TASA, a_centavos, a_texto, redondear_half_even
+from app.envios.base.discount_service import Compiladas, reglas_compiladas
+from app.envios.schemas import ItemCotizacion
+
+_AMBITOS = ("id_cliente", "id_tipo_producto", "id_bodega", "id_puerto")
+_TIPOS = ("TERRESTRE", "MARITIMO")
+
+_Tramos = tuple[np.ndarray, np.ndarray]
+
+
+class ReglasEnteras(NamedTuple):
+    """`Compiladas` con las tasas en diezmilésimos, en arrays (se envía a otros procesos)."""
+
+    # (tipo_envio, ámbito) -> {id: tramos}
+    especificas: dict[tuple[str, str], dict[int, _Tramos]]
+    generales: dict[str, _Tramos]
+
+
+def _tramos_enteros(minimos: list[int], _: list[Decimal], tasas: list[int]) -> _Tramos:
+    return np.array(minimos, dtype=np.int64), np.array(tasas, dtype=np.int64)
+
+
+def reglas_enteras(reglas: Compiladas) -> ReglasEnteras:
+    especificas: dict[tuple[str, str], dict[int, _Tramos]] = {}
+    for (tipo, ambito, valor), tramos in reglas.especificas.items():
+        especificas.setdefault((tipo, ambito), {})[valor] = _tramos_enteros(*tramos)
+    generales = {tipo: _tramos_enteros(*tramos) for tipo, tramos in reglas.generales.items()}
+    return ReglasEnteras(especificas, generales)
+
+
+_enteras: tuple[Compiladas, ReglasEnteras] | None = None
+
+
+def _reglas_actuales() -> ReglasEnteras:
+    # Se convierten una vez por cada versión de las reglas compiladas.
+    global _enteras
+    reglas = reglas_compiladas()
+    if _enteras is None or _enteras[0] is not reglas:
+        _enteras = (reglas, reglas_enteras(reglas))
+    return _enteras[1]
+
+
+def _grupos(valores: np.ndarray) -> Iterator[tuple[int, np.ndarray]]:
+    """`(valor, posiciones)` por cada valor distinto de `valores`."""
+    orden = np.argsort(valores, kind="stable")
+    unicos, inicios = np.unique(valores[orden], return_index=True)
+    yield from zip(unicos.tolist(), np.split(orden, inicios[1:]))
+
+
+def _aplicar(
+    tasas: np.ndarray,
+    resueltas: np.ndarray,
+    posiciones: np.ndarray,
+    cantidad: np.ndarray,
+    tramos: _Tramos,
+) -> None:
+    minimos, tasas_tramo = tramos
+    indice = np.searchsorted(minimos, cantidad[posiciones], side="right") - 1
+    alcanzado = indice >= 0
+    posiciones = posiciones[alcanzado]
+    tasas[posiciones] = tasas_tramo[indice[alcanzado]]
+    resueltas[posiciones] = True
+
+
+def calcular_descuentos(
+    reglas: ReglasEnteras,
+    terrestre: np.ndarray,
+    cantidad: np.ndarray,
+    precio_base: np.ndarray,
+    ambitos: dict[str, np.ndarray],
+) -> np.ndarray:
+    """Descuento en centavos por ítem. `ambitos`: ids por ámbito, -1 donde no se informó."""
+    tasas = np.zeros(len(cantidad), dtype=np.int64)
+    resueltas = np.zeros(len(cantidad), dtype=bool)
+    for es_terrestre, tipo in zip((True, False), _TIPOS):
+        del_tipo = terrestre == es_terrestre
+        # Mismo orden de prioridad que `calcular_tasa_descuento`: el primer ámbito con un
+        # tramo alcanzado decide; el resto cae a la regla general del tipo.
+        for ambito in _AMBITOS:
+            por_id = reglas.especificas.get((tipo, ambito))
+            if not por_id or ambito not in ambitos:
+                continue
+            pendientes = np.flatnonzero(del_tipo & ~resueltas & (ambitos[ambito] >= 0))
+            for valor, posiciones in _grupos(ambitos[ambito][pendientes]):
+                if (tramos := por_id.get(valor)) is not None:
+                    _aplicar(tasas, resueltas, pendientes[posiciones], cantidad, tramos)
+        if (tramos := reglas.generales.get(tipo)) is not None:
+            _aplicar(tasas, resueltas, np.flatnonzero(del_tipo & ~resueltas), cantidad, tramos)
+    return redondear_half_even(precio_base * tasas, ESCALA_TASA)
+
+
+def _columnas(items: Sequence[ItemCotizacion], reglas: ReglasEnteras) -> dict:
+    n = len(items)
+    columnas = {
+        "terrestre": np.fromiter((i["tipo_envio"] == "TERRESTRE" for i in items), bool, n),
+        "cantidad": np.fromiter((i["cantidad"] for i in items), np.int64, n),
+        "precio_base": np.fromiter((a_centavos(i["precio_base"]) for i in items), np.int64, n),
+        "ambitos": {},
+    }
+    # Solo se arman las columnas de ámbitos con reglas específicas (normalmente ninguna).
+    for ambito in {ambito for _, ambito in reglas.especificas}:
+        columnas["ambitos"][ambito] = np.fromiter(
+            (-1 if (v := i.get(ambito)) is None else v for i in items), np.int64, n
+        )
+    return columnas
+
+
+_executor: ProcessPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+def _obtener_executor() -> ProcessPoolExecutor:
+    # Sin fork: el servidor tiene hilos y un fork puede heredar locks tomados.
+    global _executor
+    with _lock:
+        if _executor is None:
+            metodos = multiprocessing.get_all_start_methods()
+            metodo = "forkserver" if "forkserver" in metodos else "spawn"
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.cotizacion_procesos,
+                mp_context=multiprocessing.get_context(metodo),
+            )
+        return _executor
+
+
+def cerrar_executor() -> None:
+    """Detiene el pool de procesos, si se llegó a crear."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(cancel_futures=True)
+
+
+def _descuentos(reglas: ReglasEnteras, columnas: dict) -> np.ndarray:
+    n = len(columnas["cantidad"])
+    chunk = settings.cotizacion_chunk
+    if settings.cotizacion_procesos <= 0 or n <= chunk:
+        return calcular_descuentos(reglas, **columnas)
+
+    def parte(desde: int) -> dict:
+        hasta = desde + chunk
+        return {
+            "terrestre": columnas["terrestre"][desde:hasta],
+            "cantidad": columnas["cantidad"][desde:hasta],
+            "precio_base": columnas["precio_base"][desde:hasta],
+            "ambitos": {a: ids[desde:hasta] for a, ids in columnas["ambitos"].items()},
+        }
+
+    executor = _obtener_executor()
+    futuros = [
+        executor.submit(calcular_descuentos, reglas, **parte(desde)) for desde in range(0, n, chunk)
+    ]
+    return np.concatenate([futuro.result() for futuro in futuros])
+
+
+def _a_texto(centavos: np.ndarray) -> list[str]:
+    enteros, resto = np.divmod(centavos, 100)
+    return [f"{e}.{r:02d}" for e, r in zip(enteros.tolist(), resto.tolist())]
+
+
+def _total(centavos: np.ndarray) -> str:
+    return a_texto(int(centavos.sum()))
+
+
+def cotizar_lote(items: Sequence[ItemCotizacion]) -> dict:
+    """Precios de cada ítem y totales, con la forma de `CotizacionLoteDTO` (montos como texto)."""
+    reglas = _reglas_actuales()
+    columnas = _columnas(items, reglas)
+    precio_base = columnas["precio_base"]
+    descuento = _descuentos(reglas, columnas)
+    precio_final = precio_base - descuento
+    return {
+        "total_precio_base": _total(precio_base),
+        "total_descuento": _total(descuento),
+        "total_precio_final": _total(precio_final),
+        "items": [
+            {"precio_base": b, "descuento": d, "precio_final": f}
+            for b, d, f in zip(_a_texto(precio_base), _a_texto(descuento), _a_texto(precio_final))
+        ],
+    }
@@ -0,0 +1,105 @@
+"""Serialización en streaming de envíos (CSV / NDJSON, opcionalmente gzip)."""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zlib
+from collections.abc import Iterable, Iterator
+from datetime import date
+from decimal import Decimal
+from typing import Any, Literal
+
+FormatoExportacion = Literal["csv", "ndjson"]
+
+CAMPOS = (
+    "id_envio",
+    "id_cliente",
+    "id_tipo_producto",
+    "cantidad",
+    "fecha_registro",
+    "fecha_entrega",
+    "precio_base",
+    "descuento",
+    "precio_final",
+    "numero_guia",
+    "tipo_envio",
+    "id_bodega",
+    "placa_vehiculo",
+    "id_puerto",
+    "numero_flota",
+)
+
+# Filas acumuladas antes de emitir un chunk: evita un write() por fila hacia el socket.
+_FILAS_POR_CHUNK = 500
+
+
+def _valores(fila: Any) -> tuple:
+    tipo_envio = "TERRESTRE" if fila.id_envio_terrestre is not None else "MARITIMO"
+    return (
+        fila.id_envio,
+        fila.id_cliente,
+        fila.id_tipo_producto,
+        fila.cantidad,
+        fila.fecha_registro,
+        fila.fecha_entrega,
+        fila.precio_base,
+        fila.descuento,
+        fila.precio_final,
+        fila.numero_guia,
+        tipo_envio,
+        fila.id_bodega,
+        fila.placa_vehiculo,
+        fila.id_puerto,
+        fila.numero_flota,
+    )
+
+
+def _json_default(valor: Any) -> str:
+    # Mismo formato que la API: Decimal como string ("1000.00") y fechas ISO.
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, date):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def generar_csv(filas: Iterable[Any]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CAMPOS)
+
+    pendientes = 0
+    for fila in filas:
+        writer.writerow(_valores(fila))
+        pendientes += 1
+        if pendientes >= _FILAS_POR_CHUNK:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+def generar_ndjson(filas: Iterable[Any]) -> Iterator[bytes]:
+    lineas: list[str] = []
+    for fila in filas:
+        registro = dict(zip(CAMPOS, _valores(fila)))
+        lineas.append(json.dumps(registro, default=_json_default, ensure_ascii=False))
+        if len(lineas) >= _FILAS_POR_CHUNK:
+            yield ("\n".join(lineas) + "\n").encode("utf-8")
+            lineas.clear()
+
+    if lineas:
+        yield ("\n".join(lineas) + "\n").encode("utf-8")
+
+
+def comprimir_gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compresor = zlib.compressobj(wbits=31)  # 16 + MAX_WBITS => contenedor gzip
+    for chunk in chunks:
+        datos = compresor.compress(chunk)
+        if datos:
+            yield datos
+    yield compresor.flush()
@@ -0,0 +1,416 @@
+"""Importación masiva de envíos desde CSV.
+
+Flujo: CSV -> tabla staging temporal -> validación set-based en SQL -> INSERT ... SELECT hacia
+`envio` / `envio_terrestre` / `envio_maritimo`, todo en una transacción. En Postgres la carga
+a staging usa COPY (psycopg); en otros motores (SQLite en tests) INSERT multi-fila por bloques.
+
+Uso por línea de comandos:
+
+    python -m app.envios.importacion envios.csv --reporte rechazos.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import heapq
+import sys
+import tempfile
+from collections.abc import Iterable, Iterator
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from operator import itemgetter
+from typing import TextIO
+
+from pydantic import ValidationError
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Date,
+    Index,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table,
+    and_,
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+    update,
+)
+from sqlalchemy.orm import Session
+
+from app.bodegas.models import Bodega
+from app.clientes.models import Cliente
+from app.comun.paginacion import invalidar_conteos
+from app.envios.base import centavos
+from app.envios.base.models import Envio, EnvioMaritimo, EnvioTerrestre
+from app.envios.schemas import CrearEnvioDTO, RechazoImportacionDTO, ResultadoImportacionDTO
+from app.puertos.models import Puerto
+from app.tipos_producto.models import TipoProducto
+
+COLUMNAS_CSV = (
+    "id_cliente",
+    "id_tipo_producto",
+    "cantidad",
+    "fecha_registro",
+    "fecha_entrega",
+    "precio_base",
+    "descuento",
+    "precio_final",
+    "numero_guia",
+    "tipo_envio",
+    "id_bodega",
+    "placa_vehiculo",
+    "id_puerto",
+    "numero_flota",
+)
+
+# Los montos viajan en centavos (enteros) para que la validación
+# precio_final = precio_base - descuento sea exacta en cualquier motor.
+_staging = Table(
+    "envio_staging",
+    MetaData(),
+    Column("linea", Integer, primary_key=True, autoincrement=False),
+    Column("id_cliente", Integer),
+    Column("id_tipo_producto", Integer),
+    Column("cantidad", Integer),
+    Column("fecha_registro", Date),
+    Column("fecha_entrega", Date),
+    Column("precio_base_c", BigInteger),
+    Column("descuento_c", BigInteger),
+    Column("precio_final_c", BigInteger),
+    Column("numero_guia", String(10)),
+    Column("tipo_envio", String(10)),
+    Column("id_bodega", Integer),
+    Column("placa_vehiculo", String(6)),
+    Column("id_puerto", Integer),
+    Column("numero_flota", String(8)),
+    Column("error", String(200)),
+    Index("ix_envio_staging_numero_guia", "numero_guia"),
+    prefixes=["TEMPORARY"],
+)
+_COLUMNAS_STAGING = tuple(c.name for c in _staging.columns if c.name != "error")
+
+_BLOQUE_INSERT = 500
+_CENTAVO = Decimal("0.01")
+# Rechazos de formato retenidos en memoria antes de pasar a disco.
+_RECHAZOS_MAX_MEMORIA = 1024 * 1024
+
+
+def _centavos(valor: str | None, campo: str) -> int:
+    if valor is None or not valor.strip():
+        raise ValueError(f"{campo}: requerido")
+    try:
+        monto = centavos.a_centavos(Decimal(valor.strip()))
+    except (InvalidOperation, ValueError, OverflowError) as exc:  # texto, NaN, Infinity
+        raise ValueError(f"{campo}: monto inválido") from exc
+    if monto < 0:
+        raise ValueError(f"{campo}: no puede ser negativo")
+    return monto
+
+
+def _parsear(linea: int, registro: dict[str, str | None]) -> tuple:
+    """Valida formato de una fila (mismas reglas que POST /envios) y la deja tipada."""
+    datos = {k: v.strip() for k, v in registro.items() if k in COLUMNAS_CSV and v and v.strip()}
+    try:
+        dto = CrearEnvioDTO.model_validate(datos)
+    except ValidationError as exc:
+        err = exc.errors()[0]
+        campo = ".".join(str(p) for p in err["loc"])
+        raise ValueError(f"{campo}: {err['msg']}" if campo else err["msg"]) from exc
+
+    return (
+        linea,
+        dto.id_cliente,
+        dto.id_tipo_producto,
+        dto.cantidad,
+        dto.fecha_registro,
+        dto.fecha_entrega,
+        centavos.a_centavos(dto.precio_base),
+        _centavos(registro.get("descuento"), "descuento"),
+        _centavos(registro.get("precio_final"), "precio_final"),
+        dto.numero_guia,
+        dto.tipo_envio,
+        dto.id_bodega,
+        dto.placa_vehiculo,
+        dto.id_puerto,
+        dto.numero_flota,
+    )
+
+
+class _RechazosFormato:
+    """Filas rechazadas al parsear, en orden de línea. Se escriben a un archivo temporal (a
+    disco si crece) para no retener en memoria los rechazos de un archivo de millones de filas."""
+
+    def __init__(self) -> None:
+        self.total = 0
+        self._archivo = tempfile.SpooledTemporaryFile(
+            max_size=_RECHAZOS_MAX_MEMORIA, mode="w+", newline="", encoding="utf-8"
+        )
+        self._writer = csv.writer(self._archivo)
+
+    def agregar(self, linea: int, numero_guia: str | None, error: str) -> None:
+        self._writer.writerow((linea, numero_guia or "", error))
+        self.total += 1
+
+    def __iter__(self) -> Iterator[tuple[int, str | None, str]]:
+        self._archivo.seek(0)
+        for linea, guia, error in csv.reader(self._archivo):
+            yield int(linea), guia or None, error
+
+    def cerrar(self) -> None:
+        self._archivo.close()
+
+
+def _filas_validas(lector: csv.DictReader, rechazos: _RechazosFormato) -> Iterator[tuple]:
+    for linea, registro in enumerate(lector, start=2):  # línea 1 = encabezado
+        try:
+            yield _parsear(linea, registro)
+        except ValueError as exc:
+            rechazos.agregar(linea, registro.get("numero_guia") or None, str(exc))
+
+
+def _cargar_copy(db: Session, filas: Iterable[tuple]) -> None:
+    columnas = ", ".join(_COLUMNAS_STAGING)
+    cursor = db.connection().connection.driver_connection.cursor()
+    try:
+        with cursor.copy(f"COPY {_staging.name} ({columnas}) FROM STDIN") as copy:
+            for fila in filas:
+                copy.write_row(fila)
+    finally:
+        cursor.close()
+
+
+def _cargar_insert(db: Session, filas: Iterable[tuple]) -> None:
+    bloque: list[dict] = []
+    for fila in filas:
+        bloque.append(dict(zip(_COLUMNAS_STAGING, fila)))
+        if len(bloque) >= _BLOQUE_INSERT:
+            db.execute(insert(_staging).values(bloque))
+            bloque = []
+    if bloque:
+        db.execute(insert(_staging).values(bloque))
+
+
+def _marcar_errores(db: Session) -> None:
+    s = _staging.c
+
+    def marcar(condicion, error: str) -> None:
+        db.execute(update(_staging).where(s.error.is_(None), condicion).values(error=error))
+
+    marcar(
+        ~exists().where(Cliente.id_cliente == s.id_cliente, Cliente.activo.is_(True)),
+        "Cliente no encontrado",
+    )
+    marcar(
+        ~exists().where(TipoProducto.id_tipo_producto == s.id_tipo_producto),
+        "Tipo de producto no encontrado",
+    )
+    marcar(
+        and_(
+            s.tipo_envio == "TERRESTRE",
+            ~exists().where(Bodega.id_bodega == s.id_bodega, Bodega.activo.is_(True)),
+        ),
+        "Bodega no encontrada",
+    )
+    marcar(
+        and_(
+            s.tipo_envio == "MARITIMO",
+            ~exists().where(Puerto.id_puerto == s.id_puerto, Puerto.activo.is_(True)),
+        ),
+        "Puerto no encontrado",
+    )
+    marcar(
+        s.precio_final_c != s.precio_base_c - s.descuento_c,
+        "precio_final debe ser precio_base - descuento",
+    )
+    marcar(exists().where(Envio.numero_guia == s.numero_guia), "numero_guia ya existe")
+
+    # Dentro del archivo gana la primera aparición de cada guía.
+    previa = _staging.alias("previa")
+    marcar(
+        exists().where(previa.c.numero_guia == s.numero_guia, previa.c.linea < s.linea),
+        "numero_guia duplicado en el archivo",
+    )
+
+
+def _mover_validas(db: Session) -> int:
+    s = _staging.c
+    centavo = literal(_CENTAVO, Numeric(3, 2))
+    validas = s.error.is_(None)
+
+    resultado = db.execute(
+        insert(Envio).from_select(
+            [
+                "id_cliente",
+                "id_tipo_producto",
+                "cantidad",
+                "fecha_registro",
+                "fecha_entrega",
+                "precio_base",
+                "descuento",
+                "precio_final",
+                "numero_guia",
+            ],
+            select(
+                s.id_cliente,
+                s.id_tipo_producto,
+                s.cantidad,
+                s.fecha_registro,
+                s.fecha_entrega,
+                s.precio_base_c * centavo,
+                s.descuento_c * centavo,
+                s.precio_final_c * centavo,
+                s.numero_guia,
+            )
+            .where(validas)
+            .order_by(s.linea),
+        )
+    )
+
+    por_guia = Envio.numero_guia == s.numero_guia
+    db.execute(
+        insert(EnvioTerrestre).from_select(
+            ["id_envio", "placa_vehiculo", "id_bodega"],
+            select(Envio.id_envio, s.placa_vehiculo, s.id_bodega)
+            .join_from(_staging, Envio, por_guia)
+            .where(validas, s.tipo_envio == "TERRESTRE"),
+        )
+    )
+    db.execute(
+        insert(EnvioMaritimo).from_select(
+            ["id_envio", "numero_flota", "id_puerto"],
+            select(Envio.id_envio, s.numero_flota, s.id_puerto)
+            .join_from(_staging, Envio, por_guia)
+            .where(validas, s.tipo_envio == "MARITIMO"),
+        )
+    )
+    return resultado.rowcount
+
+
+def importar_csv(
+    db: Session,
+    archivo: TextIO,
+    *,
+    max_rechazos: int | None = None,
+    reporte: TextIO | None = None,
+) -> ResultadoImportacionDTO:
+    """Importa un CSV con las columnas de `COLUMNAS_CSV` (encabezado obligatorio).
+
+    Las filas válidas se insertan todas juntas; las rechazadas se cuentan todas, pero en el
+    resultado van solo las primeras `max_rechazos` (None = todas). Con `reporte`, el detalle
+    completo se escribe ahí en streaming (ver `escribir_reporte`). Lanza ValueError si
+    faltan columnas en el encabezado.
+    """
+    lector = csv.DictReader(archivo)
+    faltantes = [c for c in COLUMNAS_CSV if c not in (lector.fieldnames or ())]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el CSV: {', '.join(faltantes)}")
+
+    formato = _RechazosFormato()
+    conexion = db.connection()
+    try:
+        _staging.drop(conexion, checkfirst=True)
+        _staging.create(conexion)
+
+        filas = _filas_validas(lector, formato)
+        if conexion.dialect.name == "postgresql" and conexion.dialect.driver == "psycopg":
+            _cargar_copy(db, filas)
+        else:
+            _cargar_insert(db, filas)
+
+        _marcar_errores(db)
+        importadas = _mover_validas(db)
+
+        s = _staging.c
+        con_error = s.error.is_not(None)
+        rechazadas = formato.total + db.scalar(
+            select(func.count()).select_from(_staging).where(con_error)
+        )
+        en_staging = db.execute(
+            select(s.linea, s.numero_guia, s.error)
+            .where(con_error)
+            .order_by(s.linea)
+            .execution_options(yield_per=_BLOQUE_INSERT)
+        )
+        rechazos = (
+            RechazoImportacionDTO(linea=linea, numero_guia=guia, error=error)
+            for linea, guia, error in heapq.merge(formato, en_staging, key=itemgetter(0))
+        )
+        muestra = _recorrer_rechazos(rechazos, max_rechazos, reporte)
+        en_staging.close()
+        _staging.drop(conexion)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        formato.cerrar()
+    invalidar_conteos("envio")
+
+    return ResultadoImportacionDTO(
+        leidas=importadas + rechazadas,
+        importadas=importadas,
+        rechazadas=rechazadas,
+        rechazos=muestra,
+    )
+
+
+def _recorrer_rechazos(
+    rechazos: Iterator[RechazoImportacionDTO], limite: int | None, reporte: TextIO | None
+) -> list[RechazoImportacionDTO]:
+    """Primeros `limite` rechazos; con `reporte`, además escribe todos."""
+    if reporte is None:
+        return list(islice(rechazos, limite))
+    muestra: list[RechazoImportacionDTO] = []
+
+    def tomar() -> Iterator[RechazoImportacionDTO]:
+        for rechazo in rechazos:
+            if limite is None or len(muestra) < limite:
+                muestra.append(rechazo)
+            yield rechazo
+
+    escribir_reporte(tomar(), reporte)
+    return muestra
+
+
+def escribir_reporte(rechazos: Iterable[RechazoImportacionDTO], destino: TextIO) -> None:
+    writer = csv.writer(destino, lineterminator="\n")
+    writer.writerow(("linea", "numero_guia", "error"))
+    for r in rechazos:
+        writer.writerow((r.linea, r.numero_guia or "", r.error))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Importa envíos desde un CSV.")
+    parser.add_argument("archivo", help="CSV de entrada (usa '-' para stdin)")
+    parser.add_argument("--reporte", help="CSV donde escribir las filas rechazadas")
+    args = parser.parse_args(argv)
+
+    from app.base_de_datos import modelos  # noqa: F401
+    from app.base_de_datos.sesion import engine
+
+    entrada = sys.stdin if args.archivo == "-" else open(args.archivo, newline="", encoding="utf-8")
+    destino = open(args.reporte, "w", newline="", encoding="utf-8") if args.reporte else None
+    try:
+        with Session(engine) as db:
+            resultado = importar_csv(db, entrada, max_rechazos=0, reporte=destino)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if destino is not None:
+            destino.close()
+
+    print(
+        f"leidas={resultado.leidas} importadas={resultado.importadas} "
+        f"rechazadas={resultado.rechazadas}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,17 +1,128 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
 from decimal import Decimal
 
-from sqlalchemy import Select, delete as sa_delete, func, select
+from sqlalchemy import (
+    Insert,
+    Row,
+    Select,
+    delete as sa_delete,
+    event,
+    exists,
+    insert,
+    literal,
+    select,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from app.bodegas.models import Bodega
+from app.clientes.models import Cliente
+from app.comun.paginacion import ModoTotal, contar_total, invalidar_conteos
 from app.envios.base.models import Envio, EnvioMaritimo, EnvioTerrestre
+from app.envios.schemas import ModoBusqueda
+from app.puertos.models import Puerto
+from app.tipos_producto.models import TipoProducto
 
 
 def _base_query() -> Select[tuple[Envio]]:
     return select(Envio)
 
 
+_DETALLES: dict[str, type[EnvioTerrestre] | type[EnvioMaritimo]] = {
+    "TERRESTRE": EnvioTerrestre,
+    "MARITIMO": EnvioMaritimo,
+}
+
+
+def _fila_literal(modelo, valores: dict) -> list:
+    columnas = modelo.__table__.c
+    return [literal(valor, columnas[nombre].type) for nombre, valor in valores.items()]
+
+
+def condiciones_fk(valores: dict, detalle: dict) -> list:
+    """Condiciones EXISTS para las FKs presentes, equivalentes a `obtener_cliente`, etc."""
+    condiciones = []
+    if "id_cliente" in valores:
+        condiciones.append(
+            exists().where(Cliente.id_cliente == valores["id_cliente"], Cliente.activo.is_(True))
+        )
+    if "id_tipo_producto" in valores:
+        condiciones.append(
+            exists().where(TipoProducto.id_tipo_producto == valores["id_tipo_producto"])
+        )
+    if "id_bodega" in detalle:
+        condiciones.append(
+            exists().where(Bodega.id_bodega == detalle["id_bodega"], Bodega.activo.is_(True))
+        )
+    if "id_puerto" in detalle:
+        condiciones.append(
+            exists().where(Puerto.id_puerto == detalle["id_puerto"], Puerto.activo.is_(True))
+        )
+    return condiciones
+
+
+def sentencia_insertar_envio(valores: dict, detalle: dict) -> Insert:
+    """INSERT ... SELECT ... WHERE <FKs válidas> RETURNING id_envio (cero filas si alguna falla)."""
+    condiciones = condiciones_fk(valores, detalle)
+    fila = select(*_fila_literal(Envio, valores)).where(*condiciones)
+    return insert(Envio).from_select(list(valores), fila).returning(Envio.id_envio)
+
+
+def sentencia_crear(valores: dict, tipo_envio: str, detalle: dict) -> Insert:
+    """Envío + detalle en una sola sentencia (CTE con INSERT, solo Postgres)."""
+    modelo = _DETALLES[tipo_envio]
+    nuevo = sentencia_insertar_envio(valores, detalle).cte("nuevo")
+    fila = select(nuevo.c.id_envio, *_fila_literal(modelo, detalle))
+    return (
+        insert(modelo)
+        .from_select(["id_envio", *detalle], fila)
+        .returning(modelo.id_envio)
+        .add_cte(nuevo)
+    )
+
+
+def _invalidar_conteos_envio(_: Session) -> None:
+    invalidar_conteos("envio")
+
+
+def crear(
+    db: Session, valores: dict, tipo_envio: str, detalle: dict, *, confirmar: bool = True
+):
+    """Inserta envío y detalle validando las FKs dentro del propio INSERT.
+
+    En Postgres es una única sentencia; en otros motores, dos INSERT en la misma transacción.
+    Retorna None (sin insertar nada) si alguna FK no existe o está inactiva; ante
+    IntegrityError hace rollback y propaga la excepción. Con `confirmar=False` no hace commit:
+    lo hace quien llama, p. ej. junto con la respuesta de una `Idempotency-Key`.
+    """
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            sentencia = sentencia_crear(valores, tipo_envio, detalle)
+            id_envio = db.execute(sentencia).scalar_one_or_none()
+        else:
+            id_envio = db.execute(sentencia_insertar_envio(valores, detalle)).scalar_one_or_none()
+            if id_envio is not None:
+                db.execute(insert(_DETALLES[tipo_envio]).values(id_envio=id_envio, **detalle))
+        if id_envio is None:
+            db.rollback()
+            return None
+        if confirmar:
+            db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    if confirmar:
+        invalidar_conteos("envio")
+    else:
+        # Invalidar antes del commit deja que un listado concurrente guarde el total viejo.
+        event.listen(db, "after_commit", _invalidar_conteos_envio, once=True)
+    # Todos los valores son conocidos: se arman los objetos sin volver a leerlos (sin refresh).
+    return Envio(id_envio=id_envio, **valores), _DETALLES[tipo_envio](id_envio=id_envio, **detalle)
+
+
 def crear_terrestre(
     db: Session,
     *,
@@ -26,27 +137,21 @@ def crear_terrestre(
     numero_guia: str,
     id_bodega: int,
     placa_vehiculo: str,
-) -> tuple[Envio, EnvioTerrestre]:
-    envio = Envio(
-        id_cliente=id_cliente,
-        id_tipo_producto=id_tipo_producto,
-        cantidad=cantidad,
-        fecha_registro=fecha_registro,
-        fecha_entrega=fecha_entrega,
-        precio_base=precio_base,
-        descuento=descuento,
-        precio_final=precio_final,
-        numero_guia=numero_guia,
-    )
-    db.add(envio)
-    db.flush()  # obtiene envio.id_envio
-
-    detalle = EnvioTerrestre(id_envio=envio.id_envio, id_bodega=id_bodega, placa_vehiculo=placa_vehiculo)
-    db.add(detalle)
-    db.commit()
-    db.refresh(envio)
-    db.refresh(detalle)
-    return envio, detalle
+    confirmar: bool = True,
+) -> tuple[Envio, EnvioTerrestre] | None:
+    valores = {
+        "id_cliente": id_cliente,
+        "id_tipo_producto": id_tipo_producto,
+        "cantidad": cantidad,
+        "fecha_registro": fecha_registro,
+        "fecha_entrega": fecha_entrega,
+        "precio_base": precio_base,
+        "descuento": descuento,
+        "precio_final": precio_final,
+        "numero_guia": numero_guia,
+    }
+    detalle = {"placa_vehiculo": placa_vehiculo, "id_bodega": id_bodega}
+    return crear(db, valores, "TERRESTRE", detalle, confirmar=confirmar)
 
 
 def crear_maritimo(
@@ -63,32 +168,85 @@ def crear_maritimo(
     numero_guia: str,
     id_puerto: int,
     numero_flota: str,
-) -> tuple[Envio, EnvioMaritimo]:
-    envio = Envio(
-        id_cliente=id_cliente,
-        id_tipo_producto=id_tipo_producto,
-        cantidad=cantidad,
-        fecha_registro=fecha_registro,
-        fecha_entrega=fecha_entrega,
-        precio_base=precio_base,
-        descuento=descuento,
-        precio_final=precio_final,
-        numero_guia=numero_guia,
-    )
-    db.add(envio)
-    db.flush()
-
-    detalle = EnvioMaritimo(id_envio=envio.id_envio, id_puerto=id_puerto, numero_flota=numero_flota)
-    db.add(detalle)
-    db.commit()
-    db.refresh(envio)
-    db.refresh(detalle)
-    return envio, detalle
+    confirmar: bool = True,
+) -> tuple[Envio, EnvioMaritimo] | None:
+    valores = {
+        "id_cliente": id_cliente,
+        "id_tipo_producto": id_tipo_producto,
+        "cantidad": cantidad,
+        "fecha_registro": fecha_registro,
+        "fecha_entrega": fecha_entrega,
+        "precio_base": precio_base,
+        "descuento": descuento,
+        "precio_final": precio_final,
+        "numero_guia": numero_guia,
+    }
+    detalle = {"numero_flota": numero_flota, "id_puerto": id_puerto}
+    return crear(db, valores, "MARITIMO", detalle, confirmar=confirmar)
+
+
+def guias_existentes(db: Session, guias: set[str]) -> set[str]:
+    if not guias:
+        return set()
+    return set(db.scalars(select(Envio.numero_guia).where(Envio.numero_guia.in_(guias))))
+
+
+def crear_lote(db: Session, filas: list[tuple[dict, str, dict]]) -> list[int]:
+    """Inserta un bloque de envíos con su detalle y hace un único commit.
+
+    Cada fila es `(valores_envio, tipo_envio, valores_detalle)`. Los envíos se insertan con
+    INSERT multi-fila ... RETURNING y los detalles con un INSERT multi-fila por tipo.
+    Retorna los `id_envio` en el mismo orden de `filas`. Ante IntegrityError hace rollback
+    y propaga la excepción.
+    """
+    try:
+        # Se correlaciona por numero_guia (único) para que el INSERT pueda ir en lotes
+        # multi-fila sin exigir orden determinístico del RETURNING.
+        por_guia = dict(
+            db.execute(
+                insert(Envio).returning(Envio.numero_guia, Envio.id_envio),
+                [valores for valores, _, _ in filas],
+            ).all()
+        )
+        ids = [por_guia[valores["numero_guia"]] for valores, _, _ in filas]
+        terrestres = [
+            {**detalle, "id_envio": id_envio}
+            for id_envio, (_, tipo, detalle) in zip(ids, filas)
+            if tipo == "TERRESTRE"
+        ]
+        maritimos = [
+            {**detalle, "id_envio": id_envio}
+            for id_envio, (_, tipo, detalle) in zip(ids, filas)
+            if tipo == "MARITIMO"
+        ]
+        if terrestres:
+            db.execute(insert(EnvioTerrestre), terrestres)
+        if maritimos:
+            db.execute(insert(EnvioMaritimo), maritimos)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    invalidar_conteos("envio")
+    return ids
+
+
+def crear_lote_por_item(db: Session, filas: list[tuple[dict, str, dict]]) -> list[int | None]:
+    """Camino lento de `crear_lote`: un commit por fila; None en las filas rechazadas."""
+    ids: list[int | None] = []
+    for fila in filas:
+        try:
+            ids.extend(crear_lote(db, [fila]))
+        except IntegrityError:
+            ids.append(None)
+    return ids
 
 
 def obtener_por_id(
     db: Session,
     envio_id: int,
+    *,
+    bloquear: bool = False,
 ) -> tuple[Envio, EnvioTerrestre | None, EnvioMaritimo | None] | None:
     query = (
         _base_query()
@@ -97,6 +255,9 @@ def obtener_por_id(
         .outerjoin(EnvioMaritimo, EnvioMaritimo.id_envio == Envio.id_envio)
         .with_only_columns(Envio, EnvioTerrestre, EnvioMaritimo)
     )
+    if bloquear:
+        # SELECT ... FOR UPDATE OF envio: serializa PATCH concurrentes sobre el mismo envío.
+        query = query.with_for_update(of=Envio)
 
     row = db.execute(query).first()
     if row is None:
@@ -106,16 +267,24 @@ def obtener_por_id(
     return envio, terrestre, maritimo
 
 
-def listar(
-    db: Session,
+def _filtro_guia(q: str, search_mode: ModoBusqueda):
+    # exact usa el índice único; prefix el índice varchar_pattern_ops y substring el GIN
+    # pg_trgm (ver migración f3a9b1c2d4e5). En SQLite todos recorren la tabla.
+    if search_mode == "exact":
+        return Envio.numero_guia == q
+    if search_mode == "prefix":
+        return Envio.numero_guia.startswith(q, autoescape=True)
+    return Envio.numero_guia.icontains(q, autoescape=True)
+
+
+def _filtrar(
     *,
-    page: int,
-    page_size: int,
     q: str | None = None,
+    search_mode: ModoBusqueda = "substring",
     id_cliente: int | None = None,
     id_tipo_producto: int | None = None,
     tipo_envio: str | None = None,
-) -> tuple[list[tuple[Envio, EnvioTerrestre | None, EnvioMaritimo | None]], int]:
+) -> Select:
     base = (
         _base_query()
         .outerjoin(EnvioTerrestre, EnvioTerrestre.id_envio == Envio.id_envio)
@@ -123,8 +292,7 @@ def listar(
     )
 
     if q:
-        like = f"%{q.strip()}%"
-        base = base.where(Envio.numero_guia.ilike(like))
+        base = base.where(_filtro_guia(q.strip(), search_mode))
     if id_cliente is not None:
         base = base.where(Envio.id_cliente == id_cliente)
     if id_tipo_producto is not None:
@@ -134,96 +302,169 @@ def listar(
         base = base.where(EnvioTerrestre.id_envio.is_not(None))
     elif tipo_envio == "MARITIMO":
         base = base.where(EnvioMaritimo.id_envio.is_not(None))
+    return base
 
-    total_subq = base.with_only_columns(Envio.id_envio).subquery()
-    total = db.scalar(select(func.count()).select_from(total_subq)) or 0
-    offset = (page - 1) * page_size
 
-    query = (
-        base.order_by(Envio.id_envio.asc())
-        .offset(offset)
-        .limit(page_size)
-        .with_only_columns(Envio, EnvioTerrestre, EnvioMaritimo)
+def listar(
+    db: Session,
+    *,
+    page: int,
+    page_size: int,
+    q: str | None = None,
+    search_mode: ModoBusqueda = "substring",
+    id_cliente: int | None = None,
+    id_tipo_producto: int | None = None,
+    tipo_envio: str | None = None,
+    after_id: int | None = None,
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
+) -> tuple[list[tuple[Envio, EnvioTerrestre | None, EnvioMaritimo | None]], int | None, int | None]:
+    """Lista envíos ordenados por `id_envio`.
+
+    Con `after_id` pagina por keyset (`id_envio > after_id`) e ignora `page`, de modo que
+    cualquier página cuesta lo mismo que la primera. Retorna `(items, total, siguiente_id)`,
+    donde `siguiente_id` es el último id de la página si hay más filas, o None.
+    """
+    base = _filtrar(
+        q=q,
+        search_mode=search_mode,
+        id_cliente=id_cliente,
+        id_tipo_producto=id_tipo_producto,
+        tipo_envio=tipo_envio,
+    )
+
+    total = contar_total(
+        db,
+        base.with_only_columns(Envio.id_envio),
+        tabla="envio",
+        filtros=(
+            ("q", q),
+            ("search_mode", search_mode if q else None),
+            ("id_cliente", id_cliente),
+            ("id_tipo_producto", id_tipo_producto),
+            ("tipo_envio", tipo_envio),
+        ),
+        include_total=include_total,
+        total_mode=total_mode,
     )
 
-    rows = db.execute(query).all()
-    items = [(r[0], r[1], r[2]) for r in rows]
-    return items, int(total)
+    query = base.order_by(Envio.id_envio.asc()).with_only_columns(Envio, EnvioTerrestre, EnvioMaritimo)
+    if after_id is not None:
+        query = query.where(Envio.id_envio > after_id)
+    else:
+        query = query.offset((page - 1) * page_size)
+
+    # Se pide una fila extra para saber si existe una página siguiente.
+    rows = db.execute(query.limit(page_size + 1)).all()
+    hay_mas = len(rows) > page_size
+    items = [(r[0], r[1], r[2]) for r in rows[:page_size]]
+    siguiente_id = items[-1][0].id_envio if hay_mas else None
+    return items, total, siguiente_id
 
 
-def actualizar_base(
+def iterar(
     db: Session,
-    envio: Envio,
     *,
+    q: str | None = None,
+    search_mode: ModoBusqueda = "substring",
     id_cliente: int | None = None,
     id_tipo_producto: int | None = None,
-    cantidad: int | None = None,
-    fecha_registro=None,
-    fecha_entrega=None,
-    precio_base: Decimal | None = None,
-    descuento: Decimal | None = None,
-    precio_final: Decimal | None = None,
-    numero_guia: str | None = None,
-) -> Envio:
-    if id_cliente is not None:
-        envio.id_cliente = id_cliente
-    if id_tipo_producto is not None:
-        envio.id_tipo_producto = id_tipo_producto
-    if cantidad is not None:
-        envio.cantidad = cantidad
-    if fecha_registro is not None:
-        envio.fecha_registro = fecha_registro
-    if fecha_entrega is not None:
-        envio.fecha_entrega = fecha_entrega
-    if precio_base is not None:
-        envio.precio_base = precio_base
-    if descuento is not None:
-        envio.descuento = descuento
-    if precio_final is not None:
-        envio.precio_final = precio_final
-    if numero_guia is not None:
-        envio.numero_guia = numero_guia
-
-    db.add(envio)
-    db.commit()
-    db.refresh(envio)
-    return envio
+    tipo_envio: str | None = None,
+    yield_per: int = 1000,
+) -> Iterator[Row]:
+    """Recorre todos los envíos filtrados como filas planas (sin identity map).
 
+    Usa un cursor del lado del servidor (`stream_results`) y trae `yield_per` filas por vez,
+    de modo que la memoria no crece con el tamaño del resultado.
+    """
+    query = (
+        _filtrar(
+            q=q,
+            search_mode=search_mode,
+            id_cliente=id_cliente,
+            id_tipo_producto=id_tipo_producto,
+            tipo_envio=tipo_envio,
+        )
+        .with_only_columns(
+            Envio.id_envio,
+            Envio.id_cliente,
+            Envio.id_tipo_producto,
+            Envio.cantidad,
+            Envio.fecha_registro,
+            Envio.fecha_entrega,
+            Envio.precio_base,
+            Envio.descuento,
+            Envio.precio_final,
+            Envio.numero_guia,
+            EnvioTerrestre.id_envio.label("id_envio_terrestre"),
+            EnvioTerrestre.id_bodega,
+            EnvioTerrestre.placa_vehiculo,
+            EnvioMaritimo.id_puerto,
+            EnvioMaritimo.numero_flota,
+        )
+        .order_by(Envio.id_envio.asc())
+        .execution_options(stream_results=True, yield_per=yield_per)
+    )
+    yield from db.execute(query)
 
-def actualizar_terrestre(
-    db: Session,
-    detalle: EnvioTerrestre,
-    *,
-    id_bodega: int | None = None,
-    placa_vehiculo: str | None = None,
-) -> EnvioTerrestre:
-    if id_bodega is not None:
-        detalle.id_bodega = id_bodega
-    if placa_vehiculo is not None:
-        detalle.placa_vehiculo = placa_vehiculo
-
-    db.add(detalle)
-    db.commit()
-    db.refresh(detalle)
-    return detalle
+
+def _columnas(modelo) -> list:
+    return list(modelo.__table__.c)
 
 
-def actualizar_maritimo(
+def actualizar(
     db: Session,
-    detalle: EnvioMaritimo,
+    envio_id: int,
     *,
-    id_puerto: int | None = None,
-    numero_flota: str | None = None,
-) -> EnvioMaritimo:
-    if id_puerto is not None:
-        detalle.id_puerto = id_puerto
-    if numero_flota is not None:
-        detalle.numero_flota = numero_flota
-
-    db.add(detalle)
-    db.commit()
-    db.refresh(detalle)
-    return detalle
+    tipo_envio: str,
+    valores: dict,
+    detalle: dict,
+    detalle_actual: EnvioTerrestre | EnvioMaritimo,
+):
+    """Aplica los cambios de base y detalle en una transacción, con un único commit.
+
+    Usa UPDATE ... RETURNING (sin refresh posterior) y valida las FKs nuevas en el WHERE.
+    Retorna `(envio, terrestre, maritimo)` o None, sin aplicar nada, si el envío o alguna
+    FK no existe. Ante IntegrityError hace rollback y propaga la excepción.
+    """
+    modelo = _DETALLES[tipo_envio]
+    try:
+        fila_envio = db.execute(
+            update(Envio)
+            .where(Envio.id_envio == envio_id, *condiciones_fk(valores, {}))
+            .values(**valores)
+            .returning(*_columnas(Envio))
+            .execution_options(synchronize_session=False)
+        ).first()
+        if fila_envio is None:
+            db.rollback()
+            return None
+
+        if detalle:
+            fila_detalle = db.execute(
+                update(modelo)
+                .where(modelo.id_envio == envio_id, *condiciones_fk({}, detalle))
+                .values(**detalle)
+                .returning(*_columnas(modelo))
+                .execution_options(synchronize_session=False)
+            ).first()
+            if fila_detalle is None:
+                db.rollback()
+                return None
+            datos_detalle = dict(fila_detalle._mapping)
+        else:
+            datos_detalle = {c.key: getattr(detalle_actual, c.key) for c in _columnas(modelo)}
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    invalidar_conteos("envio")
+
+    envio = Envio(**fila_envio._mapping)
+    nuevo_detalle = modelo(**datos_detalle)
+    if tipo_envio == "TERRESTRE":
+        return envio, nuevo_detalle, None
+    return envio, None, nuevo_detalle
 
 
 def eliminar(db: Session, envio: Envio) -> None:
@@ -234,3 +475,4 @@ def eliminar(db: Session, envio: Envio) -> None:
     db.execute(sa_delete(EnvioMaritimo).where(EnvioMaritimo.id_envio == envio_id))
     db.execute(sa_delete(Envio).where(Envio.id_envio == envio_id))
     db.commit()
+    invalidar_conteos("envio")
@@ -1,128 +1,218 @@
-from fastapi import APIRouter, Depends, Query
+import io
+import tempfile
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Body, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from pydantic import TypeAdapter
 
 from app.autenticacion.dependencies import obtener_admin_actual, obtener_usuario_actual
-from app.comun.dependencias import DBSession
-from app.envios.schemas import ActualizarEnvioDTO, CrearEnvioDTO, EnvioDTO, ListaEnviosDTO, TipoEnvio
-from app.envios.service import actualizar_envio, crear_envio, eliminar_envio, listar_envios, obtener_envio
+from app.base_de_datos.configuracion import settings
+from app.comun.dependencias import DBSession, DBSessionLectura
+from app.comun.paginacion import ModoTotal
+from app.comun.respuestas import RespuestaJSON
+from app.descuentos.service import asegurar_reglas
+from app.envios.cotizacion import cotizar_lote
+from app.envios.exportacion import FormatoExportacion
+from app.envios.schemas import (
+    ActualizarEnvioDTO,
+    CotizacionLoteDTO,
+    CrearEnvioDTO,
+    EnvioDTO,
+    EnvioFila,
+    ItemCotizacion,
+    ListaEnviosDTO,
+    ListaEnviosFila,
+    ModoBusqueda,
+    ResultadoImportacionDTO,
+    ResultadoLoteDTO,
+    TipoEnvio,
+)
+from app.envios.service import (
+    a_envio_fila,
+    actualizar_envio,
+    crear_envio,
+    crear_envios_lote,
+    eliminar_envio,
+    exportar_envios,
+    importar_envios,
+    listar_envios,
+    obtener_envio,
+)
+from app.idempotencia.dependencies import Idempotente
 
 router = APIRouter()
 
+_LISTA_ENVIOS_JSON = TypeAdapter(ListaEnviosFila)
+
+
+def respuesta_lista_envios(
+    page: int | None, page_size: int, total: int | None, items: list, next_cursor: str | None
+) -> Response:
+    # Se serializa aquí en lugar de devolver el DTO: FastAPI volvería a validar cada ítem
+    # contra el response_model, que en este endpoint solo documenta la respuesta.
+    lista = {
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "items": [a_envio_fila(*fila) for fila in items],
+        "next_cursor": next_cursor,
+    }
+    return Response(content=_LISTA_ENVIOS_JSON.dump_json(lista), media_type="application/json")
+
 
 @router.post("/envios", response_model=EnvioDTO)
-def crear(dto: CrearEnvioDTO, db: DBSession, _: dict = Depends(obtener_usuario_actual)) -> EnvioDTO:
-    envio, terrestre, maritimo = crear_envio(db, dto)
-    tipo_envio: TipoEnvio = "TERRESTRE" if terrestre is not None else "MARITIMO"
-    return EnvioDTO(**{
-        "id_envio": envio.id_envio,
-        "id_cliente": envio.id_cliente,
-        "id_tipo_producto": envio.id_tipo_producto,
-        "cantidad": envio.cantidad,
-        "fecha_registro": envio.fecha_registro,
-        "fecha_entrega": envio.fecha_entrega,
-        "precio_base": envio.precio_base,
-        "descuento": envio.descuento,
-        "precio_final": envio.precio_final,
-        "numero_guia": envio.numero_guia,
-        "tipo_envio": tipo_envio,
-        "id_bodega": terrestre.id_bodega if terrestre is not None else None,
-        "placa_vehiculo": terrestre.placa_vehiculo if terrestre is not None else None,
-        "id_puerto": maritimo.id_puerto if maritimo is not None else None,
-        "numero_flota": maritimo.numero_flota if maritimo is not None else None,
-    })
+def crear(
+    dto: CrearEnvioDTO,
+    db: DBSession,
+    idem: Idempotente,
+    _: dict = Depends(obtener_usuario_actual),
+) -> EnvioFila:
+    return idem.responder(a_envio_fila(*crear_envio(db, dto, confirmar=idem.confirmar)), EnvioDTO)
+
+
+@router.post("/envios/bulk", response_model=ResultadoLoteDTO)
+def crear_lote(
+    items: Annotated[
+        list[dict[str, Any]],
+        Body(
+            min_length=1,
+            max_length=settings.bulk_max_items,
+            description="Lista de envíos con el mismo formato de `POST /envios` (CrearEnvioDTO).",
+        ),
+    ],
+    db: DBSession,
+    idem: Idempotente,
+    _: dict = Depends(obtener_usuario_actual),
+    chunk_size: int = Query(settings.bulk_chunk_size, ge=1, le=5000),
+) -> ResultadoLoteDTO:
+    resultados = crear_envios_lote(db, items, chunk_size=chunk_size)
+    creados = sum(1 for r in resultados if r.ok)
+    resultado = ResultadoLoteDTO(
+        total=len(resultados),
+        creados=creados,
+        fallidos=len(resultados) - creados,
+        items=resultados,
+    )
+    return idem.responder(resultado, ResultadoLoteDTO)
+
+
+@router.post("/envios/cotizar/batch", response_model=CotizacionLoteDTO)
+def cotizar_batch(
+    items: Annotated[
+        list[ItemCotizacion],
+        Body(min_length=1, max_length=settings.cotizacion_max_items),
+    ],
+    db: DBSessionLectura,
+    _: dict = Depends(obtener_usuario_actual),
+) -> Response:
+    """Precios con descuento de cada ítem, sin persistir nada (ver `app.envios.cotizacion`)."""
+    # Solo consulta la BD si las reglas de descuento en memoria están vencidas.
+    asegurar_reglas(db)
+    return RespuestaJSON(cotizar_lote(items))
+
+
+# Por encima de este tamaño el CSV recibido se vuelca a un archivo temporal en disco.
+_IMPORT_MAX_MEMORIA = 8 * 1024 * 1024
+
+
+@router.post(
+    "/envios/import",
+    response_model=ResultadoImportacionDTO,
+    openapi_extra={"requestBody": {"content": {"text/csv": {"schema": {"type": "string"}}}}},
+)
+async def importar(
+    request: Request,
+    db: DBSession,
+    _: dict = Depends(obtener_admin_actual),
+) -> ResultadoImportacionDTO:
+    """Importa envíos desde un CSV crudo en el cuerpo (ver `app.envios.importacion`)."""
+    with tempfile.SpooledTemporaryFile(max_size=_IMPORT_MAX_MEMORIA) as crudo:
+        async for bloque in request.stream():
+            crudo.write(bloque)
+        crudo.seek(0)
+        archivo = io.TextIOWrapper(crudo, encoding="utf-8", newline="")
+        return await run_in_threadpool(importar_envios, db, archivo)
+
+
+_MEDIA_TYPES: dict[str, str] = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+@router.get("/envios/export", response_class=StreamingResponse)
+def exportar(
+    db: DBSessionLectura,
+    _: dict = Depends(obtener_usuario_actual),
+    formato: FormatoExportacion = "csv",
+    gzip: bool = False,
+    q: str | None = Query(None, min_length=1),
+    search_mode: ModoBusqueda = "substring",
+    id_cliente: int | None = None,
+    id_tipo_producto: int | None = None,
+    tipo_envio: TipoEnvio | None = None,
+) -> StreamingResponse:
+    chunks = exportar_envios(
+        db,
+        formato=formato,
+        gzip=gzip,
+        q=q,
+        search_mode=search_mode,
+        id_cliente=id_cliente,
+        id_tipo_producto=id_tipo_producto,
+        tipo_envio=tipo_envio,
+    )
+    nombre = f"envios.{formato}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else _MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
 
 
 @router.get("/envios", response_model=ListaEnviosDTO)
 def listar(
-    db: DBSession,
+    db: DBSessionLectura,
     _: dict = Depends(obtener_usuario_actual),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     q: str | None = Query(None, min_length=1),
+    search_mode: ModoBusqueda = "substring",
     id_cliente: int | None = None,
     id_tipo_producto: int | None = None,
     tipo_envio: TipoEnvio | None = None,
-) -> ListaEnviosDTO:
-    items, total = listar_envios(
+    cursor: str | None = Query(None, min_length=1),
+    after_id: int | None = Query(None, ge=0),
+    include_total: bool | None = None,
+    total_mode: ModoTotal = "exact",
+) -> Response:
+    items, total, next_cursor = listar_envios(
         db,
         page=page,
         page_size=page_size,
         q=q,
+        search_mode=search_mode,
         id_cliente=id_cliente,
         id_tipo_producto=id_tipo_producto,
         tipo_envio=tipo_envio,
+        cursor=cursor,
+        after_id=after_id,
+        include_total=include_total,
+        total_mode=total_mode,
     )
 
-    return ListaEnviosDTO(
-        page=page,
-        page_size=page_size,
-        total=total,
-        items=[
-            EnvioDTO(**{
-                "id_envio": envio.id_envio,
-                "id_cliente": envio.id_cliente,
-                "id_tipo_producto": envio.id_tipo_producto,
-                "cantidad": envio.cantidad,
-                "fecha_registro": envio.fecha_registro,
-                "fecha_entrega": envio.fecha_entrega,
-                "precio_base": envio.precio_base,
-                "descuento": envio.descuento,
-                "precio_final": envio.precio_final,
-                "numero_guia": envio.numero_guia,
-                "tipo_envio": ("TERRESTRE" if terrestre is not None else "MARITIMO"),
-                "id_bodega": terrestre.id_bodega if terrestre is not None else None,
-                "placa_vehiculo": terrestre.placa_vehiculo if terrestre is not None else None,
-                "id_puerto": maritimo.id_puerto if maritimo is not None else None,
-                "numero_flota": maritimo.numero_flota if maritimo is not None else None,
-            })
-            for (envio, terrestre, maritimo) in items
-        ],
-    )
+    # Por keyset `page` no se usa: se responde null.
+    keyset = cursor is not None or after_id is not None
+    return respuesta_lista_envios(None if keyset else page, page_size, total, items, next_cursor)
 
 
 @router.get("/envios/{envio_id}", response_model=EnvioDTO)
-def obtener(envio_id: int, db: DBSession, _: dict = Depends(obtener_usuario_actual)) -> EnvioDTO:
-    envio, terrestre, maritimo = obtener_envio(db, envio_id)
-    tipo_envio: TipoEnvio = "TERRESTRE" if terrestre is not None else "MARITIMO"
-    return EnvioDTO(**{
-        "id_envio": envio.id_envio,
-        "id_cliente": envio.id_cliente,
-        "id_tipo_producto": envio.id_tipo_producto,
-        "cantidad": envio.cantidad,
-        "fecha_registro": envio.fecha_registro,
-        "fecha_entrega": envio.fecha_entrega,
-        "precio_base": envio.precio_base,
-        "descuento": envio.descuento,
-        "precio_final": envio.precio_final,
-        "numero_guia": envio.numero_guia,
-        "tipo_envio": tipo_envio,
-        "id_bodega": terrestre.id_bodega if terrestre is not None else None,
-        "placa_vehiculo": terrestre.placa_vehiculo if terrestre is not None else None,
-        "id_puerto": maritimo.id_puerto if maritimo is not None else None,
-        "numero_flota": maritimo.numero_flota if maritimo is not None else None,
-    })
+def obtener(envio_id: int, db: DBSessionLectura, _: dict = Depends(obtener_usuario_actual)) -> EnvioFila:
+    return a_envio_fila(*obtener_envio(db, envio_id))
 
 
 @router.patch("/envios/{envio_id}", response_model=EnvioDTO)
-def actualizar(envio_id: int, dto: ActualizarEnvioDTO, db: DBSession, _: dict = Depends(obtener_usuario_actual)) -> EnvioDTO:
-    envio, terrestre, maritimo = actualizar_envio(db, envio_id, dto)
-    tipo_envio: TipoEnvio = "TERRESTRE" if terrestre is not None else "MARITIMO"
-    return EnvioDTO(**{
-        "id_envio": envio.id_envio,
-        "id_cliente": envio.id_cliente,
-        "id_tipo_producto": envio.id_tipo_producto,
-        "cantidad": envio.cantidad,
-        "fecha_registro": envio.fecha_registro,
-        "fecha_entrega": envio.fecha_entrega,
-        "precio_base": envio.precio_base,
-        "descuento": envio.descuento,
-        "precio_final": envio.precio_final,
-        "numero_guia": envio.numero_guia,
-        "tipo_envio": tipo_envio,
-        "id_bodega": terrestre.id_bodega if terrestre is not None else None,
-        "placa_vehiculo": terrestre.placa_vehiculo if terrestre is not None else None,
-        "id_puerto": maritimo.id_puerto if maritimo is not None else None,
-        "numero_flota": maritimo.numero_flota if maritimo is not None else None,
-    })
+def actualizar(envio_id: int, dto: ActualizarEnvioDTO, db: DBSession, _: dict = Depends(obtener_usuario_actual)) -> EnvioFila:
+    return a_envio_fila(*actualizar_envio(db, envio_id, dto))
 
 
 @router.delete("/envios/{envio_id}")
@@ -0,0 +1,102 @@
+"""Rutas CRUD de envíos sobre AsyncSession. Con DB_ASYNC=true reemplazan a las de
+`app.envios.router` con el mismo path y método; el resto (bulk, import, export) sigue
+siendo síncrono."""
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import Response
+
+from app.autenticacion.dependencies import obtener_admin_actual, obtener_usuario_actual
+from app.comun.dependencias import DBSessionAsync, DBSessionLecturaAsync
+from app.comun.paginacion import ModoTotal
+from app.envios.router import respuesta_lista_envios
+from app.envios.schemas import (
+    ActualizarEnvioDTO,
+    CrearEnvioDTO,
+    EnvioDTO,
+    EnvioFila,
+    ListaEnviosDTO,
+    ModoBusqueda,
+    TipoEnvio,
+)
+from app.envios.service import a_envio_fila
+from app.envios.service_async import (
+    actualizar_envio,
+    crear_envio,
+    eliminar_envio,
+    listar_envios,
+    obtener_envio,
+)
+from app.idempotencia.dependencies import IdempotenteAsync
+
+router = APIRouter()
+
+
+@router.post("/envios", response_model=EnvioDTO)
+async def crear(
+    dto: CrearEnvioDTO,
+    db: DBSessionAsync,
+    idem: IdempotenteAsync,
+    _: dict = Depends(obtener_usuario_actual),
+) -> EnvioFila:
+    creado = await crear_envio(db, dto, confirmar=idem.confirmar)
+    return await idem.responder(a_envio_fila(*creado), EnvioDTO)
+
+
+@router.get("/envios", response_model=ListaEnviosDTO)
+async def listar(
+    db: DBSessionLecturaAsync,
+    _: dict = Depends(obtener_usuario_actual),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    q: str | None = Query(None, min_length=1),
+    search_mode: ModoBusqueda = "substring",
+    id_cliente: int | None = None,
+    id_tipo_producto: int | None = None,
+    tipo_envio: TipoEnvio | None = None,
+    cursor: str | None = Query(None, min_length=1),
+    after_id: int | None = Query(None, ge=0),
+    include_total: bool | None = None,
+    total_mode: ModoTotal = "exact",
+) -> Response:
+    items, total, next_cursor = await listar_envios(
+        db,
+        page=page,
+        page_size=page_size,
+        q=q,
+        search_mode=search_mode,
+        id_cliente=id_cliente,
+        id_tipo_producto=id_tipo_producto,
+        tipo_envio=tipo_envio,
+        cursor=cursor,
+        after_id=after_id,
+        include_total=include_total,
+        total_mode=total_mode,
+    )
+    # Por keyset `page` no se usa: se responde null.
+    keyset = cursor is not None or after_id is not None
+    return respuesta_lista_envios(None if keyset else page, page_size, total, items, next_cursor)
+
+
+@router.get("/envios/{envio_id}", response_model=EnvioDTO)
+async def obtener(
+    envio_id: int, db: DBSessionLecturaAsync, _: dict = Depends(obtener_usuario_actual)
+) -> EnvioFila:
+    return a_envio_fila(*await obtener_envio(db, envio_id))
+
+
+@router.patch("/envios/{envio_id}", response_model=EnvioDTO)
+async def actualizar(
+    envio_id: int,
+    dto: ActualizarEnvioDTO,
+    db: DBSessionAsync,
+    _: dict = Depends(obtener_usuario_actual),
+) -> EnvioFila:
+    return a_envio_fila(*await actualizar_envio(db, envio_id, dto))
+
+
+@router.delete("/envios/{envio_id}")
+async def eliminar(
+    envio_id: int, db: DBSessionAsync, _: dict = Depends(obtener_admin_actual)
+) -> dict:
+    await eliminar_envio(db, envio_id)
+    return {"status": "ok"}
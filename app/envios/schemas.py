@@ -3,11 +3,14 @@ from __future__ import annotations
 import re
 from datetime import date
 from decimal import Decimal
-from typing import Literal
+from typing import Annotated, Any, Literal
 
 from pydantic import BaseModel, Field, model_validator
+from typing_extensions import NotRequired, TypedDict
 
 TipoEnvio = Literal["TERRESTRE", "MARITIMO"]
+# Cómo se compara `q` contra numero_guia: prefix y exact distinguen mayúsculas.
+ModoBusqueda = Literal["prefix", "substring", "exact"]
 
 
 class CrearEnvioDTO(BaseModel):
@@ -103,7 +106,77 @@ class EnvioDTO(BaseModel):
 
 
 class ListaEnviosDTO(BaseModel):
-    page: int
+    # None al paginar por keyset (`cursor`/`after_id`), donde `page` no se usa.
+    page: int | None
     page_size: int
-    total: int
+    total: int | None
     items: list[EnvioDTO]
+    # Cursor opaco para pedir la página siguiente (`?cursor=...`); None si no hay más.
+    next_cursor: str | None = None
+
+
+def _como_typeddict(nombre: str, modelo: type[BaseModel], **reemplazos: Any) -> Any:
+    campos = {n: reemplazos.get(n, f.annotation) for n, f in modelo.model_fields.items()}
+    return TypedDict(nombre, campos)  # type: ignore[operator]
+
+
+# Mismos campos (y orden) que los DTOs, como TypedDict: se serializan dicts armados desde
+# filas de BD sin instanciar ni validar un modelo por ítem.
+EnvioFila = _como_typeddict("EnvioFila", EnvioDTO)
+ListaEnviosFila = _como_typeddict("ListaEnviosFila", ListaEnviosDTO, items=list[EnvioFila])
+
+
+class ResultadoItemLoteDTO(BaseModel):
+    indice: int
+    ok: bool
+    id_envio: int | None = None
+    numero_guia: str | None = None
+    error: str | None = None
+
+
+class ResultadoLoteDTO(BaseModel):
+    total: int
+    creados: int
+    fallidos: int
+    items: list[ResultadoItemLoteDTO]
+
+
+class RechazoImportacionDTO(BaseModel):
+    linea: int
+    numero_guia: str | None = None
+    error: str
+
+
+class ResultadoImportacionDTO(BaseModel):
+    leidas: int
+    importadas: int
+    rechazadas: int
+    # Los primeros `IMPORT_MAX_RECHAZOS` por número de línea (`rechazadas` los cuenta todos).
+    rechazos: list[RechazoImportacionDTO]
+
+
+class ItemCotizacion(TypedDict):
+    """Ítem de `POST /envios/cotizar/batch` (TypedDict: los lotes son de decenas de miles)."""
+
+    tipo_envio: TipoEnvio
+    cantidad: Annotated[int, Field(gt=0)]
+    precio_base: Annotated[Decimal, Field(ge=0, le=Decimal("99999999.99"))]
+    # Ámbito de las reglas de descuento (opcional)
+    id_cliente: NotRequired[int | None]
+    id_tipo_producto: NotRequired[int | None]
+    id_bodega: NotRequired[int | None]
+    id_puerto: NotRequired[int | None]
+
+
+class CotizacionItemDTO(BaseModel):
+    precio_base: Decimal
+    descuento: Decimal
+    precio_final: Decimal
+
+
+class CotizacionLoteDTO(BaseModel):
+    total_precio_base: Decimal
+    total_descuento: Decimal
+    total_precio_final: Decimal
+    # En el mismo orden de los ítems recibidos
+    items: list[CotizacionItemDTO]
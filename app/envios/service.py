@@ -1,56 +1,83 @@
 from __future__ import annotations
 
+import csv
+from collections.abc import Iterator
 from decimal import Decimal
+from typing import Any, TextIO
 
+from fastapi import HTTPException
+from pydantic import ValidationError
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.bodegas.service import obtener_bodega
-from app.clientes.service import obtener_cliente
-from app.comun.excepciones import conflicto, no_encontrado
+from app.base_de_datos.configuracion import settings
+from app.bodegas.service import ids_bodegas_existentes, obtener_bodega
+from app.clientes.service import ids_clientes_existentes, obtener_cliente
+from app.comun.excepciones import conflicto, no_encontrado, solicitud_invalida
+from app.comun.paginacion import ModoTotal, codificar_cursor, decodificar_cursor
+from app.descuentos.service import asegurar_reglas
 from app.envios.base.discount_service import calcular_monto_descuento
-from app.envios import repository
-from app.envios.schemas import ActualizarEnvioDTO, CrearEnvioDTO, TipoEnvio
-from app.puertos.service import obtener_puerto
-from app.tipos_producto.service import obtener_tipo_producto
-
-
-def _to_dto_dict(envio, terrestre, maritimo) -> dict:
-    tipo_envio: TipoEnvio
+from app.envios import importacion, repository
+from app.envios.exportacion import FormatoExportacion, comprimir_gzip, generar_csv, generar_ndjson
+from app.envios.schemas import (
+    ActualizarEnvioDTO,
+    CrearEnvioDTO,
+    EnvioFila,
+    ModoBusqueda,
+    ResultadoImportacionDTO,
+    ResultadoItemLoteDTO,
+    TipoEnvio,
+)
+from app.puertos.service import ids_puertos_existentes, obtener_puerto
+from app.tipos_producto.service import ids_tipos_producto_existentes, obtener_tipo_producto
+
+# Clave de orden activa en el listado de envíos; viaja dentro del cursor opaco.
+_CLAVE_CURSOR = "id_envio"
+
+
+def a_envio_fila(envio, terrestre, maritimo) -> EnvioFila:
+    """Mapea las filas de BD a la forma de EnvioDTO como dict plano, sin construir un modelo.
+
+    Los valores vienen de columnas tipadas (y ya validadas al escribir): no hace falta
+    validarlos de nuevo por ítem, que es lo que más pesaba en `GET /envios`.
+    """
     if terrestre is not None:
-        tipo_envio = "TERRESTRE"
-    elif maritimo is not None:
-        tipo_envio = "MARITIMO"
-    else:
-        raise conflicto("Envío sin detalle terrestre/marítimo")
-
-    data = {
-        "id_envio": envio.id_envio,
-        "id_cliente": envio.id_cliente,
-        "id_tipo_producto": envio.id_tipo_producto,
-        "cantidad": envio.cantidad,
-        "fecha_registro": envio.fecha_registro,
-        "fecha_entrega": envio.fecha_entrega,
-        "precio_base": envio.precio_base,
-        "descuento": envio.descuento,
-        "precio_final": envio.precio_final,
-        "numero_guia": envio.numero_guia,
-        "tipo_envio": tipo_envio,
-        "id_bodega": None,
-        "placa_vehiculo": None,
-        "id_puerto": None,
-        "numero_flota": None,
-    }
-
-    if terrestre is not None:
-        data["id_bodega"] = terrestre.id_bodega
-        data["placa_vehiculo"] = terrestre.placa_vehiculo
-
+        return EnvioFila(
+            id_envio=envio.id_envio,
+            id_cliente=envio.id_cliente,
+            id_tipo_producto=envio.id_tipo_producto,
+            cantidad=envio.cantidad,
+            fecha_registro=envio.fecha_registro,
+            fecha_entrega=envio.fecha_entrega,
+            precio_base=envio.precio_base,
+            descuento=envio.descuento,
+            precio_final=envio.precio_final,
+            numero_guia=envio.numero_guia,
+            tipo_envio="TERRESTRE",
+            id_bodega=terrestre.id_bodega,
+            placa_vehiculo=terrestre.placa_vehiculo,
+            id_puerto=None,
+            numero_flota=None,
+        )
     if maritimo is not None:
-        data["id_puerto"] = maritimo.id_puerto
-        data["numero_flota"] = maritimo.numero_flota
-
-    return data
+        return EnvioFila(
+            id_envio=envio.id_envio,
+            id_cliente=envio.id_cliente,
+            id_tipo_producto=envio.id_tipo_producto,
+            cantidad=envio.cantidad,
+            fecha_registro=envio.fecha_registro,
+            fecha_entrega=envio.fecha_entrega,
+            precio_base=envio.precio_base,
+            descuento=envio.descuento,
+            precio_final=envio.precio_final,
+            numero_guia=envio.numero_guia,
+            tipo_envio="MARITIMO",
+            id_bodega=None,
+            placa_vehiculo=None,
+            id_puerto=maritimo.id_puerto,
+            numero_flota=maritimo.numero_flota,
+        )
+    raise conflicto("Envío sin detalle terrestre/marítimo")
 
 
 def _resolver_fechas(envio, dto: ActualizarEnvioDTO) -> tuple:
@@ -61,63 +88,79 @@ def _resolver_fechas(envio, dto: ActualizarEnvioDTO) -> tuple:
     return fecha_registro, fecha_entrega
 
 
-def _resolver_precios(*, precio_base: Decimal, cantidad: int, tipo_envio: TipoEnvio) -> tuple[Decimal, Decimal, Decimal]:
-    # Cuantiza a 2 decimales para consistencia con NUMERIC(10,2)
+def _resolver_precios(
+    *, precio_base: Decimal, cantidad: int, tipo_envio: TipoEnvio, **ambito: int | None
+) -> tuple[Decimal, Decimal, Decimal]:
+    """`ambito`: id_cliente, id_tipo_producto, id_bodega, id_puerto; eligen la regla."""
+    # Cuantiza a 2 decimales para consistencia con NUMERIC(10,2); la resta de dos montos
+    # cuantizados ya tiene 2 decimales.
     q = Decimal("0.01")
     precio_base_q = precio_base.quantize(q)
-    descuento_q = calcular_monto_descuento(precio_base=precio_base_q, cantidad=cantidad, tipo_envio=tipo_envio)
-    precio_final_q = (precio_base_q - descuento_q).quantize(q)
+    descuento_q = calcular_monto_descuento(
+        precio_base=precio_base_q, cantidad=cantidad, tipo_envio=tipo_envio, **ambito
+    )
+    precio_final_q = precio_base_q - descuento_q
     if precio_final_q < 0:
         raise conflicto("precio_final no puede ser negativo (precio_base - descuento)")
     return precio_base_q, descuento_q, precio_final_q
 
 
-def _actualizar_detalle_terrestre(db: Session, terrestre, dto: ActualizarEnvioDTO) -> None:
-    if terrestre is None:
-        raise conflicto("Detalle terrestre no existe")
-    if dto.id_puerto is not None or dto.numero_flota is not None:
-        raise conflicto("Campos marítimos no aplican para TERRESTRE")
-    if dto.id_bodega is not None:
-        obtener_bodega(db, dto.id_bodega)
-    repository.actualizar_terrestre(db, terrestre, id_bodega=dto.id_bodega, placa_vehiculo=dto.placa_vehiculo)
+_CAMPOS_BASE = {
+    "id_cliente",
+    "id_tipo_producto",
+    "cantidad",
+    "fecha_registro",
+    "fecha_entrega",
+    "numero_guia",
+}
+_CAMPOS_DETALLE: dict[str, set[str]] = {
+    "TERRESTRE": {"id_bodega", "placa_vehiculo"},
+    "MARITIMO": {"id_puerto", "numero_flota"},
+}
 
 
-def _actualizar_detalle_maritimo(db: Session, maritimo, dto: ActualizarEnvioDTO) -> None:
-    if maritimo is None:
-        raise conflicto("Detalle marítimo no existe")
-    if dto.id_bodega is not None or dto.placa_vehiculo is not None:
+def _validar_campos_detalle(tipo_actual: TipoEnvio, dto: ActualizarEnvioDTO) -> None:
+    if tipo_actual == "TERRESTRE" and (dto.id_puerto is not None or dto.numero_flota is not None):
+        raise conflicto("Campos marítimos no aplican para TERRESTRE")
+    if tipo_actual == "MARITIMO" and (dto.id_bodega is not None or dto.placa_vehiculo is not None):
         raise conflicto("Campos terrestres no aplican para MARITIMO")
+
+
+def _validar_fks(db: Session, dto: CrearEnvioDTO | ActualizarEnvioDTO) -> None:
+    """Consulta cada FK informada en el DTO y lanza 404 con el mensaje de la primera que falte."""
+    if dto.id_cliente is not None:
+        obtener_cliente(db, dto.id_cliente)
+    if dto.id_tipo_producto is not None:
+        obtener_tipo_producto(db, dto.id_tipo_producto)
+    if dto.id_bodega is not None:
+        obtener_bodega(db, dto.id_bodega)
     if dto.id_puerto is not None:
         obtener_puerto(db, dto.id_puerto)
-    repository.actualizar_maritimo(db, maritimo, id_puerto=dto.id_puerto, numero_flota=dto.numero_flota)
-
 
-def _actualizar_detalle(db: Session, tipo_actual: TipoEnvio, terrestre, maritimo, dto: ActualizarEnvioDTO) -> None:
-    if tipo_actual == "TERRESTRE":
-        _actualizar_detalle_terrestre(db, terrestre, dto)
-        return
-    if tipo_actual == "MARITIMO":
-        _actualizar_detalle_maritimo(db, maritimo, dto)
-        return
-    raise conflicto("tipo_envio inválido")
 
+def _ambito(dto: CrearEnvioDTO) -> dict[str, int | None]:
+    return {
+        "id_cliente": dto.id_cliente,
+        "id_tipo_producto": dto.id_tipo_producto,
+        "id_bodega": dto.id_bodega,
+        "id_puerto": dto.id_puerto,
+    }
 
-def crear_envio(db: Session, dto: CrearEnvioDTO):
-    obtener_cliente(db, dto.id_cliente)
-    # Valida existencia de FKs
-    obtener_tipo_producto(db, dto.id_tipo_producto)
 
+def crear_envio(db: Session, dto: CrearEnvioDTO, *, confirmar: bool = True):
+    """Con `confirmar=False` deja el INSERT sin commit (ver `repository.crear`)."""
+    asegurar_reglas(db)
     tipo_envio: TipoEnvio = dto.tipo_envio
     precio_base, descuento, precio_final = _resolver_precios(
         precio_base=dto.precio_base,
         cantidad=dto.cantidad,
         tipo_envio=tipo_envio,
+        **_ambito(dto),
     )
 
     try:
         if dto.tipo_envio == "TERRESTRE":
-            obtener_bodega(db, dto.id_bodega)  # type: ignore[arg-type]
-            envio, terrestre = repository.crear_terrestre(
+            creado = repository.crear_terrestre(
                 db,
                 id_cliente=dto.id_cliente,
                 id_tipo_producto=dto.id_tipo_producto,
@@ -130,28 +173,151 @@ def crear_envio(db: Session, dto: CrearEnvioDTO):
                 numero_guia=dto.numero_guia,
                 id_bodega=dto.id_bodega,  # type: ignore[arg-type]
                 placa_vehiculo=dto.placa_vehiculo or "",
+                confirmar=confirmar,
             )
-            return envio, terrestre, None
+        else:
+            creado = repository.crear_maritimo(
+                db,
+                id_cliente=dto.id_cliente,
+                id_tipo_producto=dto.id_tipo_producto,
+                cantidad=dto.cantidad,
+                fecha_registro=dto.fecha_registro,
+                fecha_entrega=dto.fecha_entrega,
+                precio_base=precio_base,
+                descuento=descuento,
+                precio_final=precio_final,
+                numero_guia=dto.numero_guia,
+                id_puerto=dto.id_puerto,  # type: ignore[arg-type]
+                numero_flota=dto.numero_flota or "",
+                confirmar=confirmar,
+            )
+    except IntegrityError as exc:
+        raise conflicto("No se pudo crear el envío (posible número_guía duplicado)") from exc
 
-        obtener_puerto(db, dto.id_puerto)  # type: ignore[arg-type]
-        envio, maritimo = repository.crear_maritimo(
-            db,
-            id_cliente=dto.id_cliente,
-            id_tipo_producto=dto.id_tipo_producto,
-            cantidad=dto.cantidad,
-            fecha_registro=dto.fecha_registro,
-            fecha_entrega=dto.fecha_entrega,
-            precio_base=precio_base,
-            descuento=descuento,
-            precio_final=precio_final,
-            numero_guia=dto.numero_guia,
-            id_puerto=dto.id_puerto,  # type: ignore[arg-type]
-            numero_flota=dto.numero_flota or "",
+    if creado is None:
+        # El INSERT no devolvió filas: alguna FK no existe. Solo en este caso se consulta
+        # cada una para responder con el error concreto.
+        _validar_fks(db, dto)
+        raise conflicto("No se pudo crear el envío")
+
+    envio, detalle = creado
+    if tipo_envio == "TERRESTRE":
+        return envio, detalle, None
+    return envio, None, detalle
+
+
+def _mensaje_validacion(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" if err["loc"] else err["msg"]
+        for err in exc.errors()
+    )
+
+
+def fila_envio(dto: CrearEnvioDTO) -> tuple[dict, str, dict]:
+    """`(valores, tipo_envio, detalle)` de un envío nuevo, con los precios ya resueltos.
+
+    Usa las reglas de descuento ya cargadas: quien llama debe haber hecho `asegurar_reglas`.
+    """
+    precio_base, descuento, precio_final = _resolver_precios(
+        precio_base=dto.precio_base,
+        cantidad=dto.cantidad,
+        tipo_envio=dto.tipo_envio,
+        **_ambito(dto),
+    )
+    valores = {
+        "id_cliente": dto.id_cliente,
+        "id_tipo_producto": dto.id_tipo_producto,
+        "cantidad": dto.cantidad,
+        "fecha_registro": dto.fecha_registro,
+        "fecha_entrega": dto.fecha_entrega,
+        "precio_base": precio_base,
+        "descuento": descuento,
+        "precio_final": precio_final,
+        "numero_guia": dto.numero_guia,
+    }
+    if dto.tipo_envio == "TERRESTRE":
+        detalle = {"id_bodega": dto.id_bodega, "placa_vehiculo": dto.placa_vehiculo}
+    else:
+        detalle = {"id_puerto": dto.id_puerto, "numero_flota": dto.numero_flota}
+    return valores, dto.tipo_envio, detalle
+
+
+def crear_envios_lote(
+    db: Session,
+    items: list[dict[str, Any]],
+    *,
+    chunk_size: int,
+) -> list[ResultadoItemLoteDTO]:
+    """Crea envíos en bloque reportando el resultado de cada item.
+
+    Las FKs se validan con una consulta por entidad para todo el lote y los inserts se hacen
+    por bloques de `chunk_size` (un commit por bloque). Un item inválido no aborta el resto.
+    """
+    asegurar_reglas(db)
+    resultados: list[ResultadoItemLoteDTO | None] = [None] * len(items)
+
+    def rechazar(indice: int, guia: Any, error: str) -> None:
+        resultados[indice] = ResultadoItemLoteDTO(
+            indice=indice,
+            ok=False,
+            numero_guia=guia if isinstance(guia, str) else None,
+            error=error,
         )
-        return envio, None, maritimo
 
-    except IntegrityError as exc:
-        raise conflicto("No se pudo crear el envío (posible número_guía duplicado)") from exc
+    validos: list[tuple[int, CrearEnvioDTO]] = []
+    for indice, raw in enumerate(items):
+        try:
+            validos.append((indice, CrearEnvioDTO.model_validate(raw)))
+        except ValidationError as exc:
+            guia = raw.get("numero_guia") if isinstance(raw, dict) else None
+            rechazar(indice, guia, _mensaje_validacion(exc))
+
+    clientes = ids_clientes_existentes(db, {dto.id_cliente for _, dto in validos})
+    tipos = ids_tipos_producto_existentes(db, {dto.id_tipo_producto for _, dto in validos})
+    bodegas = ids_bodegas_existentes(db, {d.id_bodega for _, d in validos if d.id_bodega is not None})
+    puertos = ids_puertos_existentes(db, {d.id_puerto for _, d in validos if d.id_puerto is not None})
+    guias_usadas = repository.guias_existentes(db, {dto.numero_guia for _, dto in validos})
+
+    pendientes: list[tuple[int, str, tuple[dict, str, dict]]] = []
+    for indice, dto in validos:
+        if dto.id_cliente not in clientes:
+            rechazar(indice, dto.numero_guia, "Cliente no encontrado")
+        elif dto.id_tipo_producto not in tipos:
+            rechazar(indice, dto.numero_guia, "Tipo de producto no encontrado")
+        elif dto.tipo_envio == "TERRESTRE" and dto.id_bodega not in bodegas:
+            rechazar(indice, dto.numero_guia, "Bodega no encontrada")
+        elif dto.tipo_envio == "MARITIMO" and dto.id_puerto not in puertos:
+            rechazar(indice, dto.numero_guia, "Puerto no encontrado")
+        elif dto.numero_guia in guias_usadas:
+            rechazar(indice, dto.numero_guia, "numero_guia duplicado")
+        else:
+            guias_usadas.add(dto.numero_guia)
+            try:
+                pendientes.append((indice, dto.numero_guia, fila_envio(dto)))
+            except HTTPException as exc:
+                rechazar(indice, dto.numero_guia, str(exc.detail))
+
+    for inicio in range(0, len(pendientes), chunk_size):
+        bloque = pendientes[inicio : inicio + chunk_size]
+        filas = [fila for _, _, fila in bloque]
+        try:
+            ids: list[int | None] = list(repository.crear_lote(db, filas))
+        except IntegrityError:
+            # Otro proceso insertó una guía del bloque entre la validación y el insert.
+            ids = repository.crear_lote_por_item(db, filas)
+
+        for (indice, guia, _), id_envio in zip(bloque, ids):
+            if id_envio is None:
+                rechazar(indice, guia, "No se pudo crear el envío (posible número_guía duplicado)")
+            else:
+                resultados[indice] = ResultadoItemLoteDTO(
+                    indice=indice,
+                    ok=True,
+                    id_envio=id_envio,
+                    numero_guia=guia,
+                )
+
+    return [r for r in resultados if r is not None]
 
 
 def obtener_envio(db: Session, envio_id: int):
@@ -167,23 +333,85 @@ def listar_envios(
     page: int,
     page_size: int,
     q: str | None = None,
+    search_mode: ModoBusqueda = "substring",
     id_cliente: int | None = None,
     id_tipo_producto: int | None = None,
     tipo_envio: TipoEnvio | None = None,
+    cursor: str | None = None,
+    after_id: int | None = None,
+    include_total: bool | None = None,
+    total_mode: ModoTotal = "exact",
 ):
-    return repository.listar(
+    """`include_total=None`: cuenta en el modo por páginas y no por keyset (cada página del
+    cursor volvería a contar la tabla entera); True/False lo fuerzan."""
+    if cursor is not None and after_id is not None:
+        raise solicitud_invalida("Usa cursor o after_id, no ambos")
+    if cursor is not None:
+        try:
+            after_id = decodificar_cursor(cursor, clave=_CLAVE_CURSOR)
+        except ValueError as exc:
+            raise solicitud_invalida(str(exc)) from exc
+    if include_total is None:
+        include_total = after_id is None
+
+    items, total, siguiente_id = repository.listar(
         db,
         page=page,
         page_size=page_size,
         q=q,
+        search_mode=search_mode,
         id_cliente=id_cliente,
         id_tipo_producto=id_tipo_producto,
         tipo_envio=tipo_envio,
+        after_id=after_id,
+        include_total=include_total,
+        total_mode=total_mode,
     )
+    next_cursor = codificar_cursor(_CLAVE_CURSOR, siguiente_id) if siguiente_id is not None else None
+    return items, total, next_cursor
+
+
+def exportar_envios(
+    db: Session,
+    *,
+    formato: FormatoExportacion,
+    gzip: bool = False,
+    q: str | None = None,
+    search_mode: ModoBusqueda = "substring",
+    id_cliente: int | None = None,
+    id_tipo_producto: int | None = None,
+    tipo_envio: TipoEnvio | None = None,
+) -> Iterator[bytes]:
+    """Genera el export completo por chunks; cierra la sesión al terminar de iterar."""
+    try:
+        filas = repository.iterar(
+            db,
+            q=q,
+            search_mode=search_mode,
+            id_cliente=id_cliente,
+            id_tipo_producto=id_tipo_producto,
+            tipo_envio=tipo_envio,
+        )
+        chunks = generar_csv(filas) if formato == "csv" else generar_ndjson(filas)
+        yield from comprimir_gzip(chunks) if gzip else chunks
+    finally:
+        db.close()
+
+
+def importar_envios(db: Session, archivo: TextIO) -> ResultadoImportacionDTO:
+    try:
+        return importacion.importar_csv(db, archivo, max_rechazos=settings.import_max_rechazos)
+    except UnicodeDecodeError as exc:
+        raise solicitud_invalida("El CSV debe estar codificado en UTF-8") from exc
+    except (ValueError, csv.Error) as exc:
+        raise solicitud_invalida(str(exc)) from exc
 
 
 def actualizar_envio(db: Session, envio_id: int, dto: ActualizarEnvioDTO):
-    envio, terrestre, maritimo = obtener_envio(db, envio_id)
+    row = repository.obtener_por_id(db, envio_id, bloquear=True)
+    if row is None:
+        raise no_encontrado("Envío no encontrado")
+    envio, terrestre, maritimo = row
 
     tipo_actual: TipoEnvio
     if terrestre is not None:
@@ -194,42 +422,39 @@ def actualizar_envio(db: Session, envio_id: int, dto: ActualizarEnvioDTO):
         raise conflicto("Envío sin detalle terrestre/marítimo")
 
     _resolver_fechas(envio, dto)
-
-    if dto.id_cliente is not None:
-        obtener_cliente(db, dto.id_cliente)
-
-    if dto.id_tipo_producto is not None:
-        obtener_tipo_producto(db, dto.id_tipo_producto)
+    _validar_campos_detalle(tipo_actual, dto)
 
     cantidad = dto.cantidad if dto.cantidad is not None else envio.cantidad
     precio_base_in = dto.precio_base if dto.precio_base is not None else envio.precio_base
+    asegurar_reglas(db)
     precio_base, descuento, precio_final = _resolver_precios(
         precio_base=precio_base_in,
         cantidad=cantidad,
         tipo_envio=tipo_actual,
+        id_cliente=dto.id_cliente or envio.id_cliente,
+        id_tipo_producto=dto.id_tipo_producto or envio.id_tipo_producto,
+        id_bodega=dto.id_bodega or (terrestre.id_bodega if terrestre is not None else None),
+        id_puerto=dto.id_puerto or (maritimo.id_puerto if maritimo is not None else None),
     )
 
+    valores = dto.model_dump(include=_CAMPOS_BASE, exclude_none=True)
+    valores.update(precio_base=precio_base, descuento=descuento, precio_final=precio_final)
     try:
-        repository.actualizar_base(
+        actualizado = repository.actualizar(
             db,
-            envio,
-            id_cliente=dto.id_cliente,
-            id_tipo_producto=dto.id_tipo_producto,
-            cantidad=dto.cantidad,
-            fecha_registro=dto.fecha_registro,
-            fecha_entrega=dto.fecha_entrega,
-            precio_base=precio_base,
-            descuento=descuento,
-            precio_final=precio_final,
-            numero_guia=dto.numero_guia,
+            envio_id,
+            tipo_envio=tipo_actual,
+            valores=valores,
+            detalle=dto.model_dump(include=_CAMPOS_DETALLE[tipo_actual], exclude_none=True),
+            detalle_actual=terrestre if terrestre is not None else maritimo,
         )
-
-        _actualizar_detalle(db, tipo_actual, terrestre, maritimo, dto)
-
     except IntegrityError as exc:
         raise conflicto("No se pudo actualizar el envío (posible número_guía duplicado)") from exc
 
-    return obtener_envio(db, envio_id)
+    if actualizado is None:
+        _validar_fks(db, dto)
+        raise conflicto("No se pudo actualizar el envío")
+    return actualizado
 
 
 def eliminar_envio(db: Session, envio_id: int) -> None:
@@ -0,0 +1,85 @@
+"""Casos de uso de envíos sobre AsyncSession (DB_ASYNC=true).
+
+Las consultas son las del servicio y repositorio síncronos, ejecutadas con
+`AsyncSession.run_sync`: el SQL es idéntico y la E/S pasa por el driver async, sin ocupar
+un hilo del threadpool por request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.bodegas.service import obtener_bodega_async
+from app.clientes.service import obtener_cliente_async
+from app.comun.excepciones import conflicto
+from app.descuentos.service import asegurar_reglas
+from app.envios import repository, service
+from app.envios.schemas import ActualizarEnvioDTO, CrearEnvioDTO
+from app.puertos.service import obtener_puerto_async
+from app.tipos_producto.service import obtener_tipo_producto_async
+
+
+async def _validar_fks(db: AsyncSession, dto: CrearEnvioDTO) -> None:
+    """Consulta las FKs del DTO en paralelo (una sesión por consulta) y lanza el 404 de la
+    primera que falte, en el mismo orden que la versión síncrona."""
+
+    async def consultar(obtener, id_: int) -> None:
+        async with AsyncSession(db.bind) as otra:
+            await obtener(otra, id_)
+
+    consultas = [
+        (obtener, id_)
+        for obtener, id_ in (
+            (obtener_cliente_async, dto.id_cliente),
+            (obtener_tipo_producto_async, dto.id_tipo_producto),
+            (obtener_bodega_async, dto.id_bodega),
+            (obtener_puerto_async, dto.id_puerto),
+        )
+        if id_ is not None
+    ]
+    resultados = await asyncio.gather(
+        *(consultar(obtener, id_) for obtener, id_ in consultas), return_exceptions=True
+    )
+    for resultado in resultados:
+        if isinstance(resultado, BaseException):
+            raise resultado
+
+
+async def crear_envio(db: AsyncSession, dto: CrearEnvioDTO, *, confirmar: bool = True):
+    await db.run_sync(asegurar_reglas)
+    valores, tipo_envio, detalle = service.fila_envio(dto)
+    try:
+        creado = await db.run_sync(
+            repository.crear, valores, tipo_envio, detalle, confirmar=confirmar
+        )
+    except IntegrityError as exc:
+        raise conflicto("No se pudo crear el envío (posible número_guía duplicado)") from exc
+
+    if creado is None:
+        await _validar_fks(db, dto)
+        raise conflicto("No se pudo crear el envío")
+
+    envio, detalle_creado = creado
+    if tipo_envio == "TERRESTRE":
+        return envio, detalle_creado, None
+    return envio, None, detalle_creado
+
+
+async def obtener_envio(db: AsyncSession, envio_id: int):
+    return await db.run_sync(service.obtener_envio, envio_id)
+
+
+async def listar_envios(db: AsyncSession, **filtros):
+    """Mismos parámetros que `service.listar_envios`."""
+    return await db.run_sync(service.listar_envios, **filtros)
+
+
+async def actualizar_envio(db: AsyncSession, envio_id: int, dto: ActualizarEnvioDTO):
+    return await db.run_sync(service.actualizar_envio, envio_id, dto)
+
+
+async def eliminar_envio(db: AsyncSession, envio_id: int) -> None:
+    await db.run_sync(service.eliminar_envio, envio_id)
@@ -0,0 +1,263 @@
+"""Header `Idempotency-Key` para endpoints de creación.
+
+El primer request con una clave la reserva (fila con `estado_http` NULL) antes de validar el
+cuerpo y, al terminar bien, guarda los bytes de la respuesta. Un reintento con la misma clave
+y el mismo cuerpo recibe esa respuesta desde la cache en memoria o con un único SELECT, sin
+volver a validar ni insertar. Misma clave con otro cuerpo: 422; con el original aún en
+curso: 409. Si el request falla, la reserva se borra y el cliente puede reintentar.
+
+Con reserva, `POST /envios` no hace commit al insertar: `responder` guarda la respuesta y
+confirma ambas cosas en una única transacción. En `/envios/bulk` cada bloque hace su commit;
+si el request falla después de alguno, la reserva no se borra (vence a los
+`idempotencia_reserva_seconds`) y el reintento rechaza como duplicadas las guías ya creadas.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta, timezone
+from functools import cache
+from typing import Annotated, Any
+
+from fastapi import Depends, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.autenticacion.dependencies import obtener_usuario_actual
+from app.base_de_datos.configuracion import settings
+from app.comun.cache import CacheTTL
+from app.comun.dependencias import DBSession, DBSessionAsync
+from app.comun.excepciones import conflicto, no_procesable
+from app.idempotencia import repository
+from app.idempotencia.models import ClaveIdempotencia
+
+# (usuario, ruta, clave) -> (huella, estado_http, cuerpo), solo respuestas ya guardadas.
+_respuestas = CacheTTL(
+    "idempotencia",
+    maxsize=settings.idempotencia_cache_size,
+    ttl=settings.idempotencia_ttl_seconds,
+)
+
+
+class RespuestaRepetida(Exception):
+    """Corta el request con la respuesta guardada (se convierte en `Response` en `app.main`)."""
+
+    def __init__(self, estado_http: int, cuerpo: bytes) -> None:
+        self.estado_http = estado_http
+        self.cuerpo = cuerpo
+
+    def respuesta(self) -> Response:
+        return Response(
+            content=self.cuerpo,
+            status_code=self.estado_http,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+
+def _ahora() -> datetime:
+    return datetime.now(tz=timezone.utc)
+
+
+def _utc(momento: datetime) -> datetime:
+    # SQLite devuelve DateTime(timezone=True) sin zona; se guardó en UTC.
+    return momento if momento.tzinfo is not None else momento.replace(tzinfo=timezone.utc)
+
+
+@cache
+def _adaptador(modelo: Any) -> TypeAdapter:
+    return TypeAdapter(modelo)
+
+
+class _Reserva:
+    """Reserva de la clave de este request (o ninguna, sin header)."""
+
+    def __init__(
+        self, id_clave: tuple[str, str, str] | None, registro: ClaveIdempotencia | None
+    ) -> None:
+        self.id_clave = id_clave
+        self.registro = registro
+        # Hubo un commit después de reservar: ya no se puede liberar la clave.
+        self.confirmado = False
+
+    @property
+    def confirmar(self) -> bool:
+        """Si el servicio hace su propio commit (sin clave) o lo deja a `responder`."""
+        return self.registro is None
+
+    def _marcar_confirmado(self, _: Session) -> None:
+        self.confirmado = True
+
+    def _guardar(self, db: Session, contenido: Any, modelo: Any, estado_http: int) -> Response:
+        adaptador = _adaptador(modelo)
+        cuerpo = adaptador.dump_json(adaptador.validate_python(contenido))
+        ttl = settings.idempotencia_ttl_seconds
+        repository.completar(
+            db,
+            self.registro,
+            estado_http=estado_http,
+            cuerpo=cuerpo,
+            expira_en=_ahora() + timedelta(seconds=ttl),
+        )
+        _respuestas.guardar(self.id_clave, (self.registro.huella, estado_http, cuerpo), ttl=ttl)
+        return Response(content=cuerpo, status_code=estado_http, media_type="application/json")
+
+
+class Idempotencia(_Reserva):
+    def __init__(
+        self, db: Session, id_clave: tuple[str, str, str] | None, registro: ClaveIdempotencia | None
+    ) -> None:
+        super().__init__(id_clave, registro)
+        self.db = db
+
+    def responder(self, contenido: Any, modelo: Any, estado_http: int = 200) -> Any:
+        """Sin clave, retorna `contenido` tal cual (lo serializa FastAPI con su
+        response_model). Con clave, lo serializa como `modelo` y guarda los bytes con el mismo
+        commit que lo que quedó pendiente en la sesión."""
+        if self.registro is None:
+            return contenido
+        return self._guardar(self.db, contenido, modelo, estado_http)
+
+
+class IdempotenciaAsync(_Reserva):
+    """`Idempotencia` sobre la AsyncSession del request (rutas de `DB_ASYNC=true`)."""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        id_clave: tuple[str, str, str] | None,
+        registro: ClaveIdempotencia | None,
+    ) -> None:
+        super().__init__(id_clave, registro)
+        self.db = db
+
+    async def responder(self, contenido: Any, modelo: Any, estado_http: int = 200) -> Any:
+        if self.registro is None:
+            return contenido
+        return await self.db.run_sync(self._guardar, contenido, modelo, estado_http)
+
+
+def _reservar(
+    db: Session, id_clave: tuple[str, str, str], huella: str
+) -> tuple[ClaveIdempotencia, bool]:
+    """Registro de la clave y si la reservó este request (False: ya existía)."""
+    usuario, ruta, clave = id_clave
+    for _ in range(2):
+        ahora = _ahora()
+        expira_en = ahora + timedelta(seconds=settings.idempotencia_reserva_seconds)
+        registro = repository.obtener(db, usuario, ruta, clave)
+        if registro is None:
+            registro = repository.reservar(
+                db,
+                usuario=usuario,
+                ruta=ruta,
+                clave=clave,
+                huella=huella,
+                creado_en=ahora,
+                expira_en=expira_en,
+            )
+            if registro is not None:
+                return registro, True
+            continue  # Otro request la insertó entre el SELECT y el INSERT.
+        if _utc(registro.expira_en) > ahora:
+            return registro, False
+        if repository.retomar(db, registro, huella=huella, creado_en=ahora, expira_en=expira_en):
+            return registro, True
+    raise conflicto("Hay un request en curso con esta Idempotency-Key")
+
+
+def _repetir(guardada: tuple, huella: str) -> None:
+    huella_guardada, estado_http, cuerpo = guardada
+    if huella_guardada != huella:
+        raise no_procesable("Idempotency-Key ya usada con otro cuerpo")
+    if estado_http is None:
+        raise conflicto("Hay un request en curso con esta Idempotency-Key")
+    raise RespuestaRepetida(estado_http, cuerpo)
+
+
+def _existente(id_clave: tuple[str, str, str], registro: ClaveIdempotencia) -> tuple:
+    guardada = (registro.huella, registro.estado_http, registro.cuerpo)
+    if registro.estado_http is not None:
+        restante = (_utc(registro.expira_en) - _ahora()).total_seconds()
+        _respuestas.guardar(id_clave, guardada, ttl=restante)
+    return guardada
+
+
+async def idempotencia(
+    request: Request,
+    db: DBSession,
+    usuario: Annotated[dict, Depends(obtener_usuario_actual)],
+    clave: Annotated[
+        str | None, Header(alias="Idempotency-Key", min_length=1, max_length=255)
+    ] = None,
+) -> AsyncIterator[Idempotencia]:
+    if clave is None:
+        yield Idempotencia(db, None, None)
+        return
+
+    id_clave = (usuario["sub"], request.url.path, clave)
+    huella = hashlib.sha256(await request.body()).hexdigest()
+    guardada = _respuestas.obtener(id_clave)
+    registro = None
+    if guardada is None:
+        registro, propia = await run_in_threadpool(_reservar, db, id_clave, huella)
+        if not propia:
+            guardada = _existente(id_clave, registro)
+    if guardada is not None:
+        _repetir(guardada, huella)
+
+    idem = Idempotencia(db, id_clave, registro)
+    event.listen(db, "after_commit", idem._marcar_confirmado)
+    try:
+        yield idem
+    except BaseException:
+        if not idem.confirmado:
+            await run_in_threadpool(repository.liberar, db, registro)
+        raise
+    finally:
+        event.remove(db, "after_commit", idem._marcar_confirmado)
+
+
+async def idempotencia_async(
+    request: Request,
+    db: DBSessionAsync,
+    usuario: Annotated[dict, Depends(obtener_usuario_actual)],
+    clave: Annotated[
+        str | None, Header(alias="Idempotency-Key", min_length=1, max_length=255)
+    ] = None,
+) -> AsyncIterator[IdempotenciaAsync]:
+    """`idempotencia` sobre la AsyncSession: sin sesión síncrona ni hilos del threadpool."""
+    if clave is None:
+        yield IdempotenciaAsync(db, None, None)
+        return
+
+    id_clave = (usuario["sub"], request.url.path, clave)
+    huella = hashlib.sha256(await request.body()).hexdigest()
+    guardada = _respuestas.obtener(id_clave)
+    registro = None
+    if guardada is None:
+        registro, propia = await db.run_sync(_reservar, id_clave, huella)
+        if not propia:
+            guardada = _existente(id_clave, registro)
+    if guardada is not None:
+        _repetir(guardada, huella)
+
+    idem = IdempotenciaAsync(db, id_clave, registro)
+    event.listen(db.sync_session, "after_commit", idem._marcar_confirmado)
+    try:
+        yield idem
+    except BaseException:
+        if not idem.confirmado:
+            await db.run_sync(repository.liberar, registro)
+        raise
+    finally:
+        event.remove(db.sync_session, "after_commit", idem._marcar_confirmado)
+
+
+Idempotente = Annotated[Idempotencia, Depends(idempotencia)]
+IdempotenteAsync = Annotated[IdempotenciaAsync, Depends(idempotencia_async)]
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, LargeBinary, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.base_de_datos.base import Base
+
+
+class ClaveIdempotencia(Base):
+    """Respuesta guardada para un `Idempotency-Key` (ver `app.idempotencia.dependencies`)."""
+
+    __tablename__ = "clave_idempotencia"
+
+    id_clave: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # La clave es del cliente: se aísla por usuario y por ruta.
+    usuario: Mapped[str] = mapped_column(String(50), nullable=False)
+    ruta: Mapped[str] = mapped_column(String(100), nullable=False)
+    clave: Mapped[str] = mapped_column(String(255), nullable=False)
+    # sha256 del cuerpo del request: la misma clave con otro cuerpo es un error del cliente.
+    huella: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    # NULL mientras el request original está en curso (reserva).
+    estado_http: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    cuerpo: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+
+    creado_en: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    expira_en: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("usuario", "ruta", "clave", name="uq_clave_idempotencia"),
+    )
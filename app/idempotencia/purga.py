@@ -0,0 +1,37 @@
+"""Purga de claves `Idempotency-Key` vencidas, en lotes (para cron):
+
+    python -m app.idempotencia.purga [--lote 1000]
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from app.base_de_datos.configuracion import settings
+from app.idempotencia import repository
+
+
+def purgar(db: Session, *, lote: int | None = None) -> int:
+    """Borra las claves vencidas; retorna cuántas."""
+    lote = lote or settings.idempotencia_purga_lote
+    return repository.purgar_expiradas(db, ahora=datetime.now(tz=timezone.utc), lote=lote)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lote", type=int, default=settings.idempotencia_purga_lote)
+    args = parser.parse_args(argv)
+
+    from app.base_de_datos import modelos  # noqa: F401
+    from app.base_de_datos.sesion import engine
+
+    with Session(engine) as db:
+        print(f"claves eliminadas: {purgar(db, lote=args.lote)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
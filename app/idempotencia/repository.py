@@ -0,0 +1,105 @@
+from datetime import datetime
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.idempotencia.models import ClaveIdempotencia
+
+
+def obtener(db: Session, usuario: str, ruta: str, clave: str) -> ClaveIdempotencia | None:
+    return db.scalar(
+        select(ClaveIdempotencia).where(
+            ClaveIdempotencia.usuario == usuario,
+            ClaveIdempotencia.ruta == ruta,
+            ClaveIdempotencia.clave == clave,
+        )
+    )
+
+
+def reservar(db: Session, **valores) -> ClaveIdempotencia | None:
+    """Inserta la reserva de la clave. None si otro request la insertó antes; en ese caso
+    hace rollback (la sesión queda utilizable)."""
+    registro = ClaveIdempotencia(estado_http=None, cuerpo=None, **valores)
+    db.add(registro)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    return registro
+
+
+def retomar(
+    db: Session,
+    registro: ClaveIdempotencia,
+    *,
+    huella: str,
+    creado_en: datetime,
+    expira_en: datetime,
+) -> bool:
+    """Reutiliza una clave vencida que aún no se purgó. False si otro request la retomó antes."""
+    resultado = db.execute(
+        update(ClaveIdempotencia)
+        .where(
+            ClaveIdempotencia.id_clave == registro.id_clave,
+            ClaveIdempotencia.expira_en <= creado_en,
+        )
+        .values(
+            huella=huella, estado_http=None, cuerpo=None, creado_en=creado_en, expira_en=expira_en
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    if resultado.rowcount != 1:
+        return False
+    db.refresh(registro)
+    return True
+
+
+def completar(
+    db: Session,
+    registro: ClaveIdempotencia,
+    *,
+    estado_http: int,
+    cuerpo: bytes,
+    expira_en: datetime,
+) -> None:
+    registro.estado_http = estado_http
+    registro.cuerpo = cuerpo
+    registro.expira_en = expira_en
+    db.commit()
+
+
+def liberar(db: Session, registro: ClaveIdempotencia) -> None:
+    """Borra la reserva de un request que falló, para que el cliente pueda reintentar."""
+    db.rollback()
+    db.execute(
+        delete(ClaveIdempotencia).where(
+            ClaveIdempotencia.id_clave == registro.id_clave,
+            ClaveIdempotencia.estado_http.is_(None),
+        )
+    )
+    db.commit()
+
+
+def purgar_expiradas(db: Session, *, ahora: datetime, lote: int) -> int:
+    """Borra las claves vencidas de a `lote` filas, un commit por lote (transacciones cortas
+    aunque se acumulen muchas). Retorna cuántas se borraron."""
+    ids = (
+        select(ClaveIdempotencia.id_clave)
+        .where(ClaveIdempotencia.expira_en <= ahora)
+        .order_by(ClaveIdempotencia.id_clave)
+        .limit(lote)
+    )
+    total = 0
+    while True:
+        borradas = db.execute(
+            delete(ClaveIdempotencia)
+            .where(ClaveIdempotencia.id_clave.in_(ids.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        total += borradas
+        if borradas < lote:
+            return total
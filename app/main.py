@@ -1,9 +1,24 @@
-from fastapi import FastAPI
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
+from fastapi import APIRouter, FastAPI
+from fastapi.datastructures import Default
+from fastapi.responses import JSONResponse
+
+from app.administracion.router import router as administracion_router
 from app.autenticacion.router import router as autenticacion_router
+from app.base_de_datos.configuracion import settings
+from app.base_de_datos.sesion import FijarPrimarioMiddleware
 from app.bodegas.router import router as bodegas_router
 from app.clientes.router import router as clientes_router
+from app.comun.respuestas import RespuestaJSON
+from app.descuentos.router import router as descuentos_router
+from app.envios.cotizacion import cerrar_executor
 from app.envios.router import router as envios_router
+from app.envios.router_async import router as envios_async_router
+from app.idempotencia.dependencies import RespuestaRepetida
+from app.metricas.registro import MetricasMiddleware
+from app.metricas.router import router as metricas_router
 from app.puertos.router import router as puertos_router
 from app.tipos_producto.router import router as tipos_producto_router
 from app.usuarios.router import router as usuarios_router
@@ -12,8 +27,32 @@ from app.usuarios.router import router as usuarios_router
 API_PREFIX = "/api/v1"
 
 
-def create_app() -> FastAPI:
-    app = FastAPI(title="Plataforma Logística API", version="0.1.0")
+def _reemplazar_rutas(base: APIRouter, reemplazos: APIRouter) -> APIRouter:
+    """Copia de `base` donde cada ruta con el mismo path y métodos que una de `reemplazos`
+    se sustituye por esta, conservando el orden original (importa para `/envios/{id}`)."""
+    por_clave = {(r.path, frozenset(r.methods)): r for r in reemplazos.routes}
+    combinado = APIRouter()
+    combinado.routes.extend(por_clave.get((r.path, frozenset(r.methods)), r) for r in base.routes)
+    return combinado
+
+
+@asynccontextmanager
+async def _ciclo_de_vida(_: FastAPI) -> AsyncIterator[None]:
+    yield
+    cerrar_executor()
+
+
+def create_app(db_async: bool | None = None) -> FastAPI:
+    # Default(...) conserva el camino rápido de FastAPI (pydantic dump_json) en rutas con
+    # response_model; la clase se usa para el resto (dicts, listas, respuestas de error propias).
+    respuesta = RespuestaJSON if settings.json_rapido else JSONResponse
+    app = FastAPI(
+        title="Plataforma Logística API",
+        version="0.1.0",
+        default_response_class=Default(respuesta),
+        lifespan=_ciclo_de_vida,
+    )
+    app.add_exception_handler(RespuestaRepetida, lambda _, exc: exc.respuesta())
 
     app.include_router(autenticacion_router, prefix=API_PREFIX, tags=["autenticacion"])
     app.include_router(usuarios_router, prefix=API_PREFIX, tags=["autenticacion"])
@@ -21,7 +60,20 @@ def create_app() -> FastAPI:
     app.include_router(tipos_producto_router, prefix=API_PREFIX, tags=["tipos-producto"])
     app.include_router(bodegas_router, prefix=API_PREFIX, tags=["bodegas"])
     app.include_router(puertos_router, prefix=API_PREFIX, tags=["puertos"])
-    app.include_router(envios_router, prefix=API_PREFIX, tags=["envios"])
+    if db_async is None:
+        db_async = settings.db_async
+    envios = _reemplazar_rutas(envios_router, envios_async_router) if db_async else envios_router
+    app.include_router(envios, prefix=API_PREFIX, tags=["envios"])
+    app.include_router(descuentos_router, prefix=API_PREFIX, tags=["reglas-descuento"])
+    app.include_router(administracion_router, prefix=API_PREFIX, tags=["administracion"])
+
+    app.add_middleware(FijarPrimarioMiddleware)
+    if settings.metrics_enabled or settings.debug:
+        app.add_middleware(
+            MetricasMiddleware, registrar=settings.metrics_enabled, encabezados=settings.debug
+        )
+    if settings.metrics_enabled:
+        app.include_router(metricas_router)
 
     @app.get(f"{API_PREFIX}/health", tags=["health"])
     def health() -> dict:
@@ -0,0 +1,248 @@
+"""Métricas en memoria (por proceso) con salida en formato de texto de Prometheus.
+
+- `MetricasMiddleware` (ASGI puro): requests por ruta/método/estado, histograma de latencia
+  por plantilla de ruta (`/api/v1/envios/{envio_id}`, no el path concreto) y requests en curso.
+- Eventos de cursor de SQLAlchemy (en todos los engines): consultas y tiempo de BD, totales y
+  por ruta, acumulados en un objeto por request que viaja en un ContextVar.
+
+Lo que se hace por request es O(1) y sin asignaciones grandes: dos perf_counter, un bisect y
+un lock; el armado del texto ocurre solo al consultar `/metrics`.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Mismos límites (segundos) que los buckets por defecto de prometheus_client.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+_SIN_RUTA = "sin_ruta"
+
+
+class ConsultasRequest:
+    """Consultas SQL y segundos de BD de un request."""
+
+    __slots__ = ("consultas", "segundos")
+
+    def __init__(self) -> None:
+        self.consultas = 0
+        self.segundos = 0.0
+
+
+consultas_actuales: ContextVar[ConsultasRequest | None] = ContextVar(
+    "consultas_actuales", default=None
+)
+
+
+class _Ruta:
+    __slots__ = ("buckets", "suma", "cuenta", "consultas", "segundos_bd")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(BUCKETS) + 1)  # el último es +Inf
+        self.suma = 0.0
+        self.cuenta = 0
+        self.consultas = 0
+        self.segundos_bd = 0.0
+
+
+class Registro:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._rutas: dict[tuple[str, str, int], _Ruta] = {}
+        self.en_curso = 0
+        self.consultas = 0
+        self.segundos_bd = 0.0
+
+    def observar(
+        self, metodo: str, ruta: str, estado: int, segundos: float, bd: ConsultasRequest
+    ) -> None:
+        clave = (metodo, ruta, estado)
+        indice = bisect_left(BUCKETS, segundos)
+        with self._lock:
+            datos = self._rutas.get(clave)
+            if datos is None:
+                datos = self._rutas[clave] = _Ruta()
+            datos.buckets[indice] += 1
+            datos.suma += segundos
+            datos.cuenta += 1
+            datos.consultas += bd.consultas
+            datos.segundos_bd += bd.segundos
+
+    def sumar_consulta(self, segundos: float) -> None:
+        with self._lock:
+            self.consultas += 1
+            self.segundos_bd += segundos
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._rutas.clear()
+            self.consultas = 0
+            self.segundos_bd = 0.0
+
+    def instantanea(self) -> dict[tuple[str, str, int], _Ruta]:
+        with self._lock:
+            copia = {}
+            for clave, datos in self._rutas.items():
+                nueva = _Ruta()
+                nueva.buckets = list(datos.buckets)
+                nueva.suma, nueva.cuenta = datos.suma, datos.cuenta
+                nueva.consultas, nueva.segundos_bd = datos.consultas, datos.segundos_bd
+                copia[clave] = nueva
+            return copia
+
+
+registro = Registro()
+
+
+def _plantilla(scope: dict) -> str:
+    # FastAPI >= 0.13x deja el path efectivo (con prefijo) en scope["fastapi"]; versiones
+    # anteriores aplanan los routers y basta con scope["route"].path.
+    contexto = scope.get("fastapi", {}).get("effective_route_context")
+    if contexto is not None:
+        return contexto.path
+    ruta = scope.get("route")
+    return getattr(ruta, "path", _SIN_RUTA) if ruta is not None else _SIN_RUTA
+
+
+class MetricasMiddleware:
+    """Con `registrar=False` no alimenta `registro`; con `encabezados=True` (modo debug) agrega
+    `X-DB-Queries` y `Server-Timing` a cada respuesta."""
+
+    def __init__(self, app: Any, *, registrar: bool = True, encabezados: bool = False) -> None:
+        self.app = app
+        self.registrar = registrar
+        self.encabezados = encabezados
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estado = 500
+        bd = ConsultasRequest()
+        token = consultas_actuales.set(bd)
+
+        async def enviar(mensaje: dict) -> None:
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                if self.encabezados:
+                    mensaje = _con_encabezados(mensaje, bd, time.perf_counter() - inicio)
+            await send(mensaje)
+
+        registro.en_curso += 1
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            segundos = time.perf_counter() - inicio
+            registro.en_curso -= 1
+            consultas_actuales.reset(token)
+            if self.registrar:
+                registro.observar(scope["method"], _plantilla(scope), estado, segundos, bd)
+
+
+def _con_encabezados(mensaje: dict, bd: ConsultasRequest, segundos: float) -> dict:
+    # Cuenta lo ejecutado hasta que empieza la respuesta (en streaming, no lo posterior).
+    timing = (
+        f'db;dur={bd.segundos * 1000:.2f};desc="{bd.consultas} queries", '
+        f"app;dur={segundos * 1000:.2f}"
+    )
+    return {
+        **mensaje,
+        "headers": [
+            *mensaje.get("headers", ()),
+            (b"x-db-queries", str(bd.consultas).encode()),
+            (b"server-timing", timing.encode()),
+        ],
+    }
+
+
+# Una conexión ejecuta un cursor a la vez: basta con guardar el inicio de la consulta actual.
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info["inicio_consulta"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany) -> None:
+    segundos = time.perf_counter() - conn.info["inicio_consulta"]
+    registro.sumar_consulta(segundos)
+    bd = consultas_actuales.get()
+    if bd is not None:
+        bd.consultas += 1
+        bd.segundos += segundos
+
+
+def _etiquetas(**valores: object) -> str:
+    partes = []
+    for nombre, valor in valores.items():
+        texto = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{nombre}="{texto}"')
+    return "{" + ",".join(partes) + "}"
+
+
+def texto_prometheus(gauges: list[tuple[str, str, dict, float]] = ()) -> str:
+    """Formato de exposición de texto de Prometheus (v0.0.4).
+
+    `gauges` agrega series calculadas al momento: `(nombre, tipo, etiquetas, valor)`.
+    """
+    lineas = [
+        "# HELP http_requests_total Requests HTTP atendidos.",
+        "# TYPE http_requests_total counter",
+    ]
+    rutas = registro.instantanea()
+    for (metodo, ruta, estado), datos in sorted(rutas.items()):
+        et = _etiquetas(method=metodo, route=ruta, status=estado)
+        lineas.append(f"http_requests_total{et} {datos.cuenta}")
+
+    lineas += [
+        "# HELP http_request_duration_seconds Latencia por plantilla de ruta.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (metodo, ruta, estado), datos in sorted(rutas.items()):
+        acumulado = 0
+        for limite, cantidad in zip((*BUCKETS, "+Inf"), datos.buckets):
+            acumulado += cantidad
+            et = _etiquetas(method=metodo, route=ruta, status=estado, le=limite)
+            lineas.append(f"http_request_duration_seconds_bucket{et} {acumulado}")
+        et = _etiquetas(method=metodo, route=ruta, status=estado)
+        lineas.append(f"http_request_duration_seconds_sum{et} {datos.suma!r}")
+        lineas.append(f"http_request_duration_seconds_count{et} {datos.cuenta}")
+
+    lineas += [
+        "# HELP http_request_db_queries_total Consultas SQL emitidas, por ruta.",
+        "# TYPE http_request_db_queries_total counter",
+    ]
+    for (metodo, ruta, estado), datos in sorted(rutas.items()):
+        et = _etiquetas(method=metodo, route=ruta, status=estado)
+        lineas.append(f"http_request_db_queries_total{et} {datos.consultas}")
+    lineas += [
+        "# HELP http_request_db_seconds_total Tiempo en BD, por ruta.",
+        "# TYPE http_request_db_seconds_total counter",
+    ]
+    for (metodo, ruta, estado), datos in sorted(rutas.items()):
+        et = _etiquetas(method=metodo, route=ruta, status=estado)
+        lineas.append(f"http_request_db_seconds_total{et} {datos.segundos_bd!r}")
+
+    series: list[tuple[str, str, dict, float]] = [
+        ("http_requests_in_flight", "gauge", {}, registro.en_curso),
+        ("db_queries_total", "counter", {}, registro.consultas),
+        ("db_query_seconds_total", "counter", {}, registro.segundos_bd),
+        *gauges,
+    ]
+    declarados: set[str] = set()
+    for nombre, tipo, etiquetas, valor in series:
+        if nombre not in declarados:
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            declarados.add(nombre)
+        et = _etiquetas(**etiquetas) if etiquetas else ""
+        lineas.append(f"{nombre}{et} {valor!r}")
+    return "\n".join(lineas) + "\n"
@@ -0,0 +1,34 @@
+import anyio.to_thread
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.base_de_datos.pool import estadisticas_pools
+from app.metricas.registro import texto_prometheus
+
+router = APIRouter()
+
+_POOL = (
+    ("db_pool_checked_out", "gauge", "checked_out", 1),
+    ("db_pool_overflow", "gauge", "overflow", 1),
+    ("db_pool_checkouts_total", "counter", "checkouts", 1),
+    ("db_pool_checkout_timeouts_total", "counter", "timeouts", 1),
+    ("db_pool_checkout_wait_seconds_total", "counter", "espera_total_ms", 0.001),
+    ("db_pool_checkout_wait_max_seconds", "gauge", "espera_max_ms", 0.001),
+)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metricas() -> Response:
+    # Async a propósito: el limitador del threadpool de anyio se lee desde el event loop.
+    limitador = anyio.to_thread.current_default_thread_limiter()
+    gauges = [
+        ("threadpool_tokens", "gauge", {}, limitador.total_tokens),
+        ("threadpool_tokens_in_use", "gauge", {}, limitador.borrowed_tokens),
+        ("threadpool_tasks_waiting", "gauge", {}, limitador.statistics().tasks_waiting),
+    ]
+    pools = estadisticas_pools()
+    for nombre, tipo, campo, escala in _POOL:
+        for pool, datos in pools.items():
+            if campo in datos:
+                gauges.append((nombre, tipo, {"pool": pool}, datos[campo] * escala))
+    return Response(texto_prometheus(gauges), media_type="text/plain; version=0.0.4; charset=utf-8")
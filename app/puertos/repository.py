@@ -1,6 +1,7 @@
-from sqlalchemy import Select, func, select
+from sqlalchemy import Select, select
 from sqlalchemy.orm import Session
 
+from app.comun.paginacion import ModoTotal, contar_total, invalidar_conteos
 from app.puertos.models import Puerto
 
 
@@ -12,6 +13,7 @@ def crear(db: Session, *, nombre: str, ciudad: str | None) -> Puerto:
     obj = Puerto(nombre=nombre, ciudad=ciudad)
     db.add(obj)
     db.commit()
+    invalidar_conteos("puerto")
     db.refresh(obj)
     return obj
 
@@ -20,6 +22,13 @@ def obtener_por_id(db: Session, puerto_id: int) -> Puerto | None:
     return db.scalar(_base_query().where(Puerto.id_puerto == puerto_id))
 
 
+def ids_existentes(db: Session, ids: set[int]) -> set[int]:
+    if not ids:
+        return set()
+    query = _base_query().with_only_columns(Puerto.id_puerto).where(Puerto.id_puerto.in_(ids))
+    return set(db.scalars(query))
+
+
 def listar(
     db: Session,
     *,
@@ -27,7 +36,9 @@ def listar(
     page_size: int,
     q: str | None = None,
     ciudad: str | None = None,
-) -> tuple[list[Puerto], int]:
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
+) -> tuple[list[Puerto], int | None]:
     query = _base_query()
     if q:
         like = f"%{q.strip()}%"
@@ -35,10 +46,17 @@ def listar(
     if ciudad:
         query = query.where(Puerto.ciudad == ciudad)
 
-    total = db.scalar(select(func.count()).select_from(query.subquery())) or 0
+    total = contar_total(
+        db,
+        query,
+        tabla="puerto",
+        filtros=(("q", q), ("ciudad", ciudad)),
+        include_total=include_total,
+        total_mode=total_mode,
+    )
     offset = (page - 1) * page_size
     items = db.scalars(query.order_by(Puerto.id_puerto.asc()).offset(offset).limit(page_size)).all()
-    return items, int(total)
+    return items, total
 
 
 def actualizar(
@@ -55,6 +73,7 @@ def actualizar(
 
     db.add(puerto)
     db.commit()
+    invalidar_conteos("puerto")
     db.refresh(puerto)
     return puerto
 
@@ -63,3 +82,4 @@ def eliminar(db: Session, puerto: Puerto) -> None:
     puerto.activo = False
     db.add(puerto)
     db.commit()
+    invalidar_conteos("puerto")
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, Query
 
 from app.autenticacion.dependencies import obtener_admin_actual, obtener_usuario_actual
-from app.comun.dependencias import DBSession
+from app.comun.dependencias import DBSession, DBSessionLectura
+from app.comun.paginacion import ModoTotal
 from app.puertos.schemas import ActualizarPuertoDTO, CrearPuertoDTO, ListaPuertosDTO, PuertoDTO
 from app.puertos.service import (
     actualizar_puerto,
@@ -22,14 +23,24 @@ def crear(dto: CrearPuertoDTO, db: DBSession, _: dict = Depends(obtener_admin_ac
 
 @router.get("/puertos", response_model=ListaPuertosDTO)
 def listar(
-    db: DBSession,
+    db: DBSessionLectura,
     _: dict = Depends(obtener_usuario_actual),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     q: str | None = Query(None, min_length=1),
     ciudad: str | None = None,
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
 ) -> ListaPuertosDTO:
-    items, total = listar_puertos(db, page=page, page_size=page_size, q=q, ciudad=ciudad)
+    items, total = listar_puertos(
+        db,
+        page=page,
+        page_size=page_size,
+        q=q,
+        ciudad=ciudad,
+        include_total=include_total,
+        total_mode=total_mode,
+    )
     return ListaPuertosDTO(
         page=page,
         page_size=page_size,
@@ -39,7 +50,7 @@ def listar(
 
 
 @router.get("/puertos/{puerto_id}", response_model=PuertoDTO)
-def obtener(puerto_id: int, db: DBSession, _: dict = Depends(obtener_usuario_actual)) -> PuertoDTO:
+def obtener(puerto_id: int, db: DBSessionLectura, _: dict = Depends(obtener_usuario_actual)) -> PuertoDTO:
     obj = obtener_puerto(db, puerto_id)
     return PuertoDTO.model_validate(obj, from_attributes=True)
 
@@ -20,5 +20,5 @@ class PuertoDTO(BaseModel):
 class ListaPuertosDTO(BaseModel):
     page: int
     page_size: int
-    total: int
+    total: int | None
     items: list[PuertoDTO]
@@ -1,37 +1,99 @@
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.base_de_datos.configuracion import settings
+from app.comun.cache import CacheTTL, clave_por_origen
 from app.comun.excepciones import conflicto, no_encontrado
+from app.comun.paginacion import ModoTotal
 from app.puertos import repository
-from app.puertos.schemas import ActualizarPuertoDTO, CrearPuertoDTO
+from app.puertos.schemas import ActualizarPuertoDTO, CrearPuertoDTO, PuertoDTO
+
+# Catálogo casi estático: se cachean DTOs por id y las páginas del listado sin filtros.
+# Toda escritura por este servicio vacía la cache.
+_cache = CacheTTL(
+    "puertos",
+    maxsize=settings.catalog_cache_size,
+    ttl=settings.catalog_cache_ttl_seconds,
+)
 
 
 def crear_puerto(db: Session, dto: CrearPuertoDTO):
     try:
-        return repository.crear(db, nombre=dto.nombre, ciudad=dto.ciudad)
+        obj = repository.crear(db, nombre=dto.nombre, ciudad=dto.ciudad)
     except IntegrityError as exc:
         raise conflicto("No se pudo crear el puerto") from exc
+    _cache.limpiar()
+    return obj
 
 
-def obtener_puerto(db: Session, puerto_id: int):
+def _obtener_modelo(db: Session, puerto_id: int):
     obj = repository.obtener_por_id(db, puerto_id)
     if obj is None:
         raise no_encontrado("Puerto no encontrado")
     return obj
 
 
-def listar_puertos(db: Session, *, page: int, page_size: int, q: str | None = None, ciudad: str | None = None):
-    return repository.listar(db, page=page, page_size=page_size, q=q, ciudad=ciudad)
+def obtener_puerto(db: Session, puerto_id: int) -> PuertoDTO:
+    clave = clave_por_origen(db, puerto_id)
+    dto = None if clave is None else _cache.obtener(clave)
+    if dto is None:
+        dto = PuertoDTO.model_validate(_obtener_modelo(db, puerto_id), from_attributes=True)
+        if clave is not None:
+            _cache.guardar(clave, dto)
+    return dto
+
+
+async def obtener_puerto_async(db: AsyncSession, puerto_id: int) -> PuertoDTO:
+    return await db.run_sync(obtener_puerto, puerto_id)
+
+
+def ids_puertos_existentes(db: Session, ids: set[int]) -> set[int]:
+    """Subconjunto de `ids` que existen, en una sola consulta."""
+    return repository.ids_existentes(db, ids)
+
+
+def listar_puertos(
+    db: Session,
+    *,
+    page: int,
+    page_size: int,
+    q: str | None = None,
+    ciudad: str | None = None,
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
+):
+    clave = clave_por_origen(db, "lista", page, page_size, include_total, total_mode)
+    usar_cache = q is None and ciudad is None and clave is not None
+    if usar_cache and (pagina := _cache.obtener(clave)) is not None:
+        return pagina
+
+    items, total = repository.listar(
+        db,
+        page=page,
+        page_size=page_size,
+        q=q,
+        ciudad=ciudad,
+        include_total=include_total,
+        total_mode=total_mode,
+    )
+    pagina = ([PuertoDTO.model_validate(o, from_attributes=True) for o in items], total)
+    if usar_cache:
+        _cache.guardar(clave, pagina)
+    return pagina
 
 
 def actualizar_puerto(db: Session, puerto_id: int, dto: ActualizarPuertoDTO):
-    obj = obtener_puerto(db, puerto_id)
+    obj = _obtener_modelo(db, puerto_id)
     try:
-        return repository.actualizar(db, obj, nombre=dto.nombre, ciudad=dto.ciudad)
+        obj = repository.actualizar(db, obj, nombre=dto.nombre, ciudad=dto.ciudad)
     except IntegrityError as exc:
         raise conflicto("No se pudo actualizar el puerto") from exc
+    _cache.limpiar()
+    return obj
 
 
 def eliminar_puerto(db: Session, puerto_id: int) -> None:
-    obj = obtener_puerto(db, puerto_id)
+    obj = _obtener_modelo(db, puerto_id)
     repository.eliminar(db, obj)
+    _cache.limpiar()
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.testclient import TestClient
+
+from app.autenticacion import dependencies
+from app.autenticacion.dependencies import obtener_usuario_actual
+from app.autenticacion.jwt_handler import crear_token
+from app.comun import cache
+from app.comun.cache import CacheTTL
+
+
+def _cred(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def test_token_repetido_no_se_decodifica_otra_vez(monkeypatch: pytest.MonkeyPatch) -> None:
+    token = crear_token({"sub": "ana", "role": "user"})
+    llamadas = []
+    original = dependencies.decodificar_token
+    monkeypatch.setattr(dependencies, "decodificar_token", lambda t: llamadas.append(t) or original(t))
+
+    for _ in range(5):
+        assert obtener_usuario_actual(_cred(token)) == {"sub": "ana", "role": "user"}
+    assert len(llamadas) == 1
+
+    # Un dict mutado por el llamador no contamina la cache.
+    obtener_usuario_actual(_cred(token))["role"] = "admin"
+    assert obtener_usuario_actual(_cred(token))["role"] == "user"
+
+
+def test_entrada_vencida_o_desalojada_vuelve_a_verificar(monkeypatch: pytest.MonkeyPatch) -> None:
+    token = crear_token({"sub": "ana", "role": "user"}, exp_minutes=1)
+    obtener_usuario_actual(_cred(token))
+
+    def rechazar(_: str) -> dict:
+        raise ValueError("firma inválida")
+
+    monkeypatch.setattr(dependencies, "decodificar_token", rechazar)
+    assert obtener_usuario_actual(_cred(token))["sub"] == "ana"  # servido desde la cache
+
+    # Pasado el `exp` la entrada ya no sirve.
+    ahora = time.monotonic()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: ahora + 61)
+    with pytest.raises(HTTPException) as exc:
+        obtener_usuario_actual(_cred(token))
+    assert exc.value.status_code == 401
+
+    monkeypatch.undo()
+    # Registro propio del test: `tokens_test` no queda en el registro global de caches.
+    monkeypatch.setattr(cache, "_caches", dict(cache._caches))
+    pequena = CacheTTL("tokens_test", maxsize=1, ttl=0)
+    monkeypatch.setattr(dependencies, "_tokens", pequena)
+    otro = crear_token({"sub": "luis", "role": "user"})
+    obtener_usuario_actual(_cred(token))
+    obtener_usuario_actual(_cred(otro))  # desaloja a `token`
+    obtener_usuario_actual(_cred(token))
+    assert pequena.estadisticas()["misses"] == 3
+
+
+def test_token_expirado_o_alterado_es_401(client: TestClient) -> None:
+    vencido = crear_token({"sub": "admin", "role": "admin"}, exp_minutes=-1)
+    r = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {vencido}"})
+    assert r.status_code == 401
+
+    token = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"}).json()[
+        "access_token"
+    ]
+    assert client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    alterado = token[:-2] + ("AA" if token[-2:] != "AA" else "BB")
+    r = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {alterado}"})
+    assert r.status_code == 401
+
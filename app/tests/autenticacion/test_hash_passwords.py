@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.base_de_datos.configuracion import settings
+from app.usuarios import hashing, repository
+from app.usuarios.passwords import calibrar_iteraciones, hash_password, necesita_rehash
+
+
+def test_pool_saturado_responde_503(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    cupos = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(hashing, "_cupos", cupos)
+    cupos.acquire()  # otro hash en curso ocupa el único cupo
+
+    r = client.post("/api/v1/auth/register", json={"username": "user1", "password": "secret123"})
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+    cupos.release()
+    r = client.post("/api/v1/auth/register", json={"username": "user1", "password": "secret123"})
+    assert r.status_code == 200
+
+
+def test_login_rehashea_con_parametros_vigentes(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "password_iterations", 1_000)
+    r = client.post("/api/v1/auth/register", json={"username": "user1", "password": "secret123"})
+    assert r.status_code == 200
+
+    nuevos: list[str] = []
+    original = repository.actualizar_password_hash
+
+    def espiar(db, obj, password_hash):
+        nuevos.append(password_hash)
+        return original(db, obj, password_hash)
+
+    monkeypatch.setattr(repository, "actualizar_password_hash", espiar)
+    monkeypatch.setattr(settings, "password_iterations", 2_000)
+
+    login = {"username": "user1", "password": "secret123"}
+    assert client.post("/api/v1/auth/token", json=login).status_code == 200
+    assert len(nuevos) == 1 and nuevos[0].startswith("pbkdf2_sha256$2000$")
+
+    # Con el hash ya actualizado no se vuelve a escribir.
+    assert client.post("/api/v1/auth/token", json=login).status_code == 200
+    assert len(nuevos) == 1
+    assert client.post("/api/v1/auth/token", json={**login, "password": "otra123"}).status_code == 401
+
+
+def test_necesita_rehash(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "password_iterations", 1_000)
+    assert not necesita_rehash(hash_password("secret123"))
+    assert necesita_rehash(hash_password("secret123", 500))
+    assert necesita_rehash("pbkdf2_sha1$1000$c2FsdA$ZGs")
+
+
+def test_calibrar_iteraciones() -> None:
+    iteraciones = calibrar_iteraciones(5, minimo=10_000)
+    assert iteraciones >= 10_000
+    assert iteraciones % 10_000 == 0
+    assert calibrar_iteraciones(50, minimo=0) > calibrar_iteraciones(1, minimo=0)
@@ -0,0 +1,71 @@
+from fastapi.testclient import TestClient
+
+
+def _headers(client: TestClient) -> dict:
+    resp = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    assert resp.status_code == 200
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def _stats(client: TestClient, headers: dict, nombre: str) -> dict:
+    r = client.get("/api/v1/admin/caches", headers=headers)
+    assert r.status_code == 200
+    return r.json()[nombre]
+
+
+def test_cache_por_id_se_invalida_al_escribir(client: TestClient) -> None:
+    headers = _headers(client)
+    bodega_id = client.post("/api/v1/bodegas", headers=headers, json={"nombre": "Norte"}).json()["id_bodega"]
+
+    antes = _stats(client, headers, "bodegas")
+    for _ in range(3):
+        assert client.get(f"/api/v1/bodegas/{bodega_id}", headers=headers).json()["nombre"] == "Norte"
+    stats = _stats(client, headers, "bodegas")
+    assert stats["misses"] - antes["misses"] == 1
+    assert stats["hits"] - antes["hits"] == 2
+
+    r = client.patch(f"/api/v1/bodegas/{bodega_id}", headers=headers, json={"nombre": "Sur"})
+    assert r.status_code == 200
+    assert client.get(f"/api/v1/bodegas/{bodega_id}", headers=headers).json()["nombre"] == "Sur"
+
+    assert client.delete(f"/api/v1/bodegas/{bodega_id}", headers=headers).status_code == 200
+    assert client.get(f"/api/v1/bodegas/{bodega_id}", headers=headers).status_code == 404
+
+
+def test_cache_de_listados_solo_sin_filtros(client: TestClient) -> None:
+    headers = _headers(client)
+    client.post("/api/v1/puertos", headers=headers, json={"nombre": "Cartagena", "ciudad": "Cartagena"})
+    antes = _stats(client, headers, "puertos")
+
+    assert client.get("/api/v1/puertos", headers=headers).json()["total"] == 1
+    assert client.get("/api/v1/puertos", headers=headers).json()["total"] == 1
+    assert client.get("/api/v1/puertos?q=Carta", headers=headers).json()["total"] == 1
+    stats = _stats(client, headers, "puertos")
+    assert stats["misses"] - antes["misses"] == 1
+    assert stats["hits"] - antes["hits"] == 1
+    assert stats["entradas"] == 1
+
+    client.post("/api/v1/puertos", headers=headers, json={"nombre": "Buenaventura"})
+    assert client.get("/api/v1/puertos", headers=headers).json()["total"] == 2
+
+    tipo_id = client.post("/api/v1/tipos-producto", headers=headers, json={"nombre": "Caja"}).json()[
+        "id_tipo_producto"
+    ]
+    assert len(client.get("/api/v1/tipos-producto", headers=headers).json()["items"]) == 1
+    assert client.delete(f"/api/v1/tipos-producto/{tipo_id}", headers=headers).status_code == 200
+    assert client.get("/api/v1/tipos-producto", headers=headers).json()["items"] == []
+
+
+def test_admin_caches_requiere_admin_y_permite_vaciar(client: TestClient) -> None:
+    headers = _headers(client)
+    bodega_id = client.post("/api/v1/bodegas", headers=headers, json={"nombre": "Norte"}).json()["id_bodega"]
+    client.get(f"/api/v1/bodegas/{bodega_id}", headers=headers)
+    assert _stats(client, headers, "bodegas")["entradas"] == 1
+
+    assert client.delete("/api/v1/admin/caches", headers=headers).status_code == 200
+    assert _stats(client, headers, "bodegas")["entradas"] == 0
+
+    client.post("/api/v1/auth/register", json={"username": "operador", "password": "operador123"})
+    token = client.post("/api/v1/auth/token", json={"username": "operador", "password": "operador123"})
+    r = client.get("/api/v1/admin/caches", headers={"Authorization": f"Bearer {token.json()['access_token']}"})
+    assert r.status_code == 403
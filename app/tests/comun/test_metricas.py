@@ -0,0 +1,84 @@
+import asyncio
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.metricas.registro import MetricasMiddleware, registro
+
+
+def _headers(client: TestClient) -> dict:
+    resp = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def _valor(texto: str, serie: str) -> float:
+    m = re.search(rf"^{re.escape(serie)} (\S+)$", texto, re.M)
+    assert m, serie
+    return float(m.group(1))
+
+
+def test_metrics_por_plantilla_de_ruta_con_tiempo_de_bd(client: TestClient) -> None:
+    headers = _headers(client)
+    registro.limpiar()
+    cliente_id = client.post("/api/v1/clientes", headers=headers, json={"nombre": "C"}).json()["id_cliente"]
+    for _ in range(3):
+        assert client.get(f"/api/v1/clientes/{cliente_id}", headers=headers).status_code == 200
+    client.get("/api/v1/clientes/999", headers=headers)
+    client.get("/no-existe")
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    texto = r.text
+
+    ok = 'method="GET",route="/api/v1/clientes/{cliente_id}",status="200"'
+    assert _valor(texto, f"http_requests_total{{{ok}}}") == 3
+    assert _valor(texto, f'http_request_duration_seconds_bucket{{{ok},le="+Inf"}}') == 3
+    assert _valor(texto, f"http_request_db_queries_total{{{ok}}}") == 3
+    assert _valor(texto, f"http_request_db_seconds_total{{{ok}}}") > 0
+    assert 'route="/api/v1/clientes/{cliente_id}",status="404"' in texto
+    assert 'route="sin_ruta",status="404"' in texto
+    assert "/api/v1/clientes/999" not in texto
+
+    assert _valor(texto, "http_requests_in_flight") == 1  # el propio GET /metrics
+    assert _valor(texto, "threadpool_tasks_waiting") == 0
+    assert 'db_pool_checkouts_total{pool="primario"}' in texto
+
+
+def _llamar(app, scope: dict) -> list[dict]:
+    enviados: list[dict] = []
+
+    async def receive() -> dict:
+        return {"type": "http.request"}
+
+    async def send(mensaje: dict) -> None:
+        enviados.append(mensaje)
+
+    asyncio.run(app(scope, receive, send))
+    return enviados
+
+
+def test_middleware_registra_cada_request_aun_si_la_app_falla() -> None:
+    async def app_vacia(scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def app_rota(scope, receive, send) -> None:
+        raise RuntimeError("falla")
+
+    registro.limpiar()
+    scope = {"type": "http", "method": "GET", "path": "/x"}
+    assert [m["type"] for m in _llamar(MetricasMiddleware(app_vacia), dict(scope))] == [
+        "http.response.start",
+        "http.response.body",
+    ]
+    with pytest.raises(RuntimeError):
+        _llamar(MetricasMiddleware(app_rota), dict(scope))
+    _llamar(MetricasMiddleware(app_vacia, registrar=False), dict(scope))
+    # Otros tipos de scope pasan sin registrarse.
+    _llamar(MetricasMiddleware(app_vacia), {"type": "lifespan"})
+
+    cuentas = {clave: datos.cuenta for clave, datos in registro.instantanea().items()}
+    assert cuentas == {("GET", "sin_ruta", 204): 1, ("GET", "sin_ruta", 500): 1}
+    assert registro.en_curso == 0
@@ -0,0 +1,79 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+
+from app.base_de_datos import pool as pool_mod
+from app.base_de_datos.configuracion import settings
+from app.base_de_datos.pool import PoolMedido, estadisticas_pool, medir
+from app.base_de_datos.sesion import motor_async, opciones_engine
+
+
+def test_pool_medido_reporta_uso_esperas_y_fugas(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "db_leak_threshold_seconds", 0.0)
+    monkeypatch.setattr(pool_mod, "_motores", {})
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=PoolMedido,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    medir(engine, "prueba")
+
+    retenida = engine.connect()
+    retenida.execute(text("SELECT 1"))
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    stats = pool_mod.estadisticas_pools()["prueba"]
+    assert (stats["size"], stats["checked_out"], stats["overflow"]) == (1, 1, 0)
+    assert (stats["checkouts"], stats["timeouts"]) == (1, 1)
+    assert len(stats["fugas"]) == 1 and stats["fugas"][0]["hilo"] == "MainThread"
+
+    retenida.close()
+    engine.dispose()  # recrea el pool: las métricas se conservan
+    with engine.connect() as conexion:
+        conexion.execute(text("SELECT 1"))
+    stats = pool_mod.estadisticas_pools()["prueba"]
+    assert stats["checked_out"] == 0 and stats["fugas"] == []
+    assert stats["checkouts"] == 2
+    engine.dispose()
+
+
+def test_umbral_de_fuga(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=PoolMedido)
+    medicion = pool_mod.MedicionPool(umbral_fuga=60.0)
+    engine.pool.medicion = medicion
+    with engine.connect():
+        medicion.checkout("otra")
+        assert medicion.fugas() == []
+        assert estadisticas_pool(engine, medicion)["checkouts"] == 1
+    engine.dispose()
+
+
+def test_opciones_engine(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert opciones_engine("sqlite://") == {"pool_pre_ping": settings.db_pool_pre_ping}
+
+    monkeypatch.setattr(settings, "db_pool_size", 20)
+    monkeypatch.setattr(settings, "db_pool_pre_ping", False)
+    monkeypatch.setattr(settings, "db_statement_timeout_ms", 5000)
+    monkeypatch.setattr(settings, "db_prepare_threshold", None)
+    opciones = opciones_engine("postgresql+psycopg://u:p@localhost/db")
+    assert opciones["pool_size"] == 20 and opciones["pool_pre_ping"] is False
+    assert opciones["connect_args"] == {
+        "prepare_threshold": None,
+        "options": "-c statement_timeout=5000",
+    }
+
+
+def test_admin_pool(client: TestClient) -> None:
+    token = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    r = client.get("/api/v1/admin/pool", headers={"Authorization": f"Bearer {token.json()['access_token']}"})
+    assert r.status_code == 200
+    assert "primario" in r.json()
+    assert r.json()["primario"]["pool"] == "PoolMedido"
+
+    # El AsyncEngine se crea (y se reporta) recién cuando una sesión async lo pide.
+    motor_async()
+    r = client.get("/api/v1/admin/pool", headers=r.request.headers)
+    assert "async" in r.json()
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+
+from app.autenticacion.jwt_handler import crear_token
+from app.base_de_datos import sesion
+from app.base_de_datos.base import Base
+from app.bodegas.models import Bodega
+from app.clientes.models import Cliente
+from app.comun.cache import limpiar_caches
+from app.main import create_app
+
+
+@pytest.fixture()
+def replica(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Primario y réplica en archivos distintos: lo escrito no llega a la réplica (lag)."""
+    primario = create_engine(f"sqlite:///{tmp_path / 'primario.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, nombre in ((primario, "En primario"), (replica, "En réplica")):
+        Base.metadata.create_all(engine)
+        with engine.begin() as conexion:
+            conexion.execute(insert(Cliente).values(id_cliente=1, nombre=nombre))
+            conexion.execute(insert(Bodega).values(id_bodega=1, nombre="Vieja"))
+    monkeypatch.setattr(sesion, "engine", primario)
+    monkeypatch.setattr(sesion, "engine_replica", replica)
+    limpiar_caches()
+
+
+def _cliente() -> TestClient:
+    token = crear_token({"sub": "admin", "role": "admin"})
+    return TestClient(create_app(db_async=False), headers={"Authorization": f"Bearer {token}"})
+
+
+@pytest.mark.usefixtures("replica")
+def test_lecturas_van_a_la_replica_salvo_tras_escribir(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Cada TestClient es un cliente con su propia cookie; la app puede ser otro worker.
+    escritor = _cliente()
+    lector = _cliente()
+
+    def nombre(client: TestClient) -> str:
+        r = client.get("/api/v1/clientes/1")
+        assert r.status_code == 200
+        return r.json()["nombre"]
+
+    assert nombre(escritor) == "En réplica"
+
+    # Una escritura rechazada no fija al cliente.
+    r = escritor.post("/api/v1/clientes", json={})
+    assert r.status_code == 422
+    assert sesion.COOKIE_PRIMARIO not in r.cookies
+
+    r = escritor.post("/api/v1/clientes", json={"nombre": "Nuevo"})
+    assert r.status_code == 200
+    assert sesion.COOKIE_PRIMARIO in r.cookies
+    assert nombre(escritor) == "En primario"  # read-your-writes
+    assert nombre(lector) == "En réplica"
+    assert escritor.get("/api/v1/clientes").json()["total"] == 2
+
+    # Con la cookie, otro proceso también lee del primario.
+    otro_worker = TestClient(create_app(db_async=False), headers=dict(escritor.headers))
+    otro_worker.cookies = escritor.cookies
+    assert nombre(otro_worker) == "En primario"
+
+    # Vencida la ventana, el escritor vuelve a la réplica.
+    ahora = time.time()
+    monkeypatch.setattr(sesion.time, "time", lambda: ahora + 6)
+    assert nombre(escritor) == "En réplica"
+
+
+
+@pytest.mark.usefixtures("replica")
+def test_cliente_fijado_no_lee_las_caches_llenadas_desde_la_replica() -> None:
+    escritor = _cliente()
+    lector = _cliente()
+    assert escritor.patch("/api/v1/bodegas/1", json={"nombre": "Nueva"}).status_code == 200
+
+    # El lector llena la cache de catálogos (y de conteos) con lo que tiene la réplica.
+    assert lector.get("/api/v1/bodegas/1").json()["nombre"] == "Vieja"
+    assert lector.get("/api/v1/bodegas").json()["items"][0]["nombre"] == "Vieja"
+
+    assert escritor.get("/api/v1/bodegas/1").json()["nombre"] == "Nueva"
+    assert escritor.get("/api/v1/bodegas").json()["items"][0]["nombre"] == "Nueva"
+
+
+@pytest.mark.usefixtures("replica")
+def test_post_que_no_escribe_no_fija_al_cliente() -> None:
+    client = _cliente()
+    r = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    assert r.status_code == 200
+    item = {"tipo_envio": "TERRESTRE", "cantidad": 11, "precio_base": "100.00"}
+    assert client.post("/api/v1/envios/cotizar/batch", json=[item]).status_code == 200
+    assert sesion.COOKIE_PRIMARIO not in client.cookies
+    assert client.get("/api/v1/clientes/1").json()["nombre"] == "En réplica"
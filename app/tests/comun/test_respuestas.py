@@ -0,0 +1,56 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.base_de_datos.configuracion import settings
+from app.comun.respuestas import RespuestaJSON
+from app.main import create_app
+
+
+def test_mismos_bytes_que_jsonresponse() -> None:
+    contenido = {
+        "texto": "Envío ñandú — 東京",
+        "entero": 10,
+        "real": 1.5,
+        "nulo": None,
+        "lista": [True, False, {"a": []}],
+        "anidado": {"b": {"c": "x"}},
+    }
+    assert RespuestaJSON(contenido).body == JSONResponse(contenido).body
+
+
+def test_serializa_decimal_y_fechas_como_la_api() -> None:
+    contenido = {
+        "precio_base": Decimal("1000.00"),
+        "fecha": date(2026, 2, 1),
+        "creado": datetime(2026, 2, 1, 8, 30, tzinfo=timezone.utc),
+    }
+    assert RespuestaJSON(contenido).body == (
+        b'{"precio_base":"1000.00","fecha":"2026-02-01","creado":"2026-02-01T08:30:00+00:00"}'
+    )
+
+
+def test_clase_por_defecto_configurable(monkeypatch) -> None:
+    assert create_app().router.default_response_class.value is RespuestaJSON
+
+    monkeypatch.setattr(settings, "json_rapido", False)
+    assert create_app().router.default_response_class.value is JSONResponse
+
+
+def test_respuestas_identicas_con_y_sin_json_rapido(client: TestClient, monkeypatch) -> None:
+    token = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+    client.post("/api/v1/clientes", headers=headers, json={"nombre": "Cliente ñ"})
+
+    urls = ("/api/v1/clientes", "/api/v1/auth/me")
+    rapido = [client.get(url, headers=headers).content for url in urls]
+
+    monkeypatch.setattr(settings, "json_rapido", False)
+    app = create_app()
+    app.dependency_overrides = client.app.dependency_overrides
+    with TestClient(app) as estandar:
+        lento = [estandar.get(url, headers=headers).content for url in urls]
+
+    assert rapido == lento
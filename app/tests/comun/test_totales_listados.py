@@ -0,0 +1,63 @@
+from fastapi.testclient import TestClient
+
+from app.comun import paginacion
+from app.comun.cache import estadisticas_caches
+
+
+def _headers(client: TestClient) -> dict:
+    resp = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    assert resp.status_code == 200
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def test_include_total_false_omite_conteo(client: TestClient) -> None:
+    headers = _headers(client)
+    client.post("/api/v1/bodegas", headers=headers, json={"nombre": "Bodega Norte"})
+
+    for ruta in ("bodegas", "puertos", "clientes", "tipos-producto", "envios"):
+        r = client.get(f"/api/v1/{ruta}?include_total=false", headers=headers)
+        assert r.status_code == 200
+        assert r.json()["total"] is None
+
+    r = client.get("/api/v1/bodegas?include_total=false", headers=headers)
+    assert len(r.json()["items"]) == 1
+
+
+def test_total_estimado_sin_estadisticas_cae_a_exacto(client: TestClient) -> None:
+    headers = _headers(client)
+    client.post("/api/v1/puertos", headers=headers, json={"nombre": "Cartagena", "ciudad": "Cartagena"})
+
+    r = client.get("/api/v1/puertos?total_mode=estimated", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["total"] == 1
+
+    r = client.get("/api/v1/puertos?total_mode=aproximado", headers=headers)
+    assert r.status_code == 422
+
+
+def test_total_estimado_solo_sin_where(client: TestClient, monkeypatch) -> None:
+    headers = _headers(client)
+    client.post("/api/v1/puertos", headers=headers, json={"nombre": "Cartagena", "ciudad": "Cartagena"})
+    puerto = client.post("/api/v1/puertos", headers=headers, json={"nombre": "Buenaventura"}).json()
+    client.delete(f"/api/v1/puertos/{puerto['id_puerto']}", headers=headers)
+    # Como Postgres con estadísticas: reltuples cuenta también las filas inactivas.
+    monkeypatch.setattr(paginacion, "_estimar_filas", lambda db, tabla: 1000)
+
+    assert client.get("/api/v1/envios?total_mode=estimated", headers=headers).json()["total"] == 1000
+    r = client.get("/api/v1/envios?total_mode=estimated&tipo_envio=MARITIMO", headers=headers)
+    assert r.json()["total"] == 0
+    # Los catálogos filtran por `activo`: conteo exacto.
+    assert client.get("/api/v1/puertos?total_mode=estimated", headers=headers).json()["total"] == 1
+
+
+def test_conteo_exacto_se_cachea_y_se_invalida_al_escribir(client: TestClient) -> None:
+    headers = _headers(client)
+    client.post("/api/v1/bodegas", headers=headers, json={"nombre": "Bodega Norte"})
+
+    hits = estadisticas_caches()["conteos"]["hits"]
+    assert client.get("/api/v1/bodegas?q=Norte", headers=headers).json()["total"] == 1
+    assert client.get("/api/v1/bodegas?q=Norte", headers=headers).json()["total"] == 1
+    assert estadisticas_caches()["conteos"]["hits"] == hits + 1
+
+    client.post("/api/v1/bodegas", headers=headers, json={"nombre": "Bodega Norte 2"})
+    assert client.get("/api/v1/bodegas?q=Norte", headers=headers).json()["total"] == 2
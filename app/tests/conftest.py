@@ -1,25 +1,47 @@
-from collections.abc import Generator
+import asyncio
+from collections.abc import AsyncGenerator, Callable, Generator, Iterator
+from contextlib import AbstractContextManager, contextmanager
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
 from sqlalchemy.pool import StaticPool
 
 from app.base_de_datos.base import Base
 from app.base_de_datos import modelos  # noqa: F401
-from app.base_de_datos.sesion import get_session
+from app.base_de_datos.sesion import (
+    get_session,
+    get_session_async,
+    get_session_lectura,
+    get_session_lectura_async,
+)
+from app.comun.cache import limpiar_caches
+from app.descuentos.service import recargar_reglas
 from app.main import create_app
 
 
-@pytest.fixture()
-def client() -> Generator[TestClient, None, None]:
-    engine = create_engine(
-        "sqlite+pysqlite:///:memory:",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
+# Cada test corre con el stack síncrono (SQLite en memoria) y con el async (rutas CRUD de
+# envíos sobre aiosqlite). En modo async ambos engines apuntan al mismo archivo temporal.
+@pytest.fixture(params=["sync", "async"])
+def client(request: pytest.FixtureRequest, tmp_path) -> Generator[TestClient, None, None]:
+    db_async = request.param == "async"
+    if db_async:
+        url = f"sqlite+pysqlite:///{tmp_path / 'test.db'}"
+        engine = create_engine(url)
+    else:
+        engine = create_engine(
+            "sqlite+pysqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
     Base.metadata.create_all(engine)
+    # Las caches y las reglas de descuento son por proceso; cada test arranca con una BD nueva.
+    limpiar_caches()
+    with Session(engine) as db:
+        recargar_reglas(db)
 
     def override_get_session() -> Generator[Session, None, None]:
         db = Session(engine)
@@ -28,7 +50,50 @@ def client() -> Generator[TestClient, None, None]:
         finally:
             db.close()
 
-    app = create_app()
+    app = create_app(db_async=db_async)
     app.dependency_overrides[get_session] = override_get_session
+    app.dependency_overrides[get_session_lectura] = override_get_session
+
+    if db_async:
+        async_engine = create_async_engine(url.replace("+pysqlite", "+aiosqlite"))
+
+        async def override_get_session_async() -> AsyncGenerator[AsyncSession, None]:
+            async with AsyncSession(async_engine, expire_on_commit=False) as db:
+                yield db
+
+        app.dependency_overrides[get_session_async] = override_get_session_async
+        app.dependency_overrides[get_session_lectura_async] = override_get_session_async
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+    if db_async:
+        asyncio.run(async_engine.dispose())
+    engine.dispose()
+
+
+@pytest.fixture()
+def max_consultas() -> Callable[[int], AbstractContextManager[list[str]]]:
+    """`with max_consultas(n): ...` falla si el bloque ejecuta más de `n` sentencias SQL.
+
+    Cuenta en todos los engines (también los async) y en el mensaje de error lista las
+    sentencias, para detectar N+1 y regresiones en la cantidad de consultas por endpoint.
+    """
+
+    @contextmanager
+    def limite(n: int) -> Iterator[list[str]]:
+        sentencias: list[str] = []
+
+        def contar(conn, cursor, statement, parameters, context, executemany) -> None:
+            sentencias.append(statement)
+
+        event.listen(Engine, "before_cursor_execute", contar)
+        try:
+            yield sentencias
+        finally:
+            event.remove(Engine, "before_cursor_execute", contar)
+        assert len(sentencias) <= n, (
+            f"{len(sentencias)} sentencias SQL (máximo {n}):\n" + "\n".join(sentencias)
+        )
 
-    yield TestClient(app)
+    return limite
@@ -0,0 +1,180 @@
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.base_de_datos.configuracion import settings
+from app.descuentos import recalculo
+from app.envios.base.discount_service import calcular_monto_descuento
+
+_URL = "/api/v1/recalculos-precios"
+
+
+@pytest.fixture(autouse=True)
+def bloques_chicos(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "recalculo_chunk", 2)
+    monkeypatch.setattr(settings, "recalculo_pausa_seconds", 0)
+
+
+def _headers(client: TestClient) -> dict:
+    resp = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def _poblar(client: TestClient, headers: dict) -> dict[str, int]:
+    cliente = client.post("/api/v1/clientes", headers=headers, json={"nombre": "C"}).json()
+    tipo = client.post("/api/v1/tipos-producto", headers=headers, json={"nombre": "T"}).json()
+    bodega = client.post("/api/v1/bodegas", headers=headers, json={"nombre": "B"}).json()
+    puerto = client.post("/api/v1/puertos", headers=headers, json={"nombre": "P"}).json()
+    ids = {
+        "id_cliente": cliente["id_cliente"],
+        "id_tipo_producto": tipo["id_tipo_producto"],
+        "id_bodega": bodega["id_bodega"],
+        "id_puerto": puerto["id_puerto"],
+    }
+    envios = [
+        ("TERRESTRE", 12, "1000.00", "2026-03-01"),
+        ("TERRESTRE", 6, "250.25", "2026-03-01"),
+        ("MARITIMO", 11, "0.50", "2026-03-01"),
+        ("MARITIMO", 30, "999.99", "2026-03-01"),
+        ("TERRESTRE", 40, "123.45", "2026-03-01"),
+        # Ya entregado: queda fuera con fecha_entrega_desde.
+        ("TERRESTRE", 12, "1000.00", "2026-01-10"),
+    ]
+    for i, (tipo_envio, cantidad, precio, entrega) in enumerate(envios):
+        detalle = (
+            {"id_bodega": ids["id_bodega"], "placa_vehiculo": "ABC123"}
+            if tipo_envio == "TERRESTRE"
+            else {"id_puerto": ids["id_puerto"], "numero_flota": "ABC1234D"}
+        )
+        r = client.post(
+            "/api/v1/envios",
+            headers=headers,
+            json={
+                "id_cliente": ids["id_cliente"],
+                "id_tipo_producto": ids["id_tipo_producto"],
+                "cantidad": cantidad,
+                "fecha_registro": "2026-01-01",
+                "fecha_entrega": entrega,
+                "precio_base": precio,
+                "numero_guia": f"R{i:03d}",
+                "tipo_envio": tipo_envio,
+                **detalle,
+            },
+        )
+        assert r.status_code == 200
+    return ids
+
+
+def _cambiar_reglas(client: TestClient, headers: dict, ids: dict[str, int]) -> None:
+    reglas = [
+        {"tipo_envio": "TERRESTRE", "cantidad_minima": 5, "tasa": "0.0125"},
+        {"tipo_envio": "TERRESTRE", "cantidad_minima": 20, "tasa": "0.0750"},
+        {"tipo_envio": "MARITIMO", "cantidad_minima": 25, "tasa": "0.1"},
+        {
+            "tipo_envio": "MARITIMO",
+            "cantidad_minima": 1,
+            "tasa": "0.02",
+            "id_puerto": ids["id_puerto"],
+        },
+    ]
+    for regla in reglas:
+        r = client.post("/api/v1/reglas-descuento", headers=headers, json=regla)
+        assert r.status_code == 200
+
+
+def _envios(client: TestClient, headers: dict) -> list[dict]:
+    return client.get("/api/v1/envios?page_size=100", headers=headers).json()["items"]
+
+
+def _esperado(envio: dict, ids: dict[str, int]) -> Decimal:
+    return calcular_monto_descuento(
+        precio_base=Decimal(envio["precio_base"]),
+        cantidad=envio["cantidad"],
+        tipo_envio=envio["tipo_envio"],
+        id_cliente=ids["id_cliente"],
+        id_tipo_producto=ids["id_tipo_producto"],
+        id_bodega=ids["id_bodega"] if envio["tipo_envio"] == "TERRESTRE" else None,
+        id_puerto=ids["id_puerto"] if envio["tipo_envio"] == "MARITIMO" else None,
+    )
+
+
+def _verificar(antes: list[dict], despues: list[dict], ids: dict[str, int]) -> int:
+    cambiados = 0
+    for previo, envio in zip(antes, despues):
+        descuento = Decimal(envio["descuento"])
+        assert Decimal(envio["precio_final"]) == Decimal(envio["precio_base"]) - descuento
+        if envio["fecha_entrega"] < "2026-02-01":
+            assert envio == previo
+            continue
+        assert descuento == _esperado(envio, ids)
+        cambiados += envio["descuento"] != previo["descuento"]
+    return cambiados
+
+
+def test_recalcula_por_bloques_solo_envios_abiertos(client: TestClient) -> None:
+    headers = _headers(client)
+    ids = _poblar(client, headers)
+    antes = _envios(client, headers)
+    _cambiar_reglas(client, headers, ids)
+
+    r = client.post(_URL, headers=headers, json={"fecha_entrega_desde": "2026-02-01"})
+    assert r.status_code == 202
+    trabajo = client.get(f"{_URL}/{r.json()['id_recalculo']}", headers=headers).json()
+
+    assert trabajo["estado"] == "COMPLETADO"
+    assert trabajo["progreso"] == 1.0
+    assert trabajo["ultimo_id"] == trabajo["id_hasta"]
+    cambiados = _verificar(antes, _envios(client, headers), ids)
+    assert trabajo["actualizados"] == cambiados == 5
+
+    # Con todos los envíos solo se reescribe el ya entregado: el resto ya está al día.
+    r = client.post(_URL, headers=headers, json={"fecha_entrega_desde": None})
+    assert r.status_code == 202
+    trabajo = client.get(f"{_URL}/{r.json()['id_recalculo']}", headers=headers).json()
+    assert trabajo["actualizados"] == 1
+    r = client.post(f"{_URL}/{trabajo['id_recalculo']}/reanudar", headers=headers)
+    assert r.status_code == 409
+
+
+def test_trabajo_interrumpido_se_reanuda_desde_el_checkpoint(
+    client: TestClient, monkeypatch
+) -> None:
+    headers = _headers(client)
+    ids = _poblar(client, headers)
+    antes = _envios(client, headers)
+    _cambiar_reglas(client, headers, ids)
+
+    original = recalculo.sentencia_bloque
+    bloques = []
+
+    def falla_en_el_segundo_bloque(*args, **kwargs):
+        bloques.append(args[1:3])
+        if len(bloques) == 2:
+            raise RuntimeError("conexión perdida")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(recalculo, "sentencia_bloque", falla_en_el_segundo_bloque)
+    with pytest.raises(RuntimeError):
+        client.post(_URL, headers=headers, json={"fecha_entrega_desde": "2026-02-01"})
+    trabajo = client.get(f"{_URL}/1", headers=headers).json()
+    assert trabajo["estado"] == "FALLIDO"
+    assert trabajo["error"] == "conexión perdida"
+    assert trabajo["ultimo_id"] == 2
+    assert trabajo["progreso"] == pytest.approx(2 / 6, abs=1e-4)
+
+    monkeypatch.setattr(recalculo, "sentencia_bloque", original)
+    r = client.post(f"{_URL}/1/reanudar", headers=headers)
+    assert r.status_code == 202
+    trabajo = client.get(f"{_URL}/1", headers=headers).json()
+    assert trabajo["estado"] == "COMPLETADO"
+    assert trabajo["error"] is None
+    assert trabajo["actualizados"] == _verificar(antes, _envios(client, headers), ids) == 5
+
+
+def test_recalculo_requiere_admin(client: TestClient) -> None:
+    client.post("/api/v1/auth/register", json={"username": "ana", "password": "secreto123"})
+    token = client.post("/api/v1/auth/token", json={"username": "ana", "password": "secreto123"})
+    usuario = {"Authorization": f"Bearer {token.json()['access_token']}"}
+    assert client.post(_URL, headers=usuario, json={}).status_code == 403
+    assert client.get(f"{_URL}/1", headers=_headers(client)).status_code == 404
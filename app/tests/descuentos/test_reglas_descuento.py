@@ -0,0 +1,135 @@
+from collections.abc import Iterator
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.envios.base.discount_service import (
+    Regla,
+    calcular_monto_descuento,
+    calcular_tasa_descuento,
+    instalar_reglas,
+)
+
+
+@pytest.fixture()
+def reglas() -> Iterator[None]:
+    yield
+    instalar_reglas(())
+
+
+def _headers(client: TestClient) -> dict:
+    resp = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def test_tramos_por_ambito_con_busqueda_binaria(reglas) -> None:
+    instalar_reglas([
+        Regla("TERRESTRE", 5, Decimal("0.02"), id_cliente=1),
+        Regla("TERRESTRE", 50, Decimal("0.10"), id_cliente=1),
+        Regla("TERRESTRE", 20, Decimal("0.07"), id_cliente=1),
+        Regla("TERRESTRE", 100, Decimal("0.15"), id_tipo_producto=3),
+        Regla("MARITIMO", 1, Decimal("0.01")),
+    ])
+
+    def tasa(cantidad: int, tipo: str = "TERRESTRE", **ambito) -> Decimal:
+        return calcular_tasa_descuento(cantidad=cantidad, tipo_envio=tipo, **ambito)
+
+    assert tasa(4, id_cliente=1) == Decimal("0")
+    assert tasa(5, id_cliente=1) == Decimal("0.02")
+    assert tasa(19, id_cliente=1) == Decimal("0.02")
+    assert tasa(20, id_cliente=1) == Decimal("0.07")
+    assert tasa(500, id_cliente=1, id_tipo_producto=3) == Decimal("0.10")
+    # Sin tramo alcanzado en el ámbito más específico se cae al siguiente.
+    assert tasa(4, id_cliente=1, id_tipo_producto=3) == Decimal("0")
+    assert tasa(200, id_cliente=2, id_tipo_producto=3) == Decimal("0.15")
+    # TERRESTRE sin reglas generales en la tabla: conserva la del enunciado.
+    assert tasa(11, id_cliente=2) == Decimal("0.05")
+    assert tasa(10, id_cliente=2) == Decimal("0")
+    # MARITIMO tiene regla general propia: reemplaza la del enunciado.
+    assert tasa(11, "MARITIMO") == Decimal("0.01")
+    assert calcular_monto_descuento(
+        precio_base=Decimal("1000.00"), cantidad=60, tipo_envio="TERRESTRE", id_cliente=1
+    ) == Decimal("100.00")
+
+
+def test_sin_reglas_se_aplica_el_enunciado(reglas) -> None:
+    instalar_reglas(())
+    terrestre = calcular_tasa_descuento(cantidad=11, tipo_envio="TERRESTRE", id_cliente=9)
+    maritimo = calcular_tasa_descuento(cantidad=11, tipo_envio="MARITIMO", id_puerto=9)
+    assert (terrestre, maritimo) == (Decimal("0.05"), Decimal("0.03"))
+
+
+def test_crud_reglas_recalcula_precios_sin_consultas_extra(
+    client: TestClient, max_consultas
+) -> None:
+    headers = _headers(client)
+    cliente = client.post("/api/v1/clientes", headers=headers, json={"nombre": "Mayorista"})
+    otro = client.post("/api/v1/clientes", headers=headers, json={"nombre": "Minorista"})
+    tipo = client.post("/api/v1/tipos-producto", headers=headers, json={"nombre": "Caja"})
+    bodega = client.post("/api/v1/bodegas", headers=headers, json={"nombre": "B"})
+    cliente_id = cliente.json()["id_cliente"]
+
+    def crear_envio(guia: str, id_cliente: int, cantidad: int) -> dict:
+        r = client.post(
+            "/api/v1/envios",
+            headers=headers,
+            json={
+                "id_cliente": id_cliente,
+                "id_tipo_producto": tipo.json()["id_tipo_producto"],
+                "cantidad": cantidad,
+                "fecha_registro": "2026-02-01",
+                "fecha_entrega": "2026-02-10",
+                "precio_base": "1000",
+                "numero_guia": guia,
+                "tipo_envio": "TERRESTRE",
+                "id_bodega": bodega.json()["id_bodega"],
+                "placa_vehiculo": "ABC123",
+            },
+        )
+        assert r.status_code == 200
+        return r.json()
+
+    regla = {"tipo_envio": "TERRESTRE", "cantidad_minima": 5, "tasa": "0.08"}
+    r = client.post("/api/v1/reglas-descuento", headers=headers, json={**regla, "id_cliente": 999})
+    assert r.status_code == 404
+    regla["id_cliente"] = cliente_id
+    r = client.post("/api/v1/reglas-descuento", headers=headers, json=regla)
+    assert r.status_code == 200
+    regla_id = r.json()["id_regla"]
+
+    with max_consultas(2):
+        assert crear_envio("G1", cliente_id, 6)["descuento"] == "80.00"
+    assert crear_envio("G2", otro.json()["id_cliente"], 11)["descuento"] == "50.00"
+
+    r = client.patch(f"/api/v1/reglas-descuento/{regla_id}", headers=headers, json={"tasa": "0.1"})
+    assert r.status_code == 200
+    assert crear_envio("G3", cliente_id, 6)["descuento"] == "100.00"
+
+    r = client.get("/api/v1/reglas-descuento?tipo_envio=TERRESTRE", headers=headers)
+    assert r.json()["total"] == 1
+
+    assert client.delete(f"/api/v1/reglas-descuento/{regla_id}", headers=headers).status_code == 200
+    assert crear_envio("G4", cliente_id, 6)["descuento"] == "0.00"
+    assert client.get("/api/v1/reglas-descuento", headers=headers).json()["total"] == 0
+
+
+def test_validaciones_de_reglas(client: TestClient) -> None:
+    headers = _headers(client)
+    base = {"tipo_envio": "MARITIMO", "cantidad_minima": 1, "tasa": "0.05"}
+
+    r = client.post("/api/v1/reglas-descuento", headers=headers, json={**base, "id_bodega": 1})
+    assert r.status_code == 422
+    r = client.post(
+        "/api/v1/reglas-descuento", headers=headers, json={**base, "id_cliente": 1, "id_puerto": 1}
+    )
+    assert r.status_code == 422
+    r = client.post("/api/v1/reglas-descuento", headers=headers, json={**base, "tasa": "1.5"})
+    assert r.status_code == 422
+    r = client.post("/api/v1/reglas-descuento", headers=headers, json={**base, "id_puerto": 999})
+    assert r.status_code == 404
+
+    client.post("/api/v1/auth/register", json={"username": "ana", "password": "secreto123"})
+    token = client.post("/api/v1/auth/token", json={"username": "ana", "password": "secreto123"})
+    usuario = {"Authorization": f"Bearer {token.json()['access_token']}"}
+    assert client.post("/api/v1/reglas-descuento", headers=usuario, json=base).status_code == 403
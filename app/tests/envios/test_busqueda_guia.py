@@ -0,0 +1,53 @@
+from fastapi.testclient import TestClient
+
+
+def _headers(client: TestClient) -> dict:
+    resp = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    assert resp.status_code == 200
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def test_search_mode_prefix_substring_exact(client: TestClient) -> None:
+    headers = _headers(client)
+    cliente_id = client.post("/api/v1/clientes", headers=headers, json={"nombre": "Cliente 1"}).json()["id_cliente"]
+    tipo_id = client.post("/api/v1/tipos-producto", headers=headers, json={"nombre": "Caja"}).json()["id_tipo_producto"]
+    bodega_id = client.post("/api/v1/bodegas", headers=headers, json={"nombre": "Bodega"}).json()["id_bodega"]
+
+    for guia in ("AB-1", "AB-10", "XAB-2", "A_B-3"):
+        r = client.post(
+            "/api/v1/envios",
+            headers=headers,
+            json={
+                "id_cliente": cliente_id,
+                "id_tipo_producto": tipo_id,
+                "cantidad": 1,
+                "fecha_registro": "2026-02-01",
+                "fecha_entrega": "2026-02-10",
+                "precio_base": 100,
+                "numero_guia": guia,
+                "tipo_envio": "TERRESTRE",
+                "id_bodega": bodega_id,
+                "placa_vehiculo": "ABC123",
+            },
+        )
+        assert r.status_code == 200
+
+    def guias(params: str) -> list[str]:
+        r = client.get(f"/api/v1/envios?{params}", headers=headers)
+        assert r.status_code == 200
+        return sorted(e["numero_guia"] for e in r.json()["items"])
+
+    assert guias("q=ab-1") == ["AB-1", "AB-10"]  # substring (default) no distingue mayúsculas
+    assert guias("q=AB&search_mode=substring") == ["AB-1", "AB-10", "XAB-2"]
+    assert guias("q=AB&search_mode=prefix") == ["AB-1", "AB-10"]
+    assert guias("q=AB-1&search_mode=exact") == ["AB-1"]
+    # _ y % se buscan literalmente, no como comodines de LIKE
+    assert guias("q=A_&search_mode=prefix") == ["A_B-3"]
+    assert guias("q=%25&search_mode=substring") == []
+
+    r = client.get("/api/v1/envios?q=AB&search_mode=regex", headers=headers)
+    assert r.status_code == 422
+
+    r = client.get("/api/v1/envios/export?formato=ndjson&q=AB&search_mode=prefix", headers=headers)
+    assert r.status_code == 200
+    assert r.text.count("\n") == 2
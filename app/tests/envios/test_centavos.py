@@ -0,0 +1,215 @@
+from collections.abc import Iterator
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from hypothesis import given, settings
+from hypothesis import strategies as st
+from sqlalchemy import Engine, create_engine, delete, insert, select
+from sqlalchemy.pool import StaticPool
+
+from app.base_de_datos.base import Base
+from app.base_de_datos import modelos  # noqa: F401
+from app.descuentos import recalculo
+from app.envios import cotizacion
+from app.envios.base import centavos
+from app.envios.base.centavos import ESCALA_TASA
+from app.envios.base.discount_service import (
+    Regla,
+    compilar,
+    instalar_reglas,
+    reglas_compiladas,
+)
+from app.envios.base.models import Envio, EnvioMaritimo, EnvioTerrestre
+from app.envios.service import _resolver_precios
+
+_Q = Decimal("0.01")
+
+# Hasta 99999999.99 (NUMERIC(10,2)) con 0 a 4 decimales: incluye medios centavos.
+montos = st.builds(
+    lambda n, decimales: Decimal(n).scaleb(-decimales),
+    st.integers(0, 9_999_999_999),
+    st.integers(0, 4),
+).filter(lambda m: m <= Decimal("99999999.99"))
+tasas = st.integers(0, centavos.ESCALA_TASA).map(lambda t: Decimal(t).scaleb(-4))
+ids = st.none() | st.integers(1, 3)
+tipos = st.sampled_from(("TERRESTRE", "MARITIMO"))
+# Como mucho un ámbito por regla, igual que en `ReglaDescuento`.
+reglas = st.lists(
+    st.builds(
+        Regla,
+        tipo_envio=tipos,
+        cantidad_minima=st.integers(1, 50),
+        tasa=tasas,
+        id_cliente=ids,
+        id_tipo_producto=st.none(),
+        id_bodega=ids,
+        id_puerto=ids,
+    ).filter(lambda r: sum(v is not None for v in (r.id_cliente, r.id_bodega, r.id_puerto)) <= 1),
+    max_size=8,
+)
+
+
+@given(montos)
+def test_a_centavos_equivale_a_quantize(monto: Decimal) -> None:
+    centavos_ = centavos.a_centavos(monto)
+    assert centavos_ == int(monto.quantize(_Q) * 100)
+    assert centavos.a_texto(centavos_) == str(monto.quantize(_Q))
+
+
+@given(montos, tasas)
+def test_descuento_equivale_a_decimal(monto: Decimal, tasa: Decimal) -> None:
+    precio = monto.quantize(_Q)
+    esperado = (precio * tasa).quantize(_Q)
+    tasa_e4 = centavos.tasa_a_diezmilesimos(tasa)
+    obtenido = centavos.redondear_half_even(centavos.a_centavos(precio) * tasa_e4, ESCALA_TASA)
+    assert centavos.a_texto(obtenido) == str(esperado)
+
+
+@given(st.lists(st.integers(0, 10**15), min_size=1, max_size=50), st.integers(1, 10**4))
+def test_redondeo_half_even_escalar_y_vectorizado(numeradores: list[int], divisor: int) -> None:
+    esperado = [int((Decimal(n) / divisor).quantize(Decimal(1))) for n in numeradores]
+    assert [centavos.redondear_half_even(n, divisor) for n in numeradores] == esperado
+    vector = centavos.redondear_half_even(np.array(numeradores, dtype=np.int64), divisor)
+    assert vector.tolist() == esperado
+
+
+def test_tasa_con_mas_de_4_decimales() -> None:
+    assert centavos.tasa_a_diezmilesimos(Decimal("0.0525")) == 525
+    with pytest.raises(ValueError):
+        centavos.tasa_a_diezmilesimos(Decimal("0.00001"))
+
+
+# Cotización en bloque y recálculo calculan en centavos (NumPy y SQL); un envío suelto, en
+# Decimal (`_resolver_precios`): con las mismas reglas deben dar el mismo precio.
+def _esperados(envios: list) -> list[tuple[str, str]]:
+    precios = (
+        _resolver_precios(precio_base=precio, cantidad=cantidad, tipo_envio=tipo, **ambito)
+        for precio, cantidad, tipo, ambito in envios
+    )
+    return [(str(descuento), str(final)) for _, descuento, final in precios]
+
+
+@given(
+    reglas,
+    st.lists(st.tuples(montos, st.integers(1, 60), tipos, ids, ids), min_size=1, max_size=20),
+)
+def test_cotizacion_equivale_a_resolver_precios(reglas_: list[Regla], filas: list) -> None:
+    envios = [
+        (precio, cantidad, tipo, {"id_cliente": id_cliente, "id_puerto": id_puerto})
+        for precio, cantidad, tipo, id_cliente, id_puerto in filas
+    ]
+    instalar_reglas(reglas_)
+    try:
+        esperados = _esperados(envios)
+        precio_base = np.array([centavos.a_centavos(e[0]) for e in envios], dtype=np.int64)
+        descuentos = cotizacion.calcular_descuentos(
+            cotizacion.reglas_enteras(reglas_compiladas()),
+            np.array([e[2] == "TERRESTRE" for e in envios]),
+            np.array([e[1] for e in envios], dtype=np.int64),
+            precio_base,
+            {
+                ambito: np.array([-1 if (v := e[3][ambito]) is None else v for e in envios])
+                for ambito in ("id_cliente", "id_puerto")
+            },
+        )
+    finally:
+        instalar_reglas(())
+    obtenidos = [
+        (centavos.a_texto(d), centavos.a_texto(b - d))
+        for b, d in zip(precio_base.tolist(), descuentos.tolist())
+    ]
+    assert obtenidos == esperados
+
+
+@pytest.fixture(scope="module")
+def motor_recalculo() -> Iterator[Engine]:
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@settings(max_examples=30, deadline=None)
+@given(
+    reglas,
+    st.lists(
+        st.tuples(montos, st.integers(1, 60), tipos, st.integers(1, 3), st.integers(1, 3)),
+        min_size=1,
+        max_size=20,
+    ),
+)
+def test_recalculo_equivale_a_resolver_precios(
+    motor_recalculo: Engine, reglas_: list[Regla], filas: list
+) -> None:
+    envios = []
+    with motor_recalculo.begin() as conexion:
+        for tabla in (EnvioTerrestre, EnvioMaritimo, Envio):
+            conexion.execute(delete(tabla))
+        for i, (monto, cantidad, tipo, id_cliente, id_lugar) in enumerate(filas, start=1):
+            precio = monto.quantize(_Q)
+            conexion.execute(
+                insert(Envio).values(
+                    id_envio=i,
+                    id_cliente=id_cliente,
+                    id_tipo_producto=1,
+                    cantidad=cantidad,
+                    fecha_registro=date(2026, 1, 1),
+                    fecha_entrega=date(2026, 1, 2),
+                    precio_base=precio,
+                    descuento=0,
+                    precio_final=precio,
+                    numero_guia=f"G{i}",
+                )
+            )
+            if tipo == "TERRESTRE":
+                detalle = insert(EnvioTerrestre).values(placa_vehiculo="ABC123", id_bodega=id_lugar)
+                ambito = {"id_cliente": id_cliente, "id_bodega": id_lugar}
+            else:
+                detalle = insert(EnvioMaritimo).values(numero_flota="ABC1234D", id_puerto=id_lugar)
+                ambito = {"id_cliente": id_cliente, "id_puerto": id_lugar}
+            conexion.execute(detalle.values(id_envio=i))
+            envios.append((precio, cantidad, tipo, ambito))
+        conexion.execute(recalculo.sentencia_bloque(compilar(reglas_), 0, len(filas), None))
+        filas_bd = conexion.execute(
+            select(Envio.descuento, Envio.precio_final).order_by(Envio.id_envio)
+        ).all()
+
+    instalar_reglas(reglas_)
+    try:
+        esperados = _esperados(envios)
+    finally:
+        instalar_reglas(())
+    assert [(str(d), str(f)) for d, f in filas_bd] == esperados
+
+
+def test_crear_envio_redondea_half_even(client: TestClient) -> None:
+    token = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+    cliente = client.post("/api/v1/clientes", headers=headers, json={"nombre": "C"}).json()
+    tipo = client.post("/api/v1/tipos-producto", headers=headers, json={"nombre": "T"}).json()
+    puerto = client.post("/api/v1/puertos", headers=headers, json={"nombre": "P"}).json()
+
+    r = client.post(
+        "/api/v1/envios",
+        headers=headers,
+        json={
+            "id_cliente": cliente["id_cliente"],
+            "id_tipo_producto": tipo["id_tipo_producto"],
+            "cantidad": 11,
+            "fecha_registro": "2026-02-01",
+            "fecha_entrega": "2026-02-10",
+            "precio_base": "0.505",
+            "numero_guia": "C000000001",
+            "tipo_envio": "MARITIMO",
+            "id_puerto": puerto["id_puerto"],
+            "numero_flota": "ABC1234D",
+        },
+    )
+    assert r.status_code == 200
+    body = r.json()
+    # 0.505 -> 0.50 (half-even); 0.50 * 3% = 0.015 -> 0.02
+    precios = (body["precio_base"], body["descuento"], body["precio_final"])
+    assert precios == ("0.50", "0.02", "0.48")
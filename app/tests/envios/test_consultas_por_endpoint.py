@@ -0,0 +1,116 @@
+"""Límites de sentencias SQL por endpoint: una regresión (p. ej. un N+1) hace fallar CI."""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.base_de_datos.base import Base
+from app.base_de_datos.configuracion import settings
+from app.base_de_datos.sesion import get_session, get_session_lectura
+from app.main import create_app
+
+
+def _preparar(client: TestClient) -> tuple[dict, dict]:
+    resp = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+    cliente = client.post("/api/v1/clientes", headers=headers, json={"nombre": "C"})
+    tipo = client.post("/api/v1/tipos-producto", headers=headers, json={"nombre": "Caja"})
+    bodega = client.post("/api/v1/bodegas", headers=headers, json={"nombre": "B"})
+    envio = {
+        "id_cliente": cliente.json()["id_cliente"],
+        "id_tipo_producto": tipo.json()["id_tipo_producto"],
+        "cantidad": 1,
+        "fecha_registro": "2026-02-01",
+        "fecha_entrega": "2026-02-10",
+        "precio_base": "10",
+        "tipo_envio": "TERRESTRE",
+        "id_bodega": bodega.json()["id_bodega"],
+        "placa_vehiculo": "ABC123",
+    }
+    return headers, envio
+
+
+def test_consultas_por_endpoint_de_envios(client: TestClient, max_consultas) -> None:
+    headers, envio = _preparar(client)
+
+    with max_consultas(2):  # INSERT envío (FKs en el WHERE) + INSERT detalle
+        r = client.post("/api/v1/envios", headers=headers, json={**envio, "numero_guia": "G1"})
+    assert r.status_code == 200
+    envio_id = r.json()["id_envio"]
+
+    with max_consultas(4):  # INSERT sin filas + una consulta por FK para el mensaje de error
+        invalido = {**envio, "numero_guia": "G2", "id_cliente": 999}
+        r = client.post("/api/v1/envios", headers=headers, json=invalido)
+    assert r.status_code == 404
+
+    with max_consultas(1):
+        assert client.get(f"/api/v1/envios/{envio_id}", headers=headers).status_code == 200
+    with max_consultas(3):  # SELECT ... FOR UPDATE + UPDATE envío + UPDATE detalle
+        cambios = {"cantidad": 3, "placa_vehiculo": "XYZ123"}
+        r = client.patch(f"/api/v1/envios/{envio_id}", headers=headers, json=cambios)
+    assert r.status_code == 200
+    with max_consultas(2):  # conteo + página
+        assert client.get("/api/v1/envios", headers=headers).status_code == 200
+    with max_consultas(4):
+        assert client.delete(f"/api/v1/envios/{envio_id}", headers=headers).status_code == 200
+
+
+def test_listado_de_envios_sin_n_mas_1(client: TestClient, max_consultas) -> None:
+    headers, envio = _preparar(client)
+    client.post("/api/v1/envios", headers=headers, json={**envio, "numero_guia": "G000000001"})
+
+    with max_consultas(1) as una_fila:
+        client.get("/api/v1/envios?include_total=false", headers=headers)
+
+    for i in range(2, 22):
+        client.post("/api/v1/envios", headers=headers, json={**envio, "numero_guia": f"G{i:09d}"})
+    with max_consultas(len(una_fila)):
+        r = client.get("/api/v1/envios?include_total=false&page_size=50", headers=headers)
+    assert len(r.json()["items"]) == 21
+
+
+def test_catalogos_cacheados_no_consultan(client: TestClient, max_consultas) -> None:
+    headers, envio = _preparar(client)
+    client.get(f"/api/v1/bodegas/{envio['id_bodega']}", headers=headers)
+    client.get("/api/v1/bodegas", headers=headers)
+    with max_consultas(0):
+        client.get(f"/api/v1/bodegas/{envio['id_bodega']}", headers=headers)
+        client.get("/api/v1/bodegas", headers=headers)
+
+
+def test_max_consultas_falla_al_superar_el_limite(client: TestClient, max_consultas) -> None:
+    headers, _ = _preparar(client)
+    with pytest.raises(AssertionError, match="2 sentencias SQL"):
+        with max_consultas(1):
+            client.get("/api/v1/clientes", headers=headers)
+
+
+def test_headers_de_debug(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+
+    def sesion():
+        with Session(engine) as db:
+            yield db
+
+    monkeypatch.setattr(settings, "debug", True)
+    app = create_app()
+    app.dependency_overrides[get_session] = sesion
+    app.dependency_overrides[get_session_lectura] = sesion
+    client = TestClient(app)
+
+    headers, _ = _preparar(client)
+    r = client.get("/api/v1/clientes", headers=headers)
+    assert r.headers["X-DB-Queries"] == "2"
+    assert r.headers["Server-Timing"].startswith("db;dur=")
+    assert 'desc="2 queries"' in r.headers["Server-Timing"]
+
+    monkeypatch.setattr(settings, "debug", False)
+    r = TestClient(create_app()).get("/api/v1/health")
+    assert "X-DB-Queries" not in r.headers
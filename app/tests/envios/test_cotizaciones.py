@@ -1,7 +1,133 @@
+import random
+from collections.abc import Iterator
+from decimal import Decimal
+
 import pytest
+from fastapi.testclient import TestClient
+
+from app.base_de_datos.configuracion import settings
+from app.envios import cotizacion
+from app.envios.base.discount_service import Regla, calcular_monto_descuento, instalar_reglas
+from app.envios.cotizacion import cotizar_lote
+from app.main import create_app
+
+
+@pytest.fixture()
+def reglas() -> Iterator[None]:
+    yield
+    instalar_reglas(())
+
+
+def _headers(client: TestClient) -> dict:
+    resp = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def _items(n: int, semilla: int = 7) -> list[dict]:
+    rng = random.Random(semilla)
+    items = []
+    for _ in range(n):
+        item = {
+            "tipo_envio": rng.choice(("TERRESTRE", "MARITIMO")),
+            "cantidad": rng.randint(1, 120),
+            # Incluye medios centavos y más decimales: se redondean igual que al crear el envío.
+            "precio_base": Decimal(rng.randint(0, 10_000_000)).scaleb(-rng.choice((0, 2, 3))),
+        }
+        for ambito in ("id_cliente", "id_tipo_producto", "id_bodega", "id_puerto"):
+            if rng.random() < 0.5:
+                item[ambito] = rng.randint(1, 4)
+        items.append(item)
+    return items
+
+
+def _esperado(item: dict) -> tuple[Decimal, Decimal, Decimal]:
+    precio = item["precio_base"].quantize(Decimal("0.01"))
+    descuento = calcular_monto_descuento(**{**item, "precio_base": precio})
+    return precio, descuento, precio - descuento
+
+
+def _instalar_reglas_variadas() -> None:
+    instalar_reglas([
+        Regla("TERRESTRE", 5, Decimal("0.0125"), id_cliente=1),
+        Regla("TERRESTRE", 40, Decimal("0.0875"), id_cliente=1),
+        Regla("TERRESTRE", 60, Decimal("0.1"), id_tipo_producto=2),
+        Regla("TERRESTRE", 30, Decimal("0.0333"), id_bodega=3),
+        Regla("MARITIMO", 1, Decimal("0.0005"), id_puerto=2),
+        Regla("MARITIMO", 80, Decimal("0.1234"), id_cliente=4),
+        Regla("MARITIMO", 20, Decimal("0.025")),
+    ])
+
+
+@pytest.mark.parametrize("con_reglas", [False, True])
+def test_cotizacion_identica_al_calculo_por_envio(reglas, con_reglas: bool) -> None:
+    if con_reglas:
+        _instalar_reglas_variadas()
+    items = _items(3_000)
+
+    resultado = cotizar_lote(items)
+
+    esperados = [_esperado(item) for item in items]
+    obtenidos = [
+        tuple(Decimal(i[c]) for c in ("precio_base", "descuento", "precio_final"))
+        for i in resultado["items"]
+    ]
+    assert obtenidos == esperados
+    assert Decimal(resultado["total_descuento"]) == sum(d for _, d, _ in esperados)
+    assert Decimal(resultado["total_precio_final"]) == sum(f for _, _, f in esperados)
+
+
+def test_cotizacion_en_pool_de_procesos(reglas, monkeypatch) -> None:
+    _instalar_reglas_variadas()
+    items = _items(500, semilla=3)
+    esperado = cotizar_lote(items)
+
+    monkeypatch.setattr(settings, "cotizacion_procesos", 2)
+    monkeypatch.setattr(settings, "cotizacion_chunk", 64)
+    try:
+        assert cotizar_lote(items) == esperado
+        assert cotizacion._executor._mp_context.get_start_method() != "fork"
+    finally:
+        cotizacion.cerrar_executor()
+
+
+def test_pool_de_procesos_se_cierra_con_la_app(reglas, monkeypatch) -> None:
+    _instalar_reglas_variadas()
+    monkeypatch.setattr(settings, "cotizacion_procesos", 2)
+    monkeypatch.setattr(settings, "cotizacion_chunk", 64)
+    with TestClient(create_app()):
+        cotizar_lote(_items(200, semilla=4))
+        assert cotizacion._executor is not None
+    assert cotizacion._executor is None
+
+
+def test_endpoint_cotizar_batch(client: TestClient, max_consultas) -> None:
+    headers = _headers(client)
+    items = [
+        {"tipo_envio": "TERRESTRE", "cantidad": 11, "precio_base": "100.10"},
+        {"tipo_envio": "MARITIMO", "cantidad": 11, "precio_base": "0.50"},
+        {"tipo_envio": "MARITIMO", "cantidad": 2, "precio_base": "10", "id_puerto": 1},
+    ]
+
+    with max_consultas(0):
+        r = client.post("/api/v1/envios/cotizar/batch", headers=headers, json=items)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["items"] == [
+        {"precio_base": "100.10", "descuento": "5.00", "precio_final": "95.10"},
+        {"precio_base": "0.50", "descuento": "0.02", "precio_final": "0.48"},
+        {"precio_base": "10.00", "descuento": "0.00", "precio_final": "10.00"},
+    ]
+    assert (body["total_precio_base"], body["total_descuento"]) == ("110.60", "5.02")
+    assert body["total_precio_final"] == "105.58"
+
 
+def test_endpoint_cotizar_batch_validaciones(client: TestClient) -> None:
+    headers = _headers(client)
+    url = "/api/v1/envios/cotizar/batch"
+    item = {"tipo_envio": "TERRESTRE", "cantidad": 1, "precio_base": "1"}
 
-pytest.skip(
-    "Cotizaciones (endpoints /envios/*/cotizar) fuera de alcance del nuevo modelo E-R.",
-    allow_module_level=True,
-)
+    assert client.post(url, json=[item]).status_code == 401
+    assert client.post(url, headers=headers, json=[]).status_code == 422
+    assert client.post(url, headers=headers, json=[{**item, "cantidad": 0}]).status_code == 422
+    r = client.post(url, headers=headers, json=[{**item, "tipo_envio": "AEREO"}])
+    assert r.status_code == 422
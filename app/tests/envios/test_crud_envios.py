@@ -174,3 +174,124 @@ def test_descuento_automatico_por_cantidad_y_tipo(client: TestClient) -> None:
 
     r = client.get(f"/api/v1/envios/{envio_mar_id}", headers=headers)
     assert r.status_code == 404
+
+
+def test_crear_envio_valida_fks_y_guia_en_el_insert(client: TestClient) -> None:
+    token = _token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    cliente_id = _crear_cliente(client, headers)
+    tipo_producto_id = _crear_tipo_producto(client, headers)
+    bodega_id = _crear_bodega(client, headers)
+    puerto_id = _crear_puerto(client, headers)
+
+    def terrestre(**cambios) -> dict:
+        return {
+            "id_cliente": cliente_id,
+            "id_tipo_producto": tipo_producto_id,
+            "cantidad": 1,
+            "fecha_registro": "2026-02-01",
+            "fecha_entrega": "2026-02-10",
+            "precio_base": 1000,
+            "numero_guia": "G-FK-001",
+            "tipo_envio": "TERRESTRE",
+            "id_bodega": bodega_id,
+            "placa_vehiculo": "ABC123",
+            **cambios,
+        }
+
+    r = client.post("/api/v1/envios", headers=headers, json=terrestre(id_tipo_producto=999))
+    assert r.status_code == 404
+    assert r.json()["detail"] == "Tipo de producto no encontrado"
+
+    r = client.post("/api/v1/envios", headers=headers, json=terrestre(id_bodega=999))
+    assert r.status_code == 404
+    assert r.json()["detail"] == "Bodega no encontrada"
+
+    r = client.post(
+        "/api/v1/envios",
+        headers=headers,
+        json=terrestre(
+            tipo_envio="MARITIMO",
+            id_bodega=None,
+            placa_vehiculo=None,
+            id_puerto=999,
+            numero_flota="ABC1234Z",
+        ),
+    )
+    assert r.status_code == 404
+    assert r.json()["detail"] == "Puerto no encontrado"
+
+    r = client.post("/api/v1/envios", headers=headers, json=terrestre())
+    assert r.status_code == 200
+    assert r.json()["id_bodega"] == bodega_id
+    assert r.json()["precio_final"] == "1000.00"
+
+    r = client.post("/api/v1/envios", headers=headers, json=terrestre())
+    assert r.status_code == 409
+
+    # cliente dado de baja (soft delete) cuenta como inexistente
+    assert client.delete(f"/api/v1/clientes/{cliente_id}", headers=headers).status_code == 200
+    r = client.post("/api/v1/envios", headers=headers, json=terrestre(numero_guia="G-FK-002"))
+    assert r.status_code == 404
+    assert r.json()["detail"] == "Cliente no encontrado"
+
+    r = client.get("/api/v1/envios", headers=headers)
+    assert r.json()["total"] == 1
+
+
+def test_patch_envio_es_atomico(client: TestClient) -> None:
+    token = _token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    cliente_id = _crear_cliente(client, headers)
+    tipo_producto_id = _crear_tipo_producto(client, headers)
+    bodega_id = _crear_bodega(client, headers)
+
+    r = client.post(
+        "/api/v1/envios",
+        headers=headers,
+        json={
+            "id_cliente": cliente_id,
+            "id_tipo_producto": tipo_producto_id,
+            "cantidad": 1,
+            "fecha_registro": "2026-02-01",
+            "fecha_entrega": "2026-02-10",
+            "precio_base": 1000,
+            "numero_guia": "G-PATCH-1",
+            "tipo_envio": "TERRESTRE",
+            "id_bodega": bodega_id,
+            "placa_vehiculo": "ABC123",
+        },
+    )
+    assert r.status_code == 200
+    envio_id = r.json()["id_envio"]
+
+    # bodega inexistente: ni la base ni el detalle deben cambiar
+    r = client.patch(
+        f"/api/v1/envios/{envio_id}",
+        headers=headers,
+        json={"cantidad": 20, "id_bodega": 999, "placa_vehiculo": "ZZZ999"},
+    )
+    assert r.status_code == 404
+    assert r.json()["detail"] == "Bodega no encontrada"
+
+    r = client.patch(f"/api/v1/envios/{envio_id}", headers=headers, json={"id_cliente": 999})
+    assert r.status_code == 404
+    assert r.json()["detail"] == "Cliente no encontrado"
+
+    r = client.patch(f"/api/v1/envios/{envio_id}", headers=headers, json={"numero_flota": "ABC1234Z"})
+    assert r.status_code == 409
+
+    r = client.get(f"/api/v1/envios/{envio_id}", headers=headers)
+    assert r.json()["cantidad"] == 1
+    assert r.json()["placa_vehiculo"] == "ABC123"
+
+    # solo base: el detalle se conserva; cantidad 11 activa el descuento terrestre
+    r = client.patch(f"/api/v1/envios/{envio_id}", headers=headers, json={"cantidad": 11})
+    assert r.status_code == 200
+    assert r.json()["cantidad"] == 11
+    assert r.json()["descuento"] == "50.00"
+    assert r.json()["placa_vehiculo"] == "ABC123"
+    assert r.json()["id_bodega"] == bodega_id
+
+    r = client.get(f"/api/v1/envios/{envio_id}", headers=headers)
+    assert r.json()["precio_final"] == "950.00"
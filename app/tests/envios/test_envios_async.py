@@ -0,0 +1,52 @@
+import asyncio
+
+from fastapi.routing import APIRoute
+
+from app.base_de_datos.sesion import url_async
+from app.main import create_app
+
+
+def _rutas_envios(db_async: bool) -> list[APIRoute]:
+    # Según la versión de FastAPI, los routers incluidos quedan aplanados en app.routes o
+    # envueltos (con `original_router`) y sin el prefijo en el path.
+    rutas: list[APIRoute] = []
+    pendientes = list(create_app(db_async=db_async).routes)
+    while pendientes:
+        ruta = pendientes.pop(0)
+        if isinstance(ruta, APIRoute):
+            rutas.append(ruta)
+        elif hasattr(ruta, "original_router"):
+            pendientes[:0] = ruta.original_router.routes
+    return [r for r in rutas if r.path.removeprefix("/api/v1").startswith("/envios")]
+
+
+def test_db_async_reemplaza_solo_las_rutas_crud() -> None:
+    sync = _rutas_envios(False)
+    asincronas = _rutas_envios(True)
+
+    # Mismas rutas y en el mismo orden (/envios/export debe ir antes que /envios/{envio_id}).
+    assert [(r.path, r.methods) for r in asincronas] == [(r.path, r.methods) for r in sync]
+    reemplazadas = {
+        (r.path.removeprefix("/api/v1"), m)
+        for r in asincronas
+        for m in r.methods
+        if asyncio.iscoroutinefunction(r.endpoint)
+    }
+    assert reemplazadas == {
+        ("/envios", "POST"),
+        ("/envios", "GET"),
+        ("/envios/import", "POST"),
+        ("/envios/{envio_id}", "GET"),
+        ("/envios/{envio_id}", "PATCH"),
+        ("/envios/{envio_id}", "DELETE"),
+    }
+    assert [r.endpoint.__name__ for r in sync if asyncio.iscoroutinefunction(r.endpoint)] == [
+        "importar"
+    ]
+
+
+def test_url_async() -> None:
+    assert url_async("sqlite+pysqlite:///./x.db") == "sqlite+aiosqlite:///./x.db"
+    assert url_async("sqlite:///:memory:") == "sqlite+aiosqlite:///:memory:"
+    pg = "postgresql+psycopg://u:p@localhost/db"
+    assert url_async(pg) == pg
@@ -0,0 +1,95 @@
+from fastapi.testclient import TestClient
+
+
+def _headers(client: TestClient) -> dict:
+    resp = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    assert resp.status_code == 200
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def _catalogos(client: TestClient, headers: dict) -> tuple[int, int, int, int]:
+    cliente_id = client.post("/api/v1/clientes", headers=headers, json={"nombre": "Cliente 1"}).json()["id_cliente"]
+    tipo_id = client.post("/api/v1/tipos-producto", headers=headers, json={"nombre": "Caja"}).json()["id_tipo_producto"]
+    bodega_id = client.post("/api/v1/bodegas", headers=headers, json={"nombre": "Bodega"}).json()["id_bodega"]
+    puerto_id = client.post("/api/v1/puertos", headers=headers, json={"nombre": "Cartagena"}).json()["id_puerto"]
+    return cliente_id, tipo_id, bodega_id, puerto_id
+
+
+def _terrestre(cliente_id: int, tipo_id: int, bodega_id: int, guia: str, cantidad: int = 1) -> dict:
+    return {
+        "id_cliente": cliente_id,
+        "id_tipo_producto": tipo_id,
+        "cantidad": cantidad,
+        "fecha_registro": "2026-02-01",
+        "fecha_entrega": "2026-02-10",
+        "precio_base": 1000,
+        "numero_guia": guia,
+        "tipo_envio": "TERRESTRE",
+        "id_bodega": bodega_id,
+        "placa_vehiculo": "ABC123",
+    }
+
+
+def test_bulk_crea_por_bloques_y_reporta_errores_por_item(client: TestClient) -> None:
+    headers = _headers(client)
+    cliente_id, tipo_id, bodega_id, puerto_id = _catalogos(client, headers)
+
+    items = [_terrestre(cliente_id, tipo_id, bodega_id, f"B-{i:03d}") for i in range(5)]
+    items.append(
+        {
+            "id_cliente": cliente_id,
+            "id_tipo_producto": tipo_id,
+            "cantidad": 11,
+            "fecha_registro": "2026-02-01",
+            "fecha_entrega": "2026-02-12",
+            "precio_base": 1000,
+            "numero_guia": "B-MAR",
+            "tipo_envio": "MARITIMO",
+            "id_puerto": puerto_id,
+            "numero_flota": "ABC1234Z",
+        }
+    )
+    items.append(_terrestre(999, tipo_id, bodega_id, "B-SINCLI"))
+    items.append(_terrestre(cliente_id, tipo_id, bodega_id, "B-000"))  # duplicada dentro del lote
+    items.append({**_terrestre(cliente_id, tipo_id, bodega_id, "B-MALA"), "cantidad": 0})
+
+    r = client.post("/api/v1/envios/bulk?chunk_size=2", headers=headers, json=items)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["total"] == 9
+    assert data["creados"] == 6
+    assert data["fallidos"] == 3
+
+    por_guia = {item["numero_guia"]: item for item in data["items"]}
+    assert por_guia["B-SINCLI"]["error"] == "Cliente no encontrado"
+    assert por_guia["B-MALA"]["ok"] is False
+    assert "cantidad" in por_guia["B-MALA"]["error"]
+    assert [item["indice"] for item in data["items"]] == list(range(9))
+    assert data["items"][7] == {
+        "indice": 7,
+        "ok": False,
+        "id_envio": None,
+        "numero_guia": "B-000",
+        "error": "numero_guia duplicado",
+    }
+
+    r = client.get(f"/api/v1/envios/{por_guia['B-MAR']['id_envio']}", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["id_puerto"] == puerto_id
+    assert r.json()["descuento"] == "30.00"
+
+    r = client.get("/api/v1/envios?tipo_envio=TERRESTRE", headers=headers)
+    assert r.json()["total"] == 5
+
+
+def test_bulk_rechaza_guias_ya_existentes(client: TestClient) -> None:
+    headers = _headers(client)
+    cliente_id, tipo_id, bodega_id, _ = _catalogos(client, headers)
+
+    r = client.post("/api/v1/envios", headers=headers, json=_terrestre(cliente_id, tipo_id, bodega_id, "B-001"))
+    assert r.status_code == 200
+
+    items = [_terrestre(cliente_id, tipo_id, bodega_id, g) for g in ("B-001", "B-002")]
+    r = client.post("/api/v1/envios/bulk", headers=headers, json=items)
+    assert r.status_code == 200
+    assert [item["ok"] for item in r.json()["items"]] == [False, True]
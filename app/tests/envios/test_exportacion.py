@@ -0,0 +1,66 @@
+import csv
+import gzip
+import io
+import json
+
+from fastapi.testclient import TestClient
+
+
+def _headers(client: TestClient) -> dict:
+    resp = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    assert resp.status_code == 200
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def _crear_envios(client: TestClient, headers: dict) -> None:
+    cliente_id = client.post("/api/v1/clientes", headers=headers, json={"nombre": "Cliente 1"}).json()["id_cliente"]
+    tipo_id = client.post("/api/v1/tipos-producto", headers=headers, json={"nombre": "Caja"}).json()["id_tipo_producto"]
+    bodega_id = client.post("/api/v1/bodegas", headers=headers, json={"nombre": "Bodega"}).json()["id_bodega"]
+    puerto_id = client.post("/api/v1/puertos", headers=headers, json={"nombre": "Cartagena"}).json()["id_puerto"]
+
+    comun = {
+        "id_cliente": cliente_id,
+        "id_tipo_producto": tipo_id,
+        "cantidad": 11,
+        "fecha_registro": "2026-02-01",
+        "fecha_entrega": "2026-02-10",
+        "precio_base": 1000,
+    }
+    items = [
+        {**comun, "numero_guia": "E-TER", "tipo_envio": "TERRESTRE", "id_bodega": bodega_id, "placa_vehiculo": "ABC123"},
+        {**comun, "numero_guia": "E-MAR", "tipo_envio": "MARITIMO", "id_puerto": puerto_id, "numero_flota": "ABC1234Z"},
+    ]
+    r = client.post("/api/v1/envios/bulk", headers=headers, json=items)
+    assert r.json()["creados"] == 2
+
+
+def test_export_csv_con_filtros(client: TestClient) -> None:
+    headers = _headers(client)
+    _crear_envios(client, headers)
+
+    r = client.get("/api/v1/envios/export", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    filas = list(csv.DictReader(io.StringIO(r.text)))
+    assert [f["numero_guia"] for f in filas] == ["E-TER", "E-MAR"]
+    assert filas[0]["tipo_envio"] == "TERRESTRE"
+    assert filas[0]["precio_final"] == "950.00"
+    assert filas[0]["id_puerto"] == ""
+
+    r = client.get("/api/v1/envios/export?tipo_envio=MARITIMO", headers=headers)
+    assert [f["numero_guia"] for f in csv.DictReader(io.StringIO(r.text))] == ["E-MAR"]
+
+
+def test_export_ndjson_gzip_coincide_con_la_api(client: TestClient) -> None:
+    headers = _headers(client)
+    _crear_envios(client, headers)
+
+    r = client.get("/api/v1/envios/export?formato=ndjson&gzip=true", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/gzip"
+    assert 'filename="envios.ndjson.gz"' in r.headers["content-disposition"]
+
+    lineas = gzip.decompress(r.content).decode("utf-8").splitlines()
+    exportados = [json.loads(linea) for linea in lineas]
+    api = client.get("/api/v1/envios", headers=headers).json()["items"]
+    assert exportados == api
@@ -0,0 +1,248 @@
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, update
+
+from app.base_de_datos.sesion import get_session, get_session_async
+from app.comun import paginacion
+from app.comun.cache import limpiar_caches
+from app.envios import repository as repository_envios
+from app.envios import router_async
+from app.envios.schemas import CrearEnvioDTO
+from app.envios.service import fila_envio
+from app.idempotencia import repository
+from app.idempotencia.models import ClaveIdempotencia
+
+
+def _headers(client: TestClient, username: str = "admin", password: str = "admin") -> dict:
+    resp = client.post("/api/v1/auth/token", json={"username": username, "password": password})
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def _envio(client: TestClient, headers: dict) -> dict:
+    cliente = client.post("/api/v1/clientes", headers=headers, json={"nombre": "C"}).json()
+    tipo = client.post("/api/v1/tipos-producto", headers=headers, json={"nombre": "T"}).json()
+    bodega = client.post("/api/v1/bodegas", headers=headers, json={"nombre": "B"}).json()
+    return {
+        "id_cliente": cliente["id_cliente"],
+        "id_tipo_producto": tipo["id_tipo_producto"],
+        "cantidad": 12,
+        "fecha_registro": "2026-02-01",
+        "fecha_entrega": "2026-02-10",
+        "precio_base": "1000.00",
+        "numero_guia": "G-IDEM-001",
+        "tipo_envio": "TERRESTRE",
+        "id_bodega": bodega["id_bodega"],
+        "placa_vehiculo": "ABC123",
+    }
+
+
+def _total_envios(client: TestClient, headers: dict) -> int:
+    return client.get("/api/v1/envios", headers=headers).json()["total"]
+
+
+def _sesion(client: TestClient):
+    return next(client.app.dependency_overrides[get_session]())
+
+
+def test_reintento_devuelve_la_respuesta_original(client: TestClient, max_consultas) -> None:
+    headers = _headers(client)
+    envio = _envio(client, headers)
+    con_clave = {**headers, "Idempotency-Key": "k-1"}
+
+    sin_clave = client.post("/api/v1/envios", headers=headers, json={**envio, "numero_guia": "G0"})
+    r = client.post("/api/v1/envios", headers=con_clave, json=envio)
+    assert r.status_code == 200
+    # Mismo JSON que sin clave (salvo id y guía): se serializa con el mismo response_model.
+    distintos = {"id_envio", "numero_guia"}
+    assert {k: v for k, v in r.json().items() if k not in distintos} == {
+        k: v for k, v in sin_clave.json().items() if k not in distintos
+    }
+
+    # Desde la cache en memoria: sin consultas.
+    with max_consultas(0):
+        repetida = client.post("/api/v1/envios", headers=con_clave, json=envio)
+    assert (repetida.status_code, repetida.content) == (200, r.content)
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+
+    # Con la cache fría: un único SELECT de la clave, sin validar ni insertar.
+    limpiar_caches()
+    with max_consultas(1):
+        repetida = client.post("/api/v1/envios", headers=con_clave, json=envio)
+    assert (repetida.status_code, repetida.content) == (200, r.content)
+    assert _total_envios(client, headers) == 2
+
+
+def test_misma_clave_con_otro_cuerpo_o_de_otro_usuario(client: TestClient) -> None:
+    headers = _headers(client)
+    envio = _envio(client, headers)
+    con_clave = {**headers, "Idempotency-Key": "k-1"}
+    assert client.post("/api/v1/envios", headers=con_clave, json=envio).status_code == 200
+
+    r = client.post("/api/v1/envios", headers=con_clave, json={**envio, "cantidad": 13})
+    assert r.status_code == 422
+    assert "otro cuerpo" in r.json()["detail"]
+
+    # La clave es de cada usuario: para otro es un request nuevo (y la guía ya existe).
+    client.post("/api/v1/auth/register", json={"username": "ana", "password": "secreto123"})
+    otro = {**_headers(client, "ana", "secreto123"), "Idempotency-Key": "k-1"}
+    assert client.post("/api/v1/envios", headers=otro, json=envio).status_code == 409
+    assert _total_envios(client, headers) == 1
+
+
+def test_request_fallido_libera_la_clave(client: TestClient) -> None:
+    headers = _headers(client)
+    envio = _envio(client, headers)
+    con_clave = {**headers, "Idempotency-Key": "k-1"}
+
+    r = client.post("/api/v1/envios", headers=con_clave, json={**envio, "id_cliente": 999})
+    assert r.status_code == 404
+    r = client.post("/api/v1/envios", headers=con_clave, json={**envio, "cantidad": 0})
+    assert r.status_code == 422
+
+    # La guía repetida pasa por el IntegrityError: la sesión queda usable y la clave libre.
+    client.post("/api/v1/envios", headers=headers, json=envio)
+    assert client.post("/api/v1/envios", headers=con_clave, json=envio).status_code == 409
+    r = client.post("/api/v1/envios", headers=con_clave, json={**envio, "numero_guia": "G2"})
+    assert r.status_code == 200
+    assert "Idempotent-Replayed" not in r.headers
+    assert _total_envios(client, headers) == 2
+
+
+def _fallar(*args, **kwargs) -> None:
+    raise RuntimeError("falla al guardar la respuesta")
+
+
+def test_envio_y_respuesta_en_la_misma_transaccion(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    headers = _headers(client)
+    envio = _envio(client, headers)
+    con_clave = {**headers, "Idempotency-Key": "k-1"}
+
+    # Si no se puede guardar la respuesta, tampoco queda el envío y la clave se libera.
+    with monkeypatch.context() as m:
+        m.setattr(repository, "completar", _fallar)
+        with pytest.raises(RuntimeError):
+            client.post("/api/v1/envios", headers=con_clave, json=envio)
+    assert _total_envios(client, headers) == 0
+
+    r = client.post("/api/v1/envios", headers=con_clave, json=envio)
+    assert r.status_code == 200
+    assert "Idempotent-Replayed" not in r.headers
+    assert _total_envios(client, headers) == 1
+
+
+def test_conteo_se_invalida_al_confirmar_no_al_insertar(client: TestClient) -> None:
+    headers = _headers(client)
+    envio = _envio(client, headers)
+    assert _total_envios(client, headers) == 0
+    assert paginacion._conteos.estadisticas()["entradas"] == 1
+
+    # Camino de Idempotency-Key: el INSERT queda pendiente hasta el commit de `responder`;
+    # un listado concurrente no debe poder volver a guardar el total sin el envío nuevo.
+    db = _sesion(client)
+    repository_envios.crear(db, *fila_envio(CrearEnvioDTO(**envio)), confirmar=False)
+    assert paginacion._conteos.estadisticas()["entradas"] == 1
+    db.commit()
+    db.close()
+    assert paginacion._conteos.estadisticas()["entradas"] == 0
+    assert _total_envios(client, headers) == 1
+
+
+def test_bulk_no_libera_la_clave_tras_un_commit(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    headers = _headers(client)
+    envio = _envio(client, headers)
+    con_clave = {**headers, "Idempotency-Key": "k-1"}
+    lote = [{**envio, "numero_guia": f"B{i}"} for i in range(3)]
+
+    # Los bloques ya confirmados no se deshacen: la reserva queda hasta vencer.
+    with monkeypatch.context() as m:
+        m.setattr(repository, "completar", _fallar)
+        with pytest.raises(RuntimeError):
+            client.post("/api/v1/envios/bulk", headers=con_clave, json=lote)
+    assert _total_envios(client, headers) == 3
+    r = client.post("/api/v1/envios/bulk", headers=con_clave, json=lote)
+    assert r.status_code == 409
+    assert "en curso" in r.json()["detail"]
+
+
+def _dependencias(dependant) -> set:
+    llamadas = set()
+    for sub in dependant.dependencies:
+        llamadas |= {sub.call} | _dependencias(sub)
+    return llamadas
+
+
+def test_ruta_async_no_usa_la_sesion_sincrona() -> None:
+    rutas = router_async.router.routes
+    ruta = next(r for r in rutas if (r.path, r.methods) == ("/envios", {"POST"}))
+    llamadas = _dependencias(ruta.dependant)
+    assert get_session_async in llamadas
+    assert get_session not in llamadas
+
+
+def test_reserva_en_curso_y_bulk(client: TestClient) -> None:
+    headers = _headers(client)
+    envio = _envio(client, headers)
+    cuerpo = json.dumps(envio).encode()
+    db = _sesion(client)
+    ahora = datetime.now(tz=timezone.utc)
+    db.add(
+        ClaveIdempotencia(
+            usuario="admin",
+            ruta="/api/v1/envios",
+            clave="k-1",
+            huella=hashlib.sha256(cuerpo).hexdigest(),
+            creado_en=ahora,
+            expira_en=ahora + timedelta(seconds=60),
+        )
+    )
+    db.commit()
+    db.close()
+    con_clave = {**headers, "Idempotency-Key": "k-1", "Content-Type": "application/json"}
+    r = client.post("/api/v1/envios", headers=con_clave, content=cuerpo)
+    assert r.status_code == 409
+    assert "en curso" in r.json()["detail"]
+
+    # La clave es por ruta: en /envios/bulk es otra.
+    lote = [{**envio, "numero_guia": f"B{i}"} for i in range(3)]
+    r = client.post("/api/v1/envios/bulk", headers=con_clave, json=lote)
+    assert r.json()["creados"] == 3
+    repetida = client.post("/api/v1/envios/bulk", headers=con_clave, json=lote)
+    assert repetida.content == r.content
+    assert _total_envios(client, headers) == 3
+
+
+def test_purga_claves_vencidas_en_lotes(client: TestClient) -> None:
+    headers = _headers(client)
+    envio = _envio(client, headers)
+    for i in range(5):
+        guia = {**envio, "numero_guia": f"P{i}"}
+        con_clave = {**headers, "Idempotency-Key": f"k-{i}"}
+        r = client.post("/api/v1/envios", headers=con_clave, json=guia)
+        assert r.status_code == 200
+
+    db = _sesion(client)
+    vencida = datetime.now(tz=timezone.utc) - timedelta(seconds=1)
+    vencer = update(ClaveIdempotencia).values(expira_en=vencida)
+    db.execute(vencer.where(ClaveIdempotencia.clave != "k-4"))
+    db.commit()
+
+    r = client.delete("/api/v1/admin/idempotencia?lote=2", headers=headers)
+    assert r.json() == {"eliminadas": 4}
+    assert db.scalar(select(func.count()).select_from(ClaveIdempotencia)) == 1
+
+    # Una clave vencida (aún no purgada) se puede volver a usar con otro cuerpo.
+    limpiar_caches()
+    db.execute(vencer)
+    db.commit()
+    con_clave = {**headers, "Idempotency-Key": "k-4"}
+    r = client.post("/api/v1/envios", headers=con_clave, json={**envio, "numero_guia": "P5"})
+    assert r.status_code == 200
+    db.close()
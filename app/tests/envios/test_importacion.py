@@ -0,0 +1,120 @@
+import io
+
+from fastapi.testclient import TestClient
+
+from app.base_de_datos.configuracion import settings
+from app.base_de_datos.sesion import get_session
+from app.envios.importacion import COLUMNAS_CSV, escribir_reporte, importar_csv
+from app.envios.schemas import RechazoImportacionDTO
+
+
+def _headers(client: TestClient) -> dict:
+    resp = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    assert resp.status_code == 200
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def _csv(filas: list[dict]) -> str:
+    lineas = [",".join(COLUMNAS_CSV)]
+    lineas += [",".join(str(fila.get(c, "")) for c in COLUMNAS_CSV) for fila in filas]
+    return "\n".join(lineas) + "\n"
+
+
+def test_import_carga_validas_y_reporta_rechazos(client: TestClient, monkeypatch) -> None:
+    headers = _headers(client)
+    cliente_id = client.post("/api/v1/clientes", headers=headers, json={"nombre": "Cliente 1"}).json()["id_cliente"]
+    tipo_id = client.post("/api/v1/tipos-producto", headers=headers, json={"nombre": "Caja"}).json()["id_tipo_producto"]
+    bodega_id = client.post("/api/v1/bodegas", headers=headers, json={"nombre": "Bodega"}).json()["id_bodega"]
+    puerto_id = client.post("/api/v1/puertos", headers=headers, json={"nombre": "Cartagena"}).json()["id_puerto"]
+
+    base = {
+        "id_cliente": cliente_id,
+        "id_tipo_producto": tipo_id,
+        "cantidad": 1,
+        "fecha_registro": "2026-02-01",
+        "fecha_entrega": "2026-02-10",
+        "precio_base": "10.30",
+        "descuento": "0.10",
+        "precio_final": "10.20",
+    }
+    terrestre = {**base, "tipo_envio": "TERRESTRE", "id_bodega": bodega_id, "placa_vehiculo": "ABC123"}
+    maritimo = {**base, "tipo_envio": "MARITIMO", "id_puerto": puerto_id, "numero_flota": "ABC1234Z"}
+
+    r = client.post("/api/v1/envios", headers=headers, json={**terrestre, "numero_guia": "I-EXISTE", "precio_base": 1})
+    assert r.status_code == 200
+
+    filas = [
+        {**terrestre, "numero_guia": "I-001"},  # línea 2
+        {**maritimo, "numero_guia": "I-002"},  # línea 3
+        {**terrestre, "numero_guia": "I-003", "cantidad": 0},  # línea 4: formato
+        {**terrestre, "numero_guia": "I-004", "id_cliente": 999},  # línea 5: FK
+        {**terrestre, "numero_guia": "I-005", "precio_final": "10.30"},  # línea 6: precio
+        {**terrestre, "numero_guia": "I-EXISTE"},  # línea 7: ya existe
+        {**maritimo, "numero_guia": "I-001"},  # línea 8: duplicada en el archivo
+    ]
+    r = client.post(
+        "/api/v1/envios/import",
+        headers={**headers, "Content-Type": "text/csv"},
+        content=_csv(filas).encode(),
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert (data["leidas"], data["importadas"], data["rechazadas"]) == (7, 2, 5)
+
+    errores = {r["linea"]: r["error"] for r in data["rechazos"]}
+    assert list(errores) == [4, 5, 6, 7, 8]
+    assert errores[4].startswith("cantidad")
+    assert errores[5] == "Cliente no encontrado"
+    assert errores[6] == "precio_final debe ser precio_base - descuento"
+    assert errores[7] == "numero_guia ya existe"
+    assert errores[8] == "numero_guia duplicado en el archivo"
+
+    r = client.get("/api/v1/envios?q=I-00", headers=headers)
+    items = {e["numero_guia"]: e for e in r.json()["items"]}
+    assert set(items) == {"I-001", "I-002"}
+    assert items["I-001"]["placa_vehiculo"] == "ABC123"
+    assert items["I-002"]["id_puerto"] == puerto_id
+    assert items["I-002"]["precio_final"] == "10.20"
+
+    # Reimportado, todo se rechaza. La API detalla solo los primeros rechazos...
+    monkeypatch.setattr(settings, "import_max_rechazos", 2)
+    r = client.post(
+        "/api/v1/envios/import",
+        headers={**headers, "Content-Type": "text/csv"},
+        content=_csv(filas).encode(),
+    )
+    data = r.json()
+    assert (data["leidas"], data["importadas"], data["rechazadas"]) == (7, 0, 7)
+    assert [r["linea"] for r in data["rechazos"]] == [2, 3]
+
+    # ...y el reporte de la CLI los lleva todos, en orden de línea.
+    db = next(client.app.dependency_overrides[get_session]())
+    reporte = io.StringIO()
+    resultado = importar_csv(db, io.StringIO(_csv(filas)), max_rechazos=0, reporte=reporte)
+    db.close()
+    assert (resultado.rechazadas, resultado.rechazos) == (7, [])
+    lineas = reporte.getvalue().splitlines()
+    assert [int(linea.split(",")[0]) for linea in lineas[1:]] == list(range(2, 9))
+    assert lineas[3] == "4,I-003,cantidad: Input should be greater than 0"
+
+
+def test_import_valida_encabezado_y_permisos(client: TestClient) -> None:
+    headers = _headers(client)
+    r = client.post("/api/v1/envios/import", headers=headers, content=b"id_cliente,cantidad\n1,2\n")
+    assert r.status_code == 400
+    assert "numero_guia" in r.json()["detail"]
+
+    client.post("/api/v1/auth/register", json={"username": "operador", "password": "operador123"})
+    token = client.post("/api/v1/auth/token", json={"username": "operador", "password": "operador123"})
+    r = client.post(
+        "/api/v1/envios/import",
+        headers={"Authorization": f"Bearer {token.json()['access_token']}"},
+        content=_csv([]).encode(),
+    )
+    assert r.status_code == 403
+
+
+def test_escribir_reporte() -> None:
+    destino = io.StringIO()
+    escribir_reporte([RechazoImportacionDTO(linea=3, numero_guia="G-1", error="Cliente no encontrado")], destino)
+    assert destino.getvalue() == "linea,numero_guia,error\n3,G-1,Cliente no encontrado\n"
@@ -0,0 +1,83 @@
+from fastapi.testclient import TestClient
+
+
+def _headers(client: TestClient) -> dict:
+    resp = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+    assert resp.status_code == 200
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def _crear_envios(client: TestClient, headers: dict, cantidad: int) -> list[int]:
+    cliente_id = client.post("/api/v1/clientes", headers=headers, json={"nombre": "Cliente 1"}).json()["id_cliente"]
+    tipo_id = client.post("/api/v1/tipos-producto", headers=headers, json={"nombre": "Caja"}).json()["id_tipo_producto"]
+    bodega_id = client.post("/api/v1/bodegas", headers=headers, json={"nombre": "Bodega"}).json()["id_bodega"]
+
+    ids = []
+    for i in range(cantidad):
+        r = client.post(
+            "/api/v1/envios",
+            headers=headers,
+            json={
+                "id_cliente": cliente_id,
+                "id_tipo_producto": tipo_id,
+                "cantidad": 1,
+                "fecha_registro": "2026-02-01",
+                "fecha_entrega": "2026-02-10",
+                "precio_base": 100,
+                "numero_guia": f"G-{i:03d}",
+                "tipo_envio": "TERRESTRE",
+                "id_bodega": bodega_id,
+                "placa_vehiculo": "ABC123",
+            },
+        )
+        assert r.status_code == 200
+        ids.append(r.json()["id_envio"])
+    return ids
+
+
+def test_paginacion_por_cursor_recorre_todo_sin_repetir(client: TestClient) -> None:
+    headers = _headers(client)
+    ids = _crear_envios(client, headers, 5)
+
+    vistos: list[int] = []
+    r = client.get("/api/v1/envios?page_size=2", headers=headers)
+    assert r.status_code == 200
+    assert (r.json()["page"], r.json()["total"]) == (1, 5)
+    while True:
+        data = r.json()
+        vistos.extend(item["id_envio"] for item in data["items"])
+        if data["next_cursor"] is None:
+            break
+        r = client.get(f"/api/v1/envios?page_size=2&cursor={data['next_cursor']}", headers=headers)
+        assert r.status_code == 200
+        # Por cursor no se cuenta salvo que se pida, y `page` no aplica.
+        assert (r.json()["page"], r.json()["total"]) == (None, None)
+
+    assert vistos == ids
+
+
+def test_after_id_y_modo_paginas_siguen_funcionando(client: TestClient) -> None:
+    headers = _headers(client)
+    ids = _crear_envios(client, headers, 3)
+
+    r = client.get(f"/api/v1/envios?after_id={ids[0]}", headers=headers)
+    assert r.status_code == 200
+    assert [i["id_envio"] for i in r.json()["items"]] == ids[1:]
+    assert r.json()["next_cursor"] is None
+    r = client.get(f"/api/v1/envios?after_id={ids[0]}&include_total=true", headers=headers)
+    assert r.json()["total"] == 3
+
+    r = client.get("/api/v1/envios?page=2&page_size=2", headers=headers)
+    assert r.status_code == 200
+    assert [i["id_envio"] for i in r.json()["items"]] == ids[2:]
+    assert r.json()["page"] == 2
+
+
+def test_cursor_invalido_retorna_400(client: TestClient) -> None:
+    headers = _headers(client)
+
+    r = client.get("/api/v1/envios?cursor=no-es-un-cursor", headers=headers)
+    assert r.status_code == 400
+
+    r = client.get("/api/v1/envios?cursor=abc&after_id=1", headers=headers)
+    assert r.status_code == 400
@@ -1,6 +1,7 @@
-from sqlalchemy import Select, func, select
+from sqlalchemy import Select, select
 from sqlalchemy.orm import Session
 
+from app.comun.paginacion import ModoTotal, contar_total, invalidar_conteos
 from app.tipos_producto.models import TipoProducto
 
 
@@ -12,6 +13,7 @@ def crear(db: Session, *, nombre: str) -> TipoProducto:
     obj = TipoProducto(nombre=nombre)
     db.add(obj)
     db.commit()
+    invalidar_conteos("tipo_producto")
     db.refresh(obj)
     return obj
 
@@ -20,22 +22,39 @@ def obtener_por_id(db: Session, tipo_producto_id: int) -> TipoProducto | None:
     return db.scalar(_base_query().where(TipoProducto.id_tipo_producto == tipo_producto_id))
 
 
+def ids_existentes(db: Session, ids: set[int]) -> set[int]:
+    if not ids:
+        return set()
+    columna = TipoProducto.id_tipo_producto
+    query = _base_query().with_only_columns(columna).where(columna.in_(ids))
+    return set(db.scalars(query))
+
+
 def listar(
     db: Session,
     *,
     page: int,
     page_size: int,
     q: str | None = None,
-) -> tuple[list[TipoProducto], int]:
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
+) -> tuple[list[TipoProducto], int | None]:
     query = _base_query()
     if q:
         like = f"%{q.strip()}%"
         query = query.where(TipoProducto.nombre.ilike(like))
 
-    total = db.scalar(select(func.count()).select_from(query.subquery())) or 0
+    total = contar_total(
+        db,
+        query,
+        tabla="tipo_producto",
+        filtros=(("q", q),),
+        include_total=include_total,
+        total_mode=total_mode,
+    )
     offset = (page - 1) * page_size
     items = db.scalars(query.order_by(TipoProducto.id_tipo_producto.asc()).offset(offset).limit(page_size)).all()
-    return items, int(total)
+    return items, total
 
 
 def actualizar(db: Session, obj: TipoProducto, *, nombre: str | None = None) -> TipoProducto:
@@ -44,6 +63,7 @@ def actualizar(db: Session, obj: TipoProducto, *, nombre: str | None = None) ->
 
     db.add(obj)
     db.commit()
+    invalidar_conteos("tipo_producto")
     db.refresh(obj)
     return obj
 
@@ -51,3 +71,4 @@ def actualizar(db: Session, obj: TipoProducto, *, nombre: str | None = None) ->
 def eliminar(db: Session, obj: TipoProducto) -> None:
     db.delete(obj)
     db.commit()
+    invalidar_conteos("tipo_producto")
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, Query
 
 from app.autenticacion.dependencies import obtener_admin_actual, obtener_usuario_actual
-from app.comun.dependencias import DBSession
+from app.comun.dependencias import DBSession, DBSessionLectura
+from app.comun.paginacion import ModoTotal
 from app.tipos_producto.schemas import (
     ActualizarTipoProductoDTO,
     CrearTipoProductoDTO,
@@ -27,13 +28,22 @@ def crear(dto: CrearTipoProductoDTO, db: DBSession, _: dict = Depends(obtener_ad
 
 @router.get('/tipos-producto', response_model=ListaTiposProductoDTO)
 def listar(
-    db: DBSession,
+    db: DBSessionLectura,
     _: dict = Depends(obtener_usuario_actual),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     q: str | None = Query(None, min_length=1),
+    include_total: bool = True,
+    total_mode: ModoTotal = 'exact',
 ) -> ListaTiposProductoDTO:
-    items, total = listar_tipos_producto(db, page=page, page_size=page_size, q=q)
+    items, total = listar_tipos_producto(
+        db,
+        page=page,
+        page_size=page_size,
+        q=q,
+        include_total=include_total,
+        total_mode=total_mode,
+    )
     return ListaTiposProductoDTO(
         page=page,
         page_size=page_size,
@@ -43,7 +53,7 @@ def listar(
 
 
 @router.get('/tipos-producto/{tipo_producto_id}', response_model=TipoProductoDTO)
-def obtener(tipo_producto_id: int, db: DBSession, _: dict = Depends(obtener_usuario_actual)) -> TipoProductoDTO:
+def obtener(tipo_producto_id: int, db: DBSessionLectura, _: dict = Depends(obtener_usuario_actual)) -> TipoProductoDTO:
     obj = obtener_tipo_producto(db, tipo_producto_id)
     return TipoProductoDTO.model_validate(obj, from_attributes=True)
 
@@ -17,5 +17,5 @@ class TipoProductoDTO(BaseModel):
 class ListaTiposProductoDTO(BaseModel):
     page: int
     page_size: int
-    total: int
+    total: int | None
     items: list[TipoProductoDTO]
@@ -1,41 +1,105 @@
 from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.base_de_datos.configuracion import settings
+from app.comun.cache import CacheTTL, clave_por_origen
 from app.comun.excepciones import conflicto, no_encontrado
+from app.comun.paginacion import ModoTotal
 from app.envios.base.models import Envio
 from app.tipos_producto import repository
-from app.tipos_producto.schemas import ActualizarTipoProductoDTO, CrearTipoProductoDTO
+from app.tipos_producto.schemas import (
+    ActualizarTipoProductoDTO,
+    CrearTipoProductoDTO,
+    TipoProductoDTO,
+)
+
+# Catálogo casi estático: se cachean DTOs por id y las páginas del listado sin filtros.
+# Toda escritura por este servicio vacía la cache.
+_cache = CacheTTL(
+    "tipos_producto",
+    maxsize=settings.catalog_cache_size,
+    ttl=settings.catalog_cache_ttl_seconds,
+)
 
 
 def crear_tipo_producto(db: Session, dto: CrearTipoProductoDTO):
     try:
-        return repository.crear(db, nombre=dto.nombre)
+        obj = repository.crear(db, nombre=dto.nombre)
     except IntegrityError as exc:
         raise conflicto("No se pudo crear el tipo de producto") from exc
+    _cache.limpiar()
+    return obj
+
 
+def listar_tipos_producto(
+    db: Session,
+    *,
+    page: int,
+    page_size: int,
+    q: str | None = None,
+    include_total: bool = True,
+    total_mode: ModoTotal = "exact",
+):
+    clave = clave_por_origen(db, "lista", page, page_size, include_total, total_mode)
+    usar_cache = q is None and clave is not None
+    if usar_cache and (pagina := _cache.obtener(clave)) is not None:
+        return pagina
 
-def listar_tipos_producto(db: Session, *, page: int, page_size: int, q: str | None = None):
-    return repository.listar(db, page=page, page_size=page_size, q=q)
+    items, total = repository.listar(
+        db,
+        page=page,
+        page_size=page_size,
+        q=q,
+        include_total=include_total,
+        total_mode=total_mode,
+    )
+    pagina = ([TipoProductoDTO.model_validate(o, from_attributes=True) for o in items], total)
+    if usar_cache:
+        _cache.guardar(clave, pagina)
+    return pagina
 
 
-def obtener_tipo_producto(db: Session, tipo_producto_id: int):
+def _obtener_modelo(db: Session, tipo_producto_id: int):
     obj = repository.obtener_por_id(db, tipo_producto_id)
     if obj is None:
         raise no_encontrado("Tipo de producto no encontrado")
     return obj
 
 
+def obtener_tipo_producto(db: Session, tipo_producto_id: int) -> TipoProductoDTO:
+    clave = clave_por_origen(db, tipo_producto_id)
+    dto = None if clave is None else _cache.obtener(clave)
+    if dto is None:
+        obj = _obtener_modelo(db, tipo_producto_id)
+        dto = TipoProductoDTO.model_validate(obj, from_attributes=True)
+        if clave is not None:
+            _cache.guardar(clave, dto)
+    return dto
+
+
+async def obtener_tipo_producto_async(db: AsyncSession, tipo_producto_id: int) -> TipoProductoDTO:
+    return await db.run_sync(obtener_tipo_producto, tipo_producto_id)
+
+
+def ids_tipos_producto_existentes(db: Session, ids: set[int]) -> set[int]:
+    """Subconjunto de `ids` que existen, en una sola consulta."""
+    return repository.ids_existentes(db, ids)
+
+
 def actualizar_tipo_producto(db: Session, tipo_producto_id: int, dto: ActualizarTipoProductoDTO):
-    obj = obtener_tipo_producto(db, tipo_producto_id)
+    obj = _obtener_modelo(db, tipo_producto_id)
     try:
-        return repository.actualizar(db, obj, nombre=dto.nombre)
+        obj = repository.actualizar(db, obj, nombre=dto.nombre)
     except IntegrityError as exc:
         raise conflicto("No se pudo actualizar el tipo de producto") from exc
+    _cache.limpiar()
+    return obj
 
 
 def eliminar_tipo_producto(db: Session, tipo_producto_id: int) -> None:
-    obj = obtener_tipo_producto(db, tipo_producto_id)
+    obj = _obtener_modelo(db, tipo_producto_id)
 
     total_envios = db.scalar(select(func.count()).select_from(Envio).where(Envio.id_tipo_producto == tipo_producto_id)) or 0
     if int(total_envios) > 0:
@@ -46,3 +110,4 @@ def eliminar_tipo_producto(db: Session, tipo_producto_id: int) -> None:
     except IntegrityError as exc:
         db.rollback()
         raise conflicto("No se puede eliminar el tipo de producto: tiene envíos asociados") from exc
+    _cache.limpiar()
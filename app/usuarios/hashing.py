@@ -0,0 +1,60 @@
+"""Ejecución de hash/verificación de contraseñas fuera del event loop y del threadpool
+de FastAPI, en un pool dedicado y acotado.
+
+Hay `password_hash_workers` trabajadores y como mucho `password_hash_queue` trabajos en
+espera; pasado ese límite se responde 503 en lugar de encolar sin fin.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TypeVar
+
+from app.base_de_datos.configuracion import settings
+from app.comun.excepciones import servicio_no_disponible
+from app.usuarios.passwords import hash_password, verify_password
+
+T = TypeVar("T")
+
+_cupos = threading.BoundedSemaphore(settings.password_hash_workers + settings.password_hash_queue)
+_executor: Executor | None = None
+_lock = threading.Lock()
+
+
+def _obtener_executor() -> Executor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            # hashlib.pbkdf2_hmac libera el GIL, así que los hilos ya corren en paralelo;
+            # los procesos aíslan además el CPU del proceso web.
+            if settings.password_hash_processes:
+                _executor = ProcessPoolExecutor(max_workers=settings.password_hash_workers)
+            else:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.password_hash_workers, thread_name_prefix="password"
+                )
+        return _executor
+
+
+async def _ejecutar(fn: Callable[..., T], *args) -> T:
+    if not _cupos.acquire(blocking=False):
+        raise servicio_no_disponible("Servicio de autenticación saturado, reintenta en unos segundos")
+    try:
+        futuro = _obtener_executor().submit(fn, *args)
+    except BaseException:
+        _cupos.release()
+        raise
+    # El cupo se libera cuando termina el trabajo, aunque el request se haya cancelado.
+    futuro.add_done_callback(lambda _: _cupos.release())
+    return await asyncio.wrap_future(futuro)
+
+
+async def calcular_hash(password: str) -> str:
+    return await _ejecutar(hash_password, password, settings.password_iterations)
+
+
+async def verificar(password: str, password_hash: str) -> bool:
+    return await _ejecutar(verify_password, password, password_hash)
@@ -1,24 +1,35 @@
+"""Hash de contraseñas con PBKDF2 (formato `pbkdf2_<alg>$<iteraciones>$<salt>$<dk>`).
+
+Calibración del número de iteraciones para una latencia objetivo:
+
+    python -m app.usuarios.passwords --objetivo-ms 100
+"""
+
 from __future__ import annotations
 
+import argparse
 import base64
 import hashlib
 import hmac
 import secrets
+import time
 
+from app.base_de_datos.configuracion import settings
 
 _ALG = "sha256"
-_ITERATIONS = 210_000
+_ITERACIONES_MINIMAS = 100_000
 
 
-def hash_password(password: str) -> str:
+def hash_password(password: str, iterations: int | None = None) -> str:
     if not isinstance(password, str) or len(password) < 6:
         raise ValueError("La contraseña debe tener al menos 6 caracteres")
 
+    iterations = iterations or settings.password_iterations
     salt = secrets.token_bytes(16)
-    dk = hashlib.pbkdf2_hmac(_ALG, password.encode("utf-8"), salt, _ITERATIONS)
+    dk = hashlib.pbkdf2_hmac(_ALG, password.encode("utf-8"), salt, iterations)
     salt_b64 = base64.urlsafe_b64encode(salt).decode("ascii").rstrip("=")
     dk_b64 = base64.urlsafe_b64encode(dk).decode("ascii").rstrip("=")
-    return f"pbkdf2_{_ALG}${_ITERATIONS}${salt_b64}${dk_b64}"
+    return f"pbkdf2_{_ALG}${iterations}${salt_b64}${dk_b64}"
 
 
 def verify_password(password: str, password_hash: str) -> bool:
@@ -38,6 +49,44 @@ def verify_password(password: str, password_hash: str) -> bool:
         return False
 
 
+def necesita_rehash(password_hash: str) -> bool:
+    """True si el hash no usa el algoritmo o las iteraciones configuradas."""
+    scheme, _, resto = password_hash.partition("$")
+    iter_s = resto.partition("$")[0]
+    return scheme != f"pbkdf2_{_ALG}" or iter_s != str(settings.password_iterations)
+
+
 def _b64decode_nopad(s: str) -> bytes:
     pad = "=" * ((4 - (len(s) % 4)) % 4)
     return base64.urlsafe_b64decode(s + pad)
+
+
+def calibrar_iteraciones(objetivo_ms: float, *, minimo: int = _ITERACIONES_MINIMAS) -> int:
+    """Iteraciones (múltiplo de 10.000, nunca menos de `minimo`) para que un hash tarde
+    aproximadamente `objetivo_ms` en esta máquina."""
+    muestra = 50_000
+    mejor = float("inf")
+    for _ in range(3):
+        inicio = time.perf_counter()
+        hashlib.pbkdf2_hmac(_ALG, b"calibracion", b"0" * 16, muestra)
+        mejor = min(mejor, time.perf_counter() - inicio)
+
+    iteraciones = int(muestra * (objetivo_ms / 1000) / mejor)
+    return max(minimo, round(iteraciones, -4))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Calibra las iteraciones de PBKDF2.")
+    parser.add_argument("--objetivo-ms", type=float, default=100.0)
+    args = parser.parse_args(argv)
+
+    iteraciones = calibrar_iteraciones(args.objetivo_ms)
+    inicio = time.perf_counter()
+    hash_password("calibracion", iteraciones)
+    medido = (time.perf_counter() - inicio) * 1000
+    print(f"PASSWORD_ITERATIONS={iteraciones}  # {medido:.0f} ms por hash en esta máquina")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -20,3 +20,9 @@ def crear(db: Session, *, username: str, password_hash: str, role: str = "user")
     db.commit()
     db.refresh(obj)
     return obj
+
+
+def actualizar_password_hash(db: Session, obj: Usuario, password_hash: str) -> Usuario:
+    obj.password_hash = password_hash
+    db.commit()
+    return obj
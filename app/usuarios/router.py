@@ -10,6 +10,6 @@ router = APIRouter()
 
 
 @router.post("/auth/register", response_model=UsuarioDTO, summary="Registrar usuario")
-def register(dto: RegistrarUsuarioDTO, db: DBSession) -> UsuarioDTO:
-    user = registrar_usuario(db, dto)
+async def register(dto: RegistrarUsuarioDTO, db: DBSession) -> UsuarioDTO:
+    user = await registrar_usuario(db, dto)
     return UsuarioDTO.model_validate(user, from_attributes=True)
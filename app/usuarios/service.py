@@ -1,18 +1,28 @@
 from __future__ import annotations
 
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from app.comun.excepciones import conflicto, error_servidor
 from app.usuarios import repository
-from app.usuarios.passwords import hash_password, verify_password
+from app.usuarios.hashing import calcular_hash, verificar
+from app.usuarios.passwords import necesita_rehash
 from app.usuarios.schemas import RegistrarUsuarioDTO
 
+# El hash corre en el pool de app.usuarios.hashing; las consultas, en el threadpool de
+# FastAPI (la sesión es síncrona).
 
-def registrar_usuario(db: Session, dto: RegistrarUsuarioDTO):
-    password_hash = hash_password(dto.password)
+
+async def registrar_usuario(db: Session, dto: RegistrarUsuarioDTO):
+    password_hash = await calcular_hash(dto.password)
+    return await run_in_threadpool(_crear_usuario, db, dto.username, password_hash)
+
+
+def _crear_usuario(db: Session, username: str, password_hash: str):
     try:
-        return repository.crear(db, username=dto.username, password_hash=password_hash, role="user")
+        return repository.crear(db, username=username, password_hash=password_hash, role="user")
     except IntegrityError as exc:
         db.rollback()
         raise conflicto("Usuario ya existe") from exc
@@ -23,10 +33,25 @@ def registrar_usuario(db: Session, dto: RegistrarUsuarioDTO):
         ) from exc
 
 
-def validar_credenciales(db: Session, username: str, password: str):
-    user = repository.obtener_por_username(db, username)
+async def validar_credenciales(db: Session, username: str, password: str):
+    user = await run_in_threadpool(repository.obtener_por_username, db, username)
     if user is None:
         return None
-    if not verify_password(password, user.password_hash):
+    if not await verificar(password, user.password_hash):
         return None
+    if necesita_rehash(user.password_hash):
+        await _rehash(db, user, password)
     return user
+
+
+async def _rehash(db: Session, user, password: str) -> None:
+    # Best effort: si el pool está saturado o falla la escritura, el login sigue y el
+    # rehash queda para el próximo inicio de sesión.
+    try:
+        password_hash = await calcular_hash(password)
+    except HTTPException:
+        return
+    try:
+        await run_in_threadpool(repository.actualizar_password_hash, db, user, password_hash)
+    except SQLAlchemyError:
+        db.rollback()
@@ -0,0 +1,279 @@
+"""Generador de datos sintéticos para pruebas de carga y de escala.
+
+Crea clientes, tipos de producto, bodegas, puertos y envíos (terrestres y marítimos, con
+`placa_vehiculo`/`numero_flota` válidos y `numero_guia` único). Las columnas se generan
+vectorizadas con NumPy por bloques de `--chunk` filas y se escriben con COPY en Postgres
+(psycopg) o con INSERT multi-fila en otros motores. Con la misma `--semilla` y `--chunk` los
+datos son idénticos entre corridas.
+
+Los ids se asignan explícitamente desde 1, así que las tablas deben estar vacías:
+
+    python -m scripts.benchmarks.generador --envios 1000000 [--database-url URL]
+        [--crear-esquema] [--semilla 1] [--chunk 100000] [--clientes 1000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import sys
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import Connection, Engine, Table, create_engine, func, insert, select, text
+
+from app.base_de_datos import modelos
+from app.base_de_datos.base import Base
+from app.comun.paginacion import invalidar_conteos
+from app.envios.base.centavos import ESCALA_TASA, redondear_half_even
+
+_LETRAS = np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", dtype=np.uint8)
+_DIGITOS = np.frombuffer(b"0123456789", dtype=np.uint8)
+_FECHA_INICIAL = np.datetime64("2025-01-01")
+
+_ENVIO = modelos.Envio.__table__
+_TERRESTRE = modelos.EnvioTerrestre.__table__
+_MARITIMO = modelos.EnvioMaritimo.__table__
+
+
+@dataclass(frozen=True)
+class Volumenes:
+    envios: int = 10_000
+    clientes: int = 100
+    tipos_producto: int = 10
+    bodegas: int = 20
+    puertos: int = 20
+    proporcion_terrestre: float = 0.5
+
+
+def _texto(rng: np.random.Generator, n: int, formato: str) -> np.ndarray:
+    """Cadenas con `formato` por posición: `L` letra mayúscula, `D` dígito."""
+    bytes_ = np.empty((n, len(formato)), dtype=np.uint8)
+    for j, tipo in enumerate(formato):
+        alfabeto = _LETRAS if tipo == "L" else _DIGITOS
+        bytes_[:, j] = alfabeto[rng.integers(0, len(alfabeto), n)]
+    return bytes_.view(f"S{len(formato)}").ravel().astype(str)
+
+
+def _centavos_a_texto(centavos: np.ndarray) -> np.ndarray:
+    enteros, resto = np.divmod(centavos, 100)
+    return np.char.add(np.char.add(enteros.astype(str), "."), np.char.zfill(resto.astype(str), 2))
+
+
+def _descuento_centavos(
+    precio: np.ndarray, cantidad: np.ndarray, terrestre: np.ndarray
+) -> np.ndarray:
+    """`calcular_monto_descuento` con las reglas por defecto (quantize half-even), en enteros."""
+    tasa = np.where(cantidad > 10, np.where(terrestre, 500, 300), 0)
+    return redondear_half_even(precio * tasa, ESCALA_TASA)
+
+
+def generar_envios(
+    volumenes: Volumenes, *, semilla: int = 1, chunk: int = 100_000
+) -> Iterator[tuple[dict[str, np.ndarray], dict[str, np.ndarray], dict[str, np.ndarray]]]:
+    """Bloques `(envio, terrestre, maritimo)` de columnas NumPy (precios en centavos)."""
+    for numero, desde in enumerate(range(0, volumenes.envios, chunk)):
+        rng = np.random.default_rng([semilla, numero])
+        n = min(chunk, volumenes.envios - desde)
+        ids = np.arange(desde + 1, desde + n + 1, dtype=np.int64)
+        cantidad = rng.integers(1, 31, n)
+        precio = rng.integers(1_000, 500_001, n)
+        terrestre = rng.random(n) < volumenes.proporcion_terrestre
+        descuento = _descuento_centavos(precio, cantidad, terrestre)
+        registro = _FECHA_INICIAL + rng.integers(0, 365, n).astype("timedelta64[D]")
+
+        envio = {
+            "id_envio": ids,
+            "id_cliente": rng.integers(1, volumenes.clientes + 1, n),
+            "id_tipo_producto": rng.integers(1, volumenes.tipos_producto + 1, n),
+            "cantidad": cantidad,
+            "fecha_registro": registro,
+            "fecha_entrega": registro + rng.integers(0, 31, n).astype("timedelta64[D]"),
+            "precio_base": precio,
+            "descuento": descuento,
+            "precio_final": precio - descuento,
+            "numero_guia": np.char.add("S", np.char.zfill(ids.astype(str), 9)),
+        }
+        n_terrestres = int(terrestre.sum())
+        n_maritimos = n - n_terrestres
+        detalle_terrestre = {
+            "id_envio": ids[terrestre],
+            "id_bodega": rng.integers(1, volumenes.bodegas + 1, n_terrestres),
+            "placa_vehiculo": _texto(rng, n_terrestres, "LLLDDD"),
+        }
+        detalle_maritimo = {
+            "id_envio": ids[~terrestre],
+            "id_puerto": rng.integers(1, volumenes.puertos + 1, n_maritimos),
+            "numero_flota": _texto(rng, n_maritimos, "LLLDDDDL"),
+        }
+        yield envio, detalle_terrestre, detalle_maritimo
+
+
+_PRECIOS = ("precio_base", "descuento", "precio_final")
+
+
+def _columnas_texto(columnas: dict[str, np.ndarray]) -> list[np.ndarray]:
+    return [
+        _centavos_a_texto(valores) if nombre in _PRECIOS else valores.astype(str)
+        for nombre, valores in columnas.items()
+    ]
+
+
+def _escribir_copy(conexion: Connection, tabla: Table, columnas: dict[str, np.ndarray]) -> None:
+    # Formato texto de COPY: los valores generados no contienen tabuladores ni saltos de línea.
+    filas = zip(*_columnas_texto(columnas))
+    datos = io.StringIO("\n".join(map("\t".join, filas)) + "\n")
+    cursor = conexion.connection.driver_connection.cursor()
+    try:
+        with cursor.copy(f"COPY {tabla.name} ({', '.join(columnas)}) FROM STDIN") as copy:
+            while bloque := datos.read(1 << 20):
+                copy.write(bloque)
+    finally:
+        cursor.close()
+
+
+def _escribir_insert(conexion: Connection, tabla: Table, columnas: dict[str, np.ndarray]) -> None:
+    valores = []
+    for nombre, columna in columnas.items():
+        if nombre in _PRECIOS:
+            # NUMERIC(10,2): se pasa el texto exacto en lugar de un float.
+            valores.append(_centavos_a_texto(columna).tolist())
+        else:
+            valores.append(columna.tolist())  # datetime64[D] -> date, int64 -> int
+    conexion.execute(insert(tabla), [dict(zip(columnas, fila)) for fila in zip(*valores)])
+
+
+def _catalogos(volumenes: Volumenes) -> list[tuple[Table, dict[str, np.ndarray]]]:
+    def nombres(prefijo: str, n: int) -> np.ndarray:
+        return np.char.add(f"{prefijo} ", np.arange(1, n + 1).astype(str))
+
+    return [
+        (
+            modelos.Cliente.__table__,
+            {
+                "id_cliente": np.arange(1, volumenes.clientes + 1),
+                "nombre": nombres("Cliente", volumenes.clientes),
+            },
+        ),
+        (
+            modelos.TipoProducto.__table__,
+            {
+                "id_tipo_producto": np.arange(1, volumenes.tipos_producto + 1),
+                "nombre": nombres("Tipo", volumenes.tipos_producto),
+            },
+        ),
+        (
+            modelos.Bodega.__table__,
+            {
+                "id_bodega": np.arange(1, volumenes.bodegas + 1),
+                "nombre": nombres("Bodega", volumenes.bodegas),
+            },
+        ),
+        (
+            modelos.Puerto.__table__,
+            {
+                "id_puerto": np.arange(1, volumenes.puertos + 1),
+                "nombre": nombres("Puerto", volumenes.puertos),
+            },
+        ),
+    ]
+
+
+def _ajustar_secuencias(conexion: Connection) -> None:
+    """Postgres: las secuencias SERIAL siguen después de los ids cargados explícitamente."""
+    tablas = (modelos.Cliente, modelos.TipoProducto, modelos.Bodega, modelos.Puerto, modelos.Envio)
+    for tabla in tablas:
+        pk = tabla.__table__.primary_key.columns.values()[0]
+        conexion.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{tabla.__tablename__}', '{pk.name}'), "
+                f"(SELECT COALESCE(MAX({pk.name}), 0) + 1 FROM {tabla.__tablename__}), false)"
+            )
+        )
+
+
+def poblar(
+    engine: Engine,
+    volumenes: Volumenes,
+    *,
+    semilla: int = 1,
+    chunk: int = 100_000,
+    progreso: bool = False,
+) -> None:
+    """Carga catálogos y envíos en tablas vacías; un commit por bloque de envíos.
+
+    Lanza ValueError si ya hay envíos.
+    """
+    es_copy = engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg"
+    escribir = _escribir_copy if es_copy else _escribir_insert
+
+    with engine.connect() as conexion:
+        if conexion.scalar(select(func.count()).select_from(_ENVIO)):
+            raise ValueError("La tabla envio no está vacía")
+        for tabla, columnas in _catalogos(volumenes):
+            escribir(conexion, tabla, columnas)
+        conexion.commit()
+
+        inicio = time.perf_counter()
+        cargados = 0
+        for envio, terrestre, maritimo in generar_envios(volumenes, semilla=semilla, chunk=chunk):
+            escribir(conexion, _ENVIO, envio)
+            escribir(conexion, _TERRESTRE, terrestre)
+            escribir(conexion, _MARITIMO, maritimo)
+            conexion.commit()
+            cargados += len(envio["id_envio"])
+            if progreso:
+                velocidad = cargados / (time.perf_counter() - inicio)
+                print(
+                    f"{cargados}/{volumenes.envios} envíos ({velocidad:,.0f}/s)", file=sys.stderr
+                )
+
+        if engine.dialect.name == "postgresql":
+            _ajustar_secuencias(conexion)
+            conexion.commit()
+    invalidar_conteos("envio")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--envios", type=int, default=Volumenes.envios)
+    parser.add_argument("--clientes", type=int, default=Volumenes.clientes)
+    parser.add_argument("--tipos-producto", type=int, default=Volumenes.tipos_producto)
+    parser.add_argument("--bodegas", type=int, default=Volumenes.bodegas)
+    parser.add_argument("--puertos", type=int, default=Volumenes.puertos)
+    parser.add_argument(
+        "--proporcion-terrestre", type=float, default=Volumenes.proporcion_terrestre
+    )
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--chunk", type=int, default=100_000)
+    parser.add_argument("--database-url", help="por defecto DATABASE_URL")
+    parser.add_argument("--crear-esquema", action="store_true", help="create_all antes de cargar")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from app.base_de_datos.sesion import engine
+    if args.crear_esquema:
+        Base.metadata.create_all(engine)
+
+    volumenes = Volumenes(
+        envios=args.envios,
+        clientes=args.clientes,
+        tipos_producto=args.tipos_producto,
+        bodegas=args.bodegas,
+        puertos=args.puertos,
+        proporcion_terrestre=args.proporcion_terrestre,
+    )
+    try:
+        poblar(engine, volumenes, semilla=args.semilla, chunk=args.chunk, progreso=True)
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,170 @@
+"""Costo por ítem de serializar una página de `GET /envios?page_size=100`.
+
+Compara el camino anterior (EnvioDTO(**dict) por ítem + re-validación del response_model
+por parte de FastAPI) con el actual (`a_envio_fila` a dict plano + TypeAdapter.dump_json).
+Opcionalmente mide también el endpoint completo contra una base SQLite temporal.
+
+    python -m scripts.benchmarks.serializacion_envios [--filas 100] [--repeticiones 500] [--endpoint]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import timeit
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from pydantic import TypeAdapter
+
+from app.envios.schemas import EnvioDTO, ListaEnviosDTO, ListaEnviosFila
+from app.envios.service import a_envio_fila
+
+_LISTA_ENVIOS_DTO = TypeAdapter(ListaEnviosDTO)
+_LISTA_ENVIOS_JSON = TypeAdapter(ListaEnviosFila)
+
+
+def _filas(n: int) -> list[tuple]:
+    filas = []
+    for i in range(1, n + 1):
+        envio = SimpleNamespace(
+            id_envio=i,
+            id_cliente=1 + i % 7,
+            id_tipo_producto=1 + i % 3,
+            cantidad=1 + i % 20,
+            fecha_registro=date(2026, 2, 1),
+            fecha_entrega=date(2026, 2, 1) + timedelta(days=i % 15),
+            precio_base=Decimal("1000.00"),
+            descuento=Decimal("50.00"),
+            precio_final=Decimal("950.00"),
+            numero_guia=f"G-{i:06d}",
+        )
+        if i % 2:
+            filas.append((envio, SimpleNamespace(id_bodega=1, placa_vehiculo="ABC123"), None))
+        else:
+            filas.append((envio, None, SimpleNamespace(id_puerto=1, numero_flota="ABC1234Z")))
+    return filas
+
+
+def _antes(filas: list[tuple]) -> bytes:
+    items = []
+    for envio, terrestre, maritimo in filas:
+        items.append(
+            EnvioDTO(**{
+                "id_envio": envio.id_envio,
+                "id_cliente": envio.id_cliente,
+                "id_tipo_producto": envio.id_tipo_producto,
+                "cantidad": envio.cantidad,
+                "fecha_registro": envio.fecha_registro,
+                "fecha_entrega": envio.fecha_entrega,
+                "precio_base": envio.precio_base,
+                "descuento": envio.descuento,
+                "precio_final": envio.precio_final,
+                "numero_guia": envio.numero_guia,
+                "tipo_envio": "TERRESTRE" if terrestre is not None else "MARITIMO",
+                "id_bodega": terrestre.id_bodega if terrestre is not None else None,
+                "placa_vehiculo": terrestre.placa_vehiculo if terrestre is not None else None,
+                "id_puerto": maritimo.id_puerto if maritimo is not None else None,
+                "numero_flota": maritimo.numero_flota if maritimo is not None else None,
+            })
+        )
+    lista = ListaEnviosDTO(page=1, page_size=len(filas), total=len(filas), items=items)
+    # FastAPI valida el valor retornado contra response_model (para endpoints sync, además,
+    # en un salto extra al threadpool que aquí no se mide) y luego lo serializa.
+    return _LISTA_ENVIOS_DTO.dump_json(_LISTA_ENVIOS_DTO.validate_python(lista))
+
+
+def _ahora(filas: list[tuple]) -> bytes:
+    lista = {
+        "page": 1,
+        "page_size": len(filas),
+        "total": len(filas),
+        "items": [a_envio_fila(*fila) for fila in filas],
+        "next_cursor": None,
+    }
+    return _LISTA_ENVIOS_JSON.dump_json(lista)
+
+
+def _por_item_us(funcion, filas: list[tuple], repeticiones: int) -> float:
+    mejor = min(timeit.repeat(lambda: funcion(filas), number=repeticiones, repeat=5))
+    return mejor / repeticiones / len(filas) * 1e6
+
+
+def _medir_endpoint(filas: int, repeticiones: int) -> float:
+    """µs por ítem de GET /envios?page_size=<filas> (incluye BD, auth y HTTP en proceso)."""
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from app.base_de_datos import modelos  # noqa: F401
+    from app.base_de_datos.base import Base
+    from app.base_de_datos.sesion import get_session, get_session_lectura
+    from app.main import create_app
+
+    ruta = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{ruta}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+
+    def sesion():
+        with Session(engine) as db:
+            yield db
+
+    app = create_app()
+    app.dependency_overrides[get_session] = sesion
+    app.dependency_overrides[get_session_lectura] = sesion
+    with TestClient(app) as client:
+        token = client.post("/api/v1/auth/token", json={"username": "admin", "password": "admin"})
+        headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+        cliente = client.post("/api/v1/clientes", headers=headers, json={"nombre": "Bench"})
+        tipo = client.post("/api/v1/tipos-producto", headers=headers, json={"nombre": "Caja"})
+        bodega = client.post("/api/v1/bodegas", headers=headers, json={"nombre": "Bodega"})
+        items = [
+            {
+                "id_cliente": cliente.json()["id_cliente"],
+                "id_tipo_producto": tipo.json()["id_tipo_producto"],
+                "cantidad": 1 + i % 20,
+                "fecha_registro": "2026-02-01",
+                "fecha_entrega": "2026-02-10",
+                "precio_base": 1000,
+                "numero_guia": f"G-{i:06d}",
+                "tipo_envio": "TERRESTRE",
+                "id_bodega": bodega.json()["id_bodega"],
+                "placa_vehiculo": "ABC123",
+            }
+            for i in range(filas)
+        ]
+        client.post("/api/v1/envios/bulk", headers=headers, json=items)
+
+        url = f"/api/v1/envios?page_size={filas}&include_total=false"
+        mejor = min(
+            timeit.repeat(lambda: client.get(url, headers=headers), number=repeticiones, repeat=3)
+        )
+    return mejor / repeticiones / filas * 1e6
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, default=100)
+    parser.add_argument("--repeticiones", type=int, default=500)
+    parser.add_argument("--endpoint", action="store_true", help="medir también el endpoint completo")
+    args = parser.parse_args(argv)
+
+    filas = _filas(args.filas)
+    assert _antes(filas) == _ahora(filas), "los dos caminos deben producir el mismo JSON"
+
+    antes = _por_item_us(_antes, filas, args.repeticiones)
+    ahora = _por_item_us(_ahora, filas, args.repeticiones)
+    print(f"serialización, {args.filas} ítems por página")
+    print(f"  antes: {antes:8.2f} µs/ítem")
+    print(f"  ahora: {ahora:8.2f} µs/ítem  ({antes / ahora:.1f}x)")
+
+    if args.endpoint:
+        total = _medir_endpoint(args.filas, max(1, args.repeticiones // 10))
+        print(f"GET /envios?page_size={args.filas}: {total:8.2f} µs/ítem (extremo a extremo)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
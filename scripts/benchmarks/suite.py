@@ -0,0 +1,371 @@
+"""Suite de benchmarks de los caminos calientes de la API.
+
+Siembra una base con `--envios` filas vía `scripts.benchmarks.generador` (SQLite temporal por
+defecto; con `--database-url` una Postgres local, que debe ser descartable: se crean y se borran
+las tablas) y mide `repository.listar` por filtro, crear/actualizar/eliminar envío,
+`calcular_monto_descuento`, resolución de precios, hash de contraseñas, verificación de JWT,
+overhead del middleware de métricas y requests HTTP completos vía TestClient.
+
+Los resultados se escriben en JSON (`--salida`) y, con `--baseline`, se comparan contra una
+corrida guardada: el proceso sale con código 1 si algún caso es más lento que la baseline por
+encima de `--tolerancia`. La baseline solo es comparable en la misma máquina y volumen.
+
+    python -m scripts.benchmarks.suite [--envios 10000] [--database-url URL] [--solo listar]
+        [--salida resultados.json] [--baseline scripts/benchmarks/baseline.json]
+        [--guardar-baseline]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+from sqlalchemy import Engine, create_engine, make_url
+from sqlalchemy.orm import Session
+
+from app.autenticacion.dependencies import _verificar
+from app.autenticacion.jwt_handler import crear_token, decodificar_token
+from app.base_de_datos.base import Base
+from app.base_de_datos.sesion import opciones_engine
+from app.comun.cache import limpiar_caches
+from app.envios import repository
+from app.envios.base.discount_service import calcular_monto_descuento
+from app.envios.schemas import ActualizarEnvioDTO, CrearEnvioDTO
+from app.envios.service import _resolver_precios, actualizar_envio, crear_envio, eliminar_envio
+from app.metricas.registro import MetricasMiddleware
+from app.usuarios.passwords import hash_password, verify_password
+from scripts.benchmarks.generador import Volumenes, poblar
+
+BASELINE = Path(__file__).with_name("baseline.json")
+
+_CLIENTES = Volumenes.clientes
+_TIPOS_PRODUCTO = Volumenes.tipos_producto
+_BODEGAS = Volumenes.bodegas
+
+
+@dataclass
+class Caso:
+    nombre: str
+    funcion: Callable[[int], object]
+    repeticiones: int
+    # Llamadas por muestra: las funciones de pocos µs se miden en lotes para que el reloj no
+    # domine la medición.
+    lote: int = 1
+    # Se llama antes de medir (fuera del tiempo) con el total de llamadas que hará `medir`,
+    # para que el caso siembre sus propios datos y pueda correr solo (`--solo`).
+    preparar: Callable[[int], object] | None = None
+
+
+def medir(caso: Caso, *, calentamiento: int = 3) -> dict:
+    """Tiempos en µs por llamada; `caso.funcion` recibe un índice único por llamada."""
+    if caso.preparar is not None:
+        caso.preparar((calentamiento + caso.repeticiones) * caso.lote)
+    muestras = []
+    i = 0
+    for n in range(calentamiento + caso.repeticiones):
+        inicio = time.perf_counter_ns()
+        for _ in range(caso.lote):
+            caso.funcion(i)
+            i += 1
+        if n >= calentamiento:
+            muestras.append((time.perf_counter_ns() - inicio) / caso.lote / 1000)
+    muestras.sort()
+    return {
+        "n": len(muestras),
+        "min_us": round(muestras[0], 2),
+        "mediana_us": round(statistics.median(muestras), 2),
+        "p95_us": round(muestras[min(len(muestras) - 1, int(len(muestras) * 0.95))], 2),
+    }
+
+
+@contextmanager
+def base_de_datos(url: str | None) -> Iterator[Engine]:
+    """Engine con el esquema creado; sin `url`, una SQLite en un directorio temporal."""
+    with tempfile.TemporaryDirectory() as directorio:
+        url = url or f"sqlite:///{os.path.join(directorio, 'bench.db')}"
+        opciones = opciones_engine(url)
+        if make_url(url).get_backend_name() == "sqlite":
+            opciones["connect_args"] = {"check_same_thread": False}
+        engine = create_engine(url, **opciones)
+        Base.metadata.create_all(engine)
+        try:
+            yield engine
+        finally:
+            Base.metadata.drop_all(engine)
+            engine.dispose()
+
+
+def _casos_listar(engine: Engine, envios: int) -> list[Caso]:
+    filtros = {
+        "sin_filtros": {},
+        "q_substring": {"q": "123"},
+        "q_prefix": {"q": "S00000", "search_mode": "prefix"},
+        "q_exact": {"q": f"S{envios // 2:09d}", "search_mode": "exact"},
+        "id_cliente": {"id_cliente": 7},
+        "id_tipo_producto": {"id_tipo_producto": 3},
+        "tipo_envio": {"tipo_envio": "MARITIMO"},
+        "pagina_profunda": {"page": max(1, envios // 40)},
+        "keyset": {"after_id": envios // 2},
+    }
+
+    def caso(kwargs: dict) -> Callable[[int], object]:
+        def listar(_: int) -> object:
+            # Sin la cache de conteos: se mide el COUNT real de cada filtro.
+            limpiar_caches()
+            with Session(engine) as db:
+                return repository.listar(db, **{"page": 1, "page_size": 20, **kwargs})
+
+        return listar
+
+    return [Caso(f"listar.{nombre}", caso(kwargs), 30) for nombre, kwargs in filtros.items()]
+
+
+def _casos_escritura(engine: Engine) -> list[Caso]:
+    def dto(i: int, prefijo: str) -> CrearEnvioDTO:
+        return CrearEnvioDTO(
+            id_cliente=1 + i % _CLIENTES,
+            id_tipo_producto=1 + i % _TIPOS_PRODUCTO,
+            cantidad=1 + i % 20,
+            fecha_registro=date(2026, 2, 1),
+            fecha_entrega=date(2026, 2, 10),
+            precio_base=Decimal("1234.50"),
+            numero_guia=f"{prefijo}{i:09d}",
+            tipo_envio="TERRESTRE",
+            id_bodega=1 + i % _BODEGAS,
+            placa_vehiculo="ABC123",
+        )
+
+    def sembrar(prefijo: str, ids: list[int]) -> Callable[[int], object]:
+        def preparar(llamadas: int) -> None:
+            with Session(engine) as db:
+                ids[:] = [crear_envio(db, dto(i, prefijo))[0].id_envio for i in range(llamadas)]
+
+        return preparar
+
+    def crear(i: int) -> None:
+        with Session(engine) as db:
+            crear_envio(db, dto(i, "B"))
+
+    para_actualizar: list[int] = []
+    para_eliminar: list[int] = []
+
+    def actualizar(i: int) -> None:
+        with Session(engine) as db:
+            actualizar_envio(db, para_actualizar[i], ActualizarEnvioDTO(cantidad=11 + i % 5))
+
+    def eliminar(i: int) -> None:
+        with Session(engine) as db:
+            eliminar_envio(db, para_eliminar[i])
+
+    # Actualizar y eliminar siembran sus propios envíos (no dependen de haber corrido crear).
+    return [
+        Caso("envios.crear", crear, 50),
+        Caso("envios.actualizar", actualizar, 50, preparar=sembrar("U", para_actualizar)),
+        Caso("envios.eliminar", eliminar, 50, preparar=sembrar("E", para_eliminar)),
+    ]
+
+
+def _casos_cpu() -> list[Caso]:
+    tipos = ("TERRESTRE", "MARITIMO")
+    password = hash_password("benchmark")
+    token = crear_token({"sub": "bench", "role": "user"})
+
+    def descuento(i: int) -> object:
+        return calcular_monto_descuento(
+            precio_base=Decimal("1234.50"), cantidad=1 + i % 20, tipo_envio=tipos[i % 2]
+        )
+
+    def resolver_precios(i: int) -> object:
+        return _resolver_precios(
+            precio_base=Decimal("1234.505"), cantidad=1 + i % 20, tipo_envio=tipos[i % 2]
+        )
+
+    return [
+        Caso("descuento.calcular_monto", descuento, 50, lote=1000),
+        Caso("precios.decimal", resolver_precios, 50, lote=1000),
+        Caso("passwords.hash", lambda _: hash_password("benchmark"), 5),
+        Caso("passwords.verificar", lambda _: verify_password("benchmark", password), 5),
+        Caso("jwt.decodificar", lambda _: decodificar_token(token), 50, lote=100),
+        Caso("jwt.verificar_cacheado", lambda _: _verificar(token), 50, lote=1000),
+    ]
+
+
+def _casos_asgi() -> list[Caso]:
+    """Overhead de `MetricasMiddleware`: la misma app ASGI vacía con y sin el middleware, de a
+    100 requests por llamada (un `run_until_complete` por request dominaría la medición)."""
+    bucle = asyncio.new_event_loop()
+    scope = {"type": "http", "method": "GET", "path": "/x"}
+
+    async def app_vacia(scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive() -> dict:
+        return {"type": "http.request"}
+
+    async def send(_: dict) -> None:
+        pass
+
+    def cien(app) -> Callable[[int], object]:
+        async def requests() -> None:
+            for _ in range(100):
+                await app(dict(scope), receive, send)
+
+        return lambda _: bucle.run_until_complete(requests())
+
+    return [
+        Caso("asgi.app_vacia_x100", cien(app_vacia), 50),
+        Caso("asgi.metricas_x100", cien(MetricasMiddleware(app_vacia, registrar=False)), 50),
+    ]
+
+
+def _casos_http(engine: Engine, envios: int) -> list[Caso]:
+    from fastapi.testclient import TestClient
+
+    from app.base_de_datos.sesion import get_session, get_session_lectura
+    from app.main import create_app
+
+    def sesion():
+        with Session(engine) as db:
+            yield db
+
+    app = create_app(db_async=False)
+    app.dependency_overrides[get_session] = sesion
+    app.dependency_overrides[get_session_lectura] = sesion
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {crear_token({'sub': 'bench', 'role': 'admin'})}"}
+    id_medio = max(1, envios // 2)
+
+    def crear(i: int) -> None:
+        envio = {
+            "id_cliente": 1,
+            "id_tipo_producto": 1,
+            "cantidad": 12,
+            "fecha_registro": "2026-02-01",
+            "fecha_entrega": "2026-02-10",
+            "precio_base": "1234.50",
+            "numero_guia": f"H{i:09d}",
+            "tipo_envio": "MARITIMO",
+            "id_puerto": 1,
+            "numero_flota": "ABC1234Z",
+        }
+        client.post("/api/v1/envios", headers=headers, json=envio).raise_for_status()
+
+    def get(url: str) -> Callable[[int], object]:
+        return lambda _: client.get(url, headers=headers).raise_for_status()
+
+    return [
+        Caso("http.listar_envios", get("/api/v1/envios?page_size=20"), 50),
+        Caso("http.obtener_envio", get(f"/api/v1/envios/{id_medio}"), 50),
+        Caso("http.crear_envio", crear, 50),
+    ]
+
+
+def ejecutar(
+    envios: int, *, database_url: str | None = None, solo: str | None = None, semilla: int = 1
+) -> dict:
+    with base_de_datos(database_url) as engine:
+        inicio = time.perf_counter()
+        poblar(engine, Volumenes(envios=envios), semilla=semilla)
+        print(f"siembra: {envios} envíos en {time.perf_counter() - inicio:.1f} s", file=sys.stderr)
+
+        casos = [
+            *_casos_listar(engine, envios),
+            *_casos_escritura(engine),
+            *_casos_cpu(),
+            *_casos_asgi(),
+            *_casos_http(engine, envios),
+        ]
+        resultados = {}
+        for caso in casos:
+            if solo and not caso.nombre.startswith(solo):
+                continue
+            resultados[caso.nombre] = medir(caso)
+            mediana = resultados[caso.nombre]["mediana_us"]
+            print(f"{caso.nombre:28} {mediana:12.2f} µs", file=sys.stderr)
+        motor = engine.dialect.name
+    limpiar_caches()
+
+    return {
+        "fecha": datetime.now(tz=timezone.utc).isoformat(timespec="seconds"),
+        "motor": motor,
+        "envios": envios,
+        "semilla": semilla,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resultados,
+    }
+
+
+def comparar(actual: dict, baseline: dict, *, tolerancia: float) -> list[str]:
+    """Imprime la comparación por caso y retorna los nombres de los que empeoraron."""
+    if (actual["motor"], actual["envios"]) != (baseline["motor"], baseline["envios"]):
+        print(
+            f"aviso: la baseline es de {baseline['motor']} con {baseline['envios']} envíos",
+            file=sys.stderr,
+        )
+    regresiones = []
+    print(f"{'caso':28} {'baseline µs':>12} {'actual µs':>12} {'ratio':>7}")
+    for nombre, resultado in actual["resultados"].items():
+        base = baseline["resultados"].get(nombre)
+        if base is None:
+            print(f"{nombre:28} {'-':>12} {resultado['mediana_us']:12.2f}")
+            continue
+        ratio = resultado["mediana_us"] / base["mediana_us"] if base["mediana_us"] else 1.0
+        marca = ""
+        if ratio > 1 + tolerancia:
+            regresiones.append(nombre)
+            marca = "  <- regresión"
+        print(
+            f"{nombre:28} {base['mediana_us']:12.2f} {resultado['mediana_us']:12.2f} "
+            f"{ratio:6.2f}x{marca}"
+        )
+    return regresiones
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--envios", type=int, default=10_000)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--database-url", help="Postgres local descartable (por defecto SQLite)")
+    parser.add_argument("--solo", help="prefijo de los casos a correr (ej. listar, http)")
+    parser.add_argument("--salida", type=Path, help="archivo JSON con los resultados")
+    parser.add_argument("--baseline", type=Path, help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    parser.add_argument(
+        "--guardar-baseline", action="store_true", help=f"guarda los resultados en {BASELINE}"
+    )
+    args = parser.parse_args(argv)
+
+    resultado = ejecutar(
+        args.envios, database_url=args.database_url, solo=args.solo, semilla=args.semilla
+    )
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False) + "\n"
+    if args.salida:
+        args.salida.write_text(texto, encoding="utf-8")
+    if args.guardar_baseline:
+        BASELINE.write_text(texto, encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if comparar(resultado, baseline, tolerancia=args.tolerancia):
+            return 1
+    elif not args.salida and not args.guardar_baseline:
+        print(texto, end="")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())